@@ -1,17 +1,63 @@
 # Plik: api_server.py
 
-from fastapi import FastAPI, HTTPException
+import json
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
-from typing import Dict, Any
-from crypto_analyzer import scan_and_return_data_for_api 
+from typing import Dict, Any, List, Optional
+from crypto_analyzer import scan_and_return_data_for_api, stream_scan_for_api, warmup
+from stream_ingest import load_live_ranking
+from scan_worker import covers, load_snapshot, snapshot_age, snapshot_for_api
+from response_cache import SingleFlightCache, ttl_until_candle_close
+import http_client
+import inference
+import metrics
+import results_store
 import uvicorn
 
+# PREWARM=1: leniwe zależności ładowane w tle zaraz po starcie workera - VADER (nltk, warmup())
+# oraz lightgbm z boosterami /predict (inference.load_models()) - zamiast przy pierwszym żądaniu
+# /scan-and-advice lub /predict. Serwer przyjmuje ruch od razu.
+PREWARM = os.environ.get("PREWARM", "0") == "1"
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if PREWARM:
+        def prewarm():
+            warmup()
+            inference.load_models()
+        threading.Thread(target=prewarm, name="prewarm", daemon=True).start()
+    yield
+
 # Inicjalizacja aplikacji FastAPI
 app = FastAPI(
     title="Crypto AI Advisor API",
-    description="Serwer analityczny dla aplikacji Android."
+    description="Serwer analityczny dla aplikacji Android.",
+    lifespan=lifespan
 )
 
+# Wyniki skanu współdzielone między klientami do zamknięcia bieżącej świecy
+scan_cache = SingleFlightCache("scan_response")
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Czas i status każdego żądania (etykieta: szablon ścieżki, nie surowy URL)."""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        metrics.observe('http_request_seconds', time.perf_counter() - start, path=path, method=request.method)
+        metrics.inc('http_requests_total', path=path, method=request.method, status=status)
+
 # Definicja modelu danych wejściowych (to, co aplikacja Android wyśle)
 class ScanRequest(BaseModel):
     limit_symbols: int = Field(default=200, ge=20, le=200, description="Głębokość wstępnego skanowania.")
@@ -20,23 +66,138 @@ class ScanRequest(BaseModel):
 
 # Endpoint API
 @app.post("/scan-and-advice", response_model=Dict[str, Any])
-def get_ai_scan(request: ScanRequest):
+def get_ai_scan(request: ScanRequest, response: Response):
     """
-    Uruchamia pełny skaner 3xAI (ML, Sentyment, RSI) i zwraca szczegółowe dane dla wybranych aktywów.
+    Zwraca wynik skanera 3xAI (ML, Sentyment, RSI) ze szczegółowymi danymi dla wybranych aktywów.
+    Gdy działa scan_worker.py - odczyt jego snapshotu (bez skanu). Inaczej skan na żądanie: identyczne
+    żądania dostają wynik z cache (do zamknięcia świecy); równoczesne czekają na jeden skan.
     """
+    snap = load_snapshot(request.interval)
+    if covers(snap, request.limit_symbols):
+        response.headers["X-Cache"] = "SNAPSHOT"
+        response.headers["X-Snapshot-Age"] = f"{snapshot_age(snap):.0f}"
+        with metrics.timer('api.snapshot'):
+            return snapshot_for_api(snap, request.limit_symbols, request.top_n)
+
+    key = (request.limit_symbols, request.top_n, request.interval)
     try:
         # Wywołanie głównej funkcji analitycznej
-        results = scan_and_return_data_for_api(
-            limit_symbols=request.limit_symbols,
-            top_n=request.top_n,
-            interval=request.interval
+        results, status = scan_cache.get_or_compute(
+            key,
+            lambda: scan_and_return_data_for_api(
+                limit_symbols=request.limit_symbols,
+                top_n=request.top_n,
+                interval=request.interval
+            ),
+            ttl=ttl_until_candle_close(request.interval),
         )
+        response.headers["X-Cache"] = status
         return results
     
     except Exception as e:
         print(f"BŁĄD KRYTYCZNY SERWERA: {e}")
         raise HTTPException(status_code=500, detail=f"Wystąpił błąd serwera podczas analizy: {e}")
 
+@app.post("/scan-and-advice/stream")
+async def stream_ai_scan(request: ScanRequest, accept: str = Header(default="")):
+    """
+    Ten sam skan co /scan-and-advice, ale wyniki płyną na bieżąco: 'scored' (po każdym symbolu),
+    'ranking', 'analysis' (3xAI per symbol) i 'done'. Domyślnie NDJSON ({"event", "data"} w linii),
+    Server-Sent Events gdy klient wyśle 'Accept: text/event-stream'.
+    """
+    sse = "text/event-stream" in accept
+
+    def encode(event: str, data: Dict[str, Any]) -> str:
+        if sse:
+            return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        return json.dumps({'event': event, 'data': data}) + "\n"
+
+    async def body():
+        try:
+            async for event, data in stream_scan_for_api(
+                limit_symbols=request.limit_symbols,
+                top_n=request.top_n,
+                interval=request.interval
+            ):
+                yield encode(event, data)
+        except Exception as e:
+            # Nagłówki już wysłane (200) - błąd zgłaszamy jako zdarzenie strumienia
+            print(f"BŁĄD KRYTYCZNY SERWERA (stream): {e}")
+            yield encode('error', {'detail': f"Wystąpił błąd serwera podczas analizy: {e}"})
+
+    media_type = "text/event-stream" if sse else "application/x-ndjson"
+    return StreamingResponse(body(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+class PredictRequest(BaseModel):
+    tickers: Optional[List[str]] = Field(default=None, max_length=inference.MAX_TICKERS,
+                                         description="Tickery yfinance (np. BTC-USD). Domyślnie: tickery z ostatniego treningu.")
+    top_k: Optional[int] = Field(default=None, ge=1, description="Ile pozycji rankingu zwrócić (domyślnie wszystkie).")
+    sentiment: Dict[str, float] = Field(default_factory=dict, description="Opcjonalny sentyment per ticker (brak = 0).")
+
+@app.post("/predict", response_model=Dict[str, Any])
+def post_predict(request: PredictRequest, response: Response):
+    """
+    Ranking prognoz 21-dniowych modelu LightGBM na żądanie: cechy tylko z ostatniego wiersza
+    (okno 64 świec dziennych), jeden batchowy predict dla całego koszyka. Średnia z ensemble crona.
+    """
+    try:
+        result, status = inference.predict(request.tickers, request.top_k, request.sentiment)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Brak wytrenowanego modelu. Uruchom: python run_multiple_simulations_crypto.py")
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    response.headers["X-Cache"] = status
+    return result
+
+@app.get("/live-ranking", response_model=Dict[str, Any])
+def get_live_ranking(interval: str = Query(default='4h', pattern='^(1h|4h|1d)$')):
+    """
+    Ranking aktualizowany na żywo przez demona stream_ingest.py (bez skanowania REST przy żądaniu).
+    """
+    live = load_live_ranking(interval)
+    if live is None:
+        raise HTTPException(status_code=404, detail=f"Brak rankingu na żywo dla {interval}. Uruchom: python stream_ingest.py --interval {interval}")
+    return live
+
+@app.get("/predictions/history", response_model=Dict[str, Any])
+def get_prediction_history(ticker: Optional[str] = None, start: Optional[str] = None, end: Optional[str] = None,
+                           simulation: int = Query(default=results_store.ENSEMBLE_SIMULATION, ge=0),
+                           limit: int = Query(default=1000, ge=1, le=100_000)):
+    """
+    Historia prognoz crona (results_store) z faktycznym zwrotem, gdy horyzont już minął.
+    start/end: zakres dat uruchomienia (ISO, włącznie); simulation=0 to średnia ensemble.
+    """
+    try:
+        rows = results_store.history(ticker, start, end, simulation, limit)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Brak historii prognoz. Uruchom: python run_multiple_simulations_crypto.py")
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Nieprawidłowa data: {e}")
+    rows = rows.astype(object).where(rows.notna(), None)
+    return {'count': len(rows), 'predictions': rows.to_dict(orient='records')}
+
+@app.get("/predictions/accuracy", response_model=Dict[str, Any])
+def get_prediction_accuracy(start: Optional[str] = None, end: Optional[str] = None, ticker: Optional[str] = None,
+                            simulation: int = Query(default=results_store.ENSEMBLE_SIMULATION, ge=0),
+                            top_k: int = Query(default=5, ge=1, le=50)):
+    """Prognoza vs. zrealizowany zwrot: MAE, trafność kierunku, IC, średni zwrot Top K - ogółem i per uruchomienie."""
+    try:
+        return results_store.accuracy(start, end, ticker, simulation, top_k)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Brak historii prognoz. Uruchom: python run_multiple_simulations_crypto.py")
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Nieprawidłowa data: {e}")
+
+@app.get("/upstream-metrics", response_model=Dict[str, Any])
+def get_upstream_metrics():
+    """Metryki zapytań do zewnętrznych API (per endpoint): liczba, ponowienia, błędy, statusy, czasy."""
+    return http_client.get_metrics()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Metryki w formacie Prometheus: czasy etapów skanu, żądania, cache, zapytania upstream, pamięć."""
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
 # Endpoint testowy
 @app.get("/")
 def read_root():
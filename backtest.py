@@ -0,0 +1,162 @@
+# Plik: backtest.py
+# Backtest strategii top-K z train_model_crypto: prognozy walk-forward (trening tylko na targetach
+# znanych w dniu prognozy, z embargo = HORIZON) i wektorowa symulacja portfela na macierzy
+# (data x ticker) - bez pętli po dniach, z dryfem wag między rebalansami. Jeden backtest to ułamek
+# milisekundy, więc siatka setek kombinacji parametrów liczy się w sekundach.
+#
+# Uruchomienie: python backtest.py
+
+import itertools
+import os
+from typing import Any, Dict, Iterable, List, Union
+import numpy as np
+import pandas as pd
+from train_model_crypto import (HORIZON, INITIAL_CAPITAL, RESULTS_DIR, TCOST, TOP_K,
+                                build_feature_matrix, labeled_rows, make_model)
+
+PERIODS_PER_YEAR = 365  # Kryptowaluty notowane są codziennie
+MIN_TRAIN_DATES = 252
+
+# Domyślna siatka parametrów portfela
+GRID_TOP_K = [1, 2, 3, 5, 8]
+GRID_REBALANCE_EVERY = [1, 5, 7, 14, 21]
+GRID_TCOST = [0.0005, TCOST, 0.003]
+
+
+# --- 1. Prognozy walk-forward ---
+def walk_forward_predictions(features: pd.DataFrame, Xcols: List[str], min_train_dates: int = MIN_TRAIN_DATES,
+                             step: int = HORIZON, embargo: int = HORIZON, seed: int = 42, n_jobs: int = -1,
+                             **params) -> pd.DataFrame:
+    """
+    Prognozy poza próbą: daty dzielone są na bloki po `step`; model dla bloku zaczynającego się
+    w dacie i0 jest trenowany tylko na wierszach z datą < daty[i0 - embargo] (ich target jest już
+    znany). Zwraca macierz prognoz (data x ticker).
+    """
+    data = labeled_rows(features)
+    dates = data.index.unique().sort_values()
+    date_pos = dates.searchsorted(data.index)
+    X, y = data[Xcols], data['target']
+
+    params.setdefault('verbose', -1)  # Kilkadziesiąt treningów - bez logów LightGBM
+    preds = []
+    for i0 in range(min_train_dates, len(dates), step):
+        train = date_pos < i0 - embargo
+        test = (date_pos >= i0) & (date_pos < i0 + step)
+        model = make_model(seed=seed, n_jobs=n_jobs, **params)
+        model.fit(X[train], y[train])
+        block = data.loc[test, ['ticker']].copy()
+        block['pred'] = model.predict(X[test])
+        preds.append(block)
+    if not preds:
+        return pd.DataFrame()
+    pred = pd.concat(preds)
+    return pred.pivot(columns='ticker', values='pred').sort_index()
+
+
+def forward_returns(features: pd.DataFrame, like: pd.DataFrame) -> pd.DataFrame:
+    """Zwrot z następnego dnia (data x ticker), wyrównany do macierzy prognoz."""
+    ret_1 = features.pivot(columns='ticker', values='ret_1').sort_index()
+    return ret_1.shift(-1).reindex(index=like.index, columns=like.columns)
+
+
+# --- 2. Symulacja portfela (wektorowo) ---
+def rank_matrix(pred: np.ndarray) -> np.ndarray:
+    """Miejsce każdego tickera w rankingu danego dnia (0 = najwyższa prognoza, NaN na końcu)."""
+    scores = np.where(np.isnan(pred), -np.inf, pred)
+    order = np.argsort(-scores, axis=1, kind='stable')
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.broadcast_to(np.arange(pred.shape[1]), pred.shape), axis=1)
+    return ranks
+
+
+def backtest_topk(pred: Union[pd.DataFrame, np.ndarray], fwd_ret: Union[pd.DataFrame, np.ndarray],
+                  top_k: int = TOP_K, rebalance_every: int = 1, tcost: float = TCOST,
+                  initial_capital: float = INITIAL_CAPITAL, ranks: Union[np.ndarray, None] = None) -> Dict[str, Any]:
+    """
+    Portfel równoważony: co `rebalance_every` dni kupujemy top_k tickerów wg prognozy (równe wagi),
+    a między rebalansami pozycje nie są ruszane - wagi dryfują ze zwrotami aktywów. Koszt = obrót
+    (suma |wagi docelowe - wagi po dryfie| w dniu rebalansu) * tcost.
+    Zwraca statystyki oraz szeregi: equity, drawdown, turnover, net_returns (numpy).
+    """
+    P = np.asarray(pred, dtype='float64')
+    R = np.nan_to_num(np.asarray(fwd_ret, dtype='float64'))
+    ranks = rank_matrix(P) if ranks is None else ranks
+    n_dates = P.shape[0]
+
+    held = (ranks < top_k) & ~np.isnan(P)
+    counts = held.sum(axis=1, keepdims=True)
+    target = np.divide(held, counts, out=np.zeros(P.shape), where=counts > 0)
+    rebalance_rows = np.arange(n_dates) - np.arange(n_dates) % max(1, int(rebalance_every))
+    target = target[rebalance_rows]
+
+    # Dryf: wartość pozycji od dnia rebalansu s rośnie o prod(1 + R) z dni s..t-1 (skumulowane log-zwroty)
+    log_growth = np.cumsum(np.log1p(np.maximum(R, -1 + 1e-12)), axis=0)
+    before = np.vstack([np.zeros((1, P.shape[1])), log_growth[:-1]])  # Wzrost do początku dnia t
+    value = target * np.exp(before - before[rebalance_rows])
+    total = value.sum(axis=1, keepdims=True)
+    weights = np.divide(value, total, out=np.zeros(P.shape), where=total > 0)  # Wagi na początek dnia
+
+    gross = (weights * R).sum(axis=1)
+    # Wagi na koniec dnia (po zwrotach) - od nich liczony jest obrót przy kolejnym rebalansie
+    end_value = weights * (1 + R)
+    end_total = end_value.sum(axis=1, keepdims=True)
+    drifted = np.divide(end_value, end_total, out=np.zeros(P.shape), where=end_total > 0)
+    is_rebalance = rebalance_rows == np.arange(n_dates)
+    pre_trade = np.vstack([np.zeros((1, P.shape[1])), drifted[:-1]])
+    turnover = np.where(is_rebalance, np.abs(target - pre_trade).sum(axis=1), 0.0)
+    net = gross - turnover * tcost
+    equity = initial_capital * np.cumprod(1 + net)
+    drawdown = equity / np.maximum.accumulate(equity) - 1
+
+    years = n_dates / PERIODS_PER_YEAR
+    std = net.std(ddof=1) if n_dates > 1 else 0.0
+    return {
+        'top_k': top_k, 'rebalance_every': rebalance_every, 'tcost': tcost,
+        'total_return': equity[-1] / initial_capital - 1 if n_dates else 0.0,
+        'cagr': (equity[-1] / initial_capital) ** (1 / years) - 1 if n_dates else 0.0,
+        'sharpe': net.mean() / std * np.sqrt(PERIODS_PER_YEAR) if std > 0 else 0.0,
+        'max_drawdown': drawdown.min() if n_dates else 0.0,
+        'avg_turnover': turnover.mean() if n_dates else 0.0,
+        'equity': equity, 'drawdown': drawdown, 'turnover': turnover, 'net_returns': net,
+    }
+
+
+def backtest_grid(pred: pd.DataFrame, fwd_ret: pd.DataFrame, top_ks: Iterable[int] = GRID_TOP_K,
+                  rebalance_every: Iterable[int] = GRID_REBALANCE_EVERY,
+                  tcosts: Iterable[float] = GRID_TCOST) -> pd.DataFrame:
+    """Statystyki dla każdej kombinacji parametrów (ranking liczony raz), posortowane wg Sharpe."""
+    P, R = pred.to_numpy(dtype='float64'), fwd_ret.to_numpy(dtype='float64')
+    ranks = rank_matrix(P)
+    rows = []
+    for k, every, cost in itertools.product(top_ks, rebalance_every, tcosts):
+        res = backtest_topk(P, R, k, every, cost, ranks=ranks)
+        rows.append({key: v for key, v in res.items() if np.ndim(v) == 0})
+    return pd.DataFrame(rows).sort_values('sharpe', ascending=False).reset_index(drop=True)
+
+
+def equity_frame(result: Dict[str, Any], index: pd.Index) -> pd.DataFrame:
+    return pd.DataFrame({k: result[k] for k in ('equity', 'drawdown', 'turnover', 'net_returns')}, index=index)
+
+
+def main():
+    features, Xcols = build_feature_matrix()
+    print("Prognozy walk-forward...")
+    pred = walk_forward_predictions(features, Xcols)
+    if pred.empty:
+        print(f"Za mało historii na walk-forward (potrzeba > {MIN_TRAIN_DATES} dat z targetem).")
+        return
+    fwd_ret = forward_returns(features, pred)
+
+    grid = backtest_grid(pred, fwd_ret)
+    best = grid.iloc[0]
+    result = backtest_topk(pred, fwd_ret, int(best['top_k']), int(best['rebalance_every']), best['tcost'])
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    grid.to_csv(f"{RESULTS_DIR}/backtest_grid.csv", index=False)
+    equity_frame(result, pred.index).to_csv(f"{RESULTS_DIR}/backtest_equity.csv")
+    print(grid.head(10).to_string(index=False))
+    print(f"Zapisano: {RESULTS_DIR}/backtest_grid.csv, {RESULTS_DIR}/backtest_equity.csv")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# Plik: benchmarks/bench_startup.py
+# Czas zimnego startu: import modułów w świeżym procesie (jak start workera uvicorn / rerun Streamlit).
+# Uruchomienie: python benchmarks/bench_startup.py [--runs 5] [--json wynik.json]
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Moduł -> dodatkowy kod po imporcie (np. warmup, by zmierzyć koszt leniwych zależności)
+TARGETS = {
+    'crypto_analyzer': "import crypto_analyzer",
+    'api_server': "import api_server",
+    'crypto_analyzer+warmup': "import crypto_analyzer; crypto_analyzer.warmup()",
+}
+
+_SNIPPET = "import time; t=time.perf_counter(); {code}; print(time.perf_counter()-t)"
+
+
+def time_import(code: str, runs: int) -> dict:
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", _SNIPPET.format(code=code)],
+            cwd=REPO_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip().splitlines()[-1]
+        samples.append(float(out) * 1000)
+    return {'median_ms': statistics.median(samples), 'min_ms': min(samples), 'max_ms': max(samples), 'runs': runs}
+
+
+def slowest_imports(module: str, top: int = 10) -> list:
+    """Najwolniejsze importy wg python -X importtime (czas skumulowany, ms)."""
+    err = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_DIR, capture_output=True, text=True, check=True,
+    ).stderr
+    rows = []
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self_us, cum_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(cum_us) / 1000))
+    return sorted(rows, key=lambda r: r[1], reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark zimnego startu modułów.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", help="Zapis wyników do pliku JSON")
+    args = parser.parse_args()
+
+    results = {}
+    for name, code in TARGETS.items():
+        try:
+            results[name] = time_import(code, args.runs)
+        except subprocess.CalledProcessError as e:
+            results[name] = {'error': (e.stderr or '').strip().splitlines()[-1:]}
+        print(f"{name:28s} {results[name]}")
+
+    results['slowest_imports'] = slowest_imports('crypto_analyzer')
+    print("Najwolniejsze importy (crypto_analyzer):")
+    for mod, ms in results['slowest_imports']:
+        print(f"  {mod:40s} {ms:8.1f} ms")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
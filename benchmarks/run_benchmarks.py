@@ -0,0 +1,192 @@
+# Plik: benchmarks/run_benchmarks.py
+# Benchmark gorących ścieżek na danych syntetycznych (offline): skan rynku, wskaźniki, score,
+# regresje, cechy cenowe, sentyment newsów, trening LGBM i siatka backtestu.
+# Czas (mediana z kilku powtórzeń) + szczyt pamięci (tracemalloc), wynik w JSON.
+#
+# Uruchomienie:
+#   python benchmarks/run_benchmarks.py [--size quick|default|large] [--json wynik.json]
+#   python benchmarks/run_benchmarks.py --compare poprzedni.json [--threshold 0.2]   # kod 1 przy regresji
+
+import argparse
+import atexit
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+# Magazyny na dysku w katalogu tymczasowym - benchmark nie dotyka danych produkcyjnych
+_TMP_DIR = tempfile.mkdtemp(prefix="cryptoai_bench_")
+atexit.register(shutil.rmtree, _TMP_DIR, ignore_errors=True)
+os.environ["CANDLE_STORE_DIR"] = os.path.join(_TMP_DIR, "candle_store")
+os.environ["MODEL_DIR"] = os.path.join(_TMP_DIR, "models")
+os.environ["SENTIMENT_CACHE_PATH"] = os.path.join(_TMP_DIR, "sentiment.sqlite")
+
+import numpy as np
+import pandas as pd
+import synthetic
+
+SIZES = {
+    'quick':   dict(symbols=50,   bars=100,  tickers=10, days=365,  articles=20),
+    'default': dict(symbols=200,  bars=500,  tickers=15, days=730,  articles=50),
+    'large':   dict(symbols=1000, bars=1000, tickers=50, days=1460, articles=200),
+}
+DEFAULT_THRESHOLD = 0.2  # Regresja: mediana wolniejsza o > 20% niż w pliku porównawczym
+
+
+def _vader_available() -> bool:
+    import nltk
+    try:
+        nltk.data.find('sentiment/vader_lexicon.zip')
+        return True
+    except LookupError:
+        return False
+
+
+def build_cases(size: Dict[str, int], seed: int = 0) -> Dict[str, Callable[[], Any]]:
+    """Nazwa -> funkcja bez argumentów. Przygotowanie danych odbywa się tutaj, poza pomiarem."""
+    import backtest
+    import crypto_analyzer as ca
+    import sentiment
+    from features_prices import price_features_from_panel
+    from train_model_crypto import labeled_rows, make_model
+
+    interval = '4h'
+    frames = synthetic.universe(size['symbols'], interval, size['bars'], seed)
+    fetcher = synthetic.make_fetcher(frames, interval, seed)
+    analyzed = {sym: ca.technical_analysis(df.copy()) for sym, df in frames.items()}
+    latest = [df.iloc[-1] for df in analyzed.values()]
+    avg_vol = np.array([df['Volume'].tail(50).mean() for df in analyzed.values()])
+    close, volume = synthetic.price_panel(size['tickers'], size['days'], seed)
+    features, Xcols = synthetic.feature_matrix(size['tickers'], size['days'], seed)
+    train = labeled_rows(features)
+    rng = np.random.default_rng(seed)
+    pred = pd.DataFrame(rng.normal(size=(size['days'], size['tickers'])))
+    fwd_ret = pd.DataFrame(rng.normal(0, 0.03, size=(size['days'], size['tickers'])))
+
+    cases = {
+        'scan_market': lambda: ca.scan_market(top_n=10, interval=interval, klines_limit=size['bars'],
+                                              symbols=list(frames), fetcher=fetcher),
+        'technical_analysis': lambda: [ca.technical_analysis(df.copy()) for df in frames.values()],
+        'score_universe': lambda: ca.score_universe(
+            np.array([r['RSI'] for r in latest]), np.array([r['Close'] for r in latest]),
+            np.array([r['SMA_20'] for r in latest]), np.array([r['Volume'] for r in latest]), avg_vol),
+        'forecast_universe': lambda: ca.forecast_universe(analyzed, interval),
+        'price_features': lambda: price_features_from_panel(close, volume),
+        'lgbm_train': lambda: make_model(verbose=-1).fit(train[Xcols], train['target']),
+        'backtest_grid': lambda: backtest.backtest_grid(pred, fwd_ret),
+    }
+    if _vader_available():
+        articles = synthetic.news_articles(synthetic.tickers(size['tickers']), size['articles'], seed=seed)
+
+        def news_sentiment():
+            # Zimny przebieg: bez memoizacji z poprzednich powtórzeń
+            sentiment._lru = sentiment._LRUCache(sentiment.LRU_SIZE)
+            if os.path.exists(sentiment.SENTIMENT_CACHE_PATH):
+                os.remove(sentiment.SENTIMENT_CACHE_PATH)
+            return sentiment.daily_sentiment(articles)
+        cases['news_sentiment'] = news_sentiment
+    else:
+        print("Brak leksykonu VADER (nltk) - pomijam news_sentiment.")
+    return cases
+
+
+def measure(fn: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    """Mediana/min czasu z `repeat` przebiegów (po jednym rozgrzewkowym) i szczyt pamięci z osobnego przebiegu."""
+    fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'median_s': statistics.median(samples), 'min_s': min(samples), 'max_s': max(samples),
+            'runs': repeat, 'peak_mb': peak / 2**20}
+
+
+def environment() -> Dict[str, Any]:
+    import lightgbm
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(), 'commit': commit,
+        'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count(),
+        'numpy': np.__version__, 'pandas': pd.__version__, 'lightgbm': lightgbm.__version__,
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """Przypadki wolniejsze niż w baseline o więcej niż `threshold` (względnie, po medianie)."""
+    regressions = []
+    for name, res in results['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if not base:
+            continue
+        ratio = res['median_s'] / base['median_s'] if base['median_s'] > 0 else float('inf')
+        res['vs_baseline'] = ratio
+        if ratio > 1 + threshold:
+            regressions.append({'case': name, 'ratio': ratio, 'median_s': res['median_s'], 'baseline_s': base['median_s']})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark gorących ścieżek na danych syntetycznych.")
+    parser.add_argument("--size", choices=list(SIZES), default="default")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="*", help="Tylko wybrane przypadki")
+    parser.add_argument("--json", help="Zapis wyników do pliku JSON")
+    parser.add_argument("--compare", help="Plik JSON z poprzedniego uruchomienia (baseline)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    size = SIZES[args.size]
+    print(f"Rozmiar '{args.size}': {size}")
+    cases = build_cases(size, args.seed)
+    results = {'environment': environment(), 'size': dict(size, name=args.size, seed=args.seed), 'results': {}}
+    for name, fn in cases.items():
+        if args.only and name not in args.only:
+            continue
+        results['results'][name] = res = measure(fn, args.repeat)
+        print(f"{name:20s} mediana {res['median_s']*1000:10.2f} ms   min {res['min_s']*1000:10.2f} ms   "
+              f"pamięć {res['peak_mb']:8.1f} MB")
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get('size', {}).get('name') != args.size:
+            print(f"UWAGA: baseline ma inny rozmiar ({baseline.get('size', {}).get('name')}) - porównanie orientacyjne.")
+        regressions = compare(results, baseline, args.threshold)
+        results['regressions'] = regressions
+        for r in regressions:
+            print(f"REGRESJA: {r['case']} {r['ratio']:.2f}x ({r['baseline_s']*1000:.2f} -> {r['median_s']*1000:.2f} ms)")
+        if not regressions:
+            print(f"Brak regresji powyżej {args.threshold:.0%}.")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
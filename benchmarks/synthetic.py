@@ -0,0 +1,104 @@
+# Plik: benchmarks/synthetic.py
+# Deterministyczne dane syntetyczne do benchmarków (bez Binance / Yahoo / NewsAPI):
+# świece OHLCV per symbol, panele cen/wolumenów (data x ticker), nagłówki newsów i macierz cech.
+# Ten sam seed i rozmiar -> identyczne dane, więc wyniki kolejnych uruchomień są porównywalne.
+
+import zlib
+from typing import Dict, List
+import numpy as np
+import pandas as pd
+
+INTERVAL_FREQ = {'1h': 'h', '4h': '4h', '1d': 'D'}
+END = pd.Timestamp('2025-01-01')  # Stały koniec szeregu - niezależny od daty uruchomienia
+
+_WORDS = np.array([
+    'bitcoin', 'rally', 'crash', 'surge', 'drop', 'record', 'high', 'low', 'investors', 'fear',
+    'greed', 'regulation', 'approval', 'ban', 'hack', 'upgrade', 'partnership', 'lawsuit', 'gains',
+    'losses', 'bullish', 'bearish', 'market', 'exchange', 'token', 'whales', 'adoption', 'strong', 'weak',
+])
+
+
+def _rng(seed: int, key: str = "") -> np.random.Generator:
+    """Generator zależny od seeda i klucza (np. symbolu) - stabilny między procesami (bez hash())."""
+    return np.random.default_rng([seed, zlib.crc32(key.encode())])
+
+
+def symbols(n: int) -> List[str]:
+    return [f"SYN{i:04d}USDT" for i in range(n)]
+
+
+def tickers(n: int) -> List[str]:
+    return [f"SYN{i:03d}-USD" for i in range(n)]
+
+
+def _random_walk(rng: np.random.Generator, n: int, vol: float = 0.02) -> np.ndarray:
+    return 100 * np.exp(np.cumsum(rng.normal(0.0002, vol, n)))
+
+
+def ohlcv(symbol: str, interval: str = '4h', n_bars: int = 100, seed: int = 0) -> pd.DataFrame:
+    """Świece w formacie fetch_crypto_data (index 'Open time', kolumny Open/High/Low/Close/Volume)."""
+    rng = _rng(seed, symbol)
+    close = _random_walk(rng, n_bars)
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.005, n_bars))
+    index = pd.date_range(end=END, periods=n_bars, freq=INTERVAL_FREQ[interval], name='Open time')
+    return pd.DataFrame({
+        'Open': open_,
+        'High': np.maximum(open_, close) * (1 + spread),
+        'Low': np.minimum(open_, close) * (1 - spread),
+        'Close': close,
+        'Volume': rng.lognormal(8, 1, n_bars),
+    }, index=index)
+
+
+def universe(n_symbols: int, interval: str = '4h', n_bars: int = 100, seed: int = 0) -> Dict[str, pd.DataFrame]:
+    return {sym: ohlcv(sym, interval, n_bars, seed) for sym in symbols(n_symbols)}
+
+
+def make_fetcher(frames: Dict[str, pd.DataFrame], interval: str = '4h', seed: int = 0):
+    """Zamiennik fetch_crypto_data dla skanu: ramki z pamięci (nieznany symbol -> generowany na żądanie)."""
+    def fetch(symbol: str, interval_: str = interval, limit: int = 100) -> pd.DataFrame:
+        df = frames.get(symbol)
+        if df is None:
+            df = ohlcv(symbol, interval_, limit, seed)
+        return df.tail(limit)
+    return fetch
+
+
+def price_panel(n_tickers: int, n_days: int, seed: int = 0):
+    """(close, volume) - szerokie ramki (data x ticker) jak z yf.download."""
+    names = tickers(n_tickers)
+    index = pd.date_range(end=END, periods=n_days, freq='D', name='Date')
+    close = pd.DataFrame({t: _random_walk(_rng(seed, t), n_days, 0.03) for t in names}, index=index)
+    volume = pd.DataFrame({t: _rng(seed + 1, t).lognormal(15, 0.5, n_days) for t in names}, index=index)
+    return close, volume
+
+
+def news_articles(ticker_names: List[str], per_ticker: int = 50, days: int = 7, seed: int = 0) -> Dict[str, List[Dict[str, str]]]:
+    """Nagłówki w formacie fetch_newsapi_articles (title, description, publishedAt)."""
+    out = {}
+    for t in ticker_names:
+        rng = _rng(seed, t)
+        published = END - pd.to_timedelta(rng.uniform(0, days * 86400, per_ticker), unit='s')
+        out[t] = [
+            {'title': f"{t} " + " ".join(rng.choice(_WORDS, 6)),
+             'description': " ".join(rng.choice(_WORDS, 15)),
+             'publishedAt': ts.strftime('%Y-%m-%dT%H:%M:%SZ')}
+            for ts in published
+        ]
+    return out
+
+
+def news_features(ticker_names: List[str], n_days: int = 7, seed: int = 0) -> pd.DataFrame:
+    """Dzienny sentyment ticker|date|sentiment (jak build_news_features) bez oceniania VADER-em."""
+    dates = pd.date_range(end=END, periods=n_days, freq='D')
+    rows = [(t, d, float(v)) for t in ticker_names for d, v in zip(dates, _rng(seed, t).uniform(-1, 1, n_days))]
+    return pd.DataFrame(rows, columns=['ticker', 'date', 'sentiment'])
+
+
+def feature_matrix(n_tickers: int, n_days: int, seed: int = 0):
+    """(features, Xcols) jak train_model_crypto.build_feature_matrix, ale z danych syntetycznych."""
+    from features_prices import price_features_from_panel
+    from train_model_crypto import assemble_features
+    close, volume = price_panel(n_tickers, n_days, seed)
+    return assemble_features(price_features_from_panel(close, volume), news_features(list(close.columns), seed=seed))
@@ -0,0 +1,193 @@
+# Plik: candle_store.py
+# Lokalny, kolumnowy magazyn świec OHLCV (jeden plik Parquet na symbol i interwał).
+# Trzymamy tylko świece ZAMKNIĘTE - bieżąca (otwarta) świeca zawsze przychodzi świeżo z API.
+# Dopisywanie nie przepisuje całego pliku: nowe świece są dopisywane na koniec pliku delta
+# (<symbol>_<interwał>.delta, rekordy binarne stałej długości), a po DELTA_COMPACT_ROWS świecach
+# delta jest scalana z plikiem głównym.
+
+import os
+import threading
+from typing import Union
+import numpy as np
+import pandas as pd
+
+CANDLE_STORE_DIR = os.environ.get("CANDLE_STORE_DIR", "candle_store")
+MAX_STORED_BARS = 3000  # Ile zamkniętych świec trzymamy na symbol/interwał (1h jako baza dla 1d: 100 x 24 + zapas)
+DELTA_COMPACT_ROWS = int(os.environ.get("CANDLE_DELTA_COMPACT", 48))  # Scalanie po tylu świecach w delcie (2 doby świec 1h)
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+STORE_COLUMNS = OHLCV_COLUMNS + ['Close time']
+# Rekord pliku delta: 'Open time' (ms) + STORE_COLUMNS
+DELTA_DTYPE = np.dtype([('open_ms', '<i8')] + [(c, '<f8') for c in OHLCV_COLUMNS] + [('Close time', '<i8')])
+
+# Długość interwałów Binance w milisekundach
+INTERVAL_MS = {
+    '1m': 60_000, '3m': 3 * 60_000, '5m': 5 * 60_000, '15m': 15 * 60_000, '30m': 30 * 60_000,
+    '1h': 3_600_000, '2h': 2 * 3_600_000, '4h': 4 * 3_600_000, '6h': 6 * 3_600_000,
+    '8h': 8 * 3_600_000, '12h': 12 * 3_600_000, '1d': 86_400_000, '3d': 3 * 86_400_000,
+    '1w': 7 * 86_400_000,
+}
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def interval_to_ms(interval: str) -> int:
+    """Długość interwału w ms (ValueError dla nieznanego interwału)."""
+    try:
+        return INTERVAL_MS[interval]
+    except KeyError:
+        raise ValueError(f"Nieobsługiwany interwał: {interval}")
+
+
+def store_path(symbol: str, interval: str) -> str:
+    return os.path.join(CANDLE_STORE_DIR, f"{symbol}_{interval}.parquet")
+
+
+def _lock_for(path: str) -> threading.Lock:
+    with _locks_guard:
+        return _locks.setdefault(path, threading.Lock())
+
+
+def empty_candles() -> pd.DataFrame:
+    df = pd.DataFrame({c: pd.Series(dtype='float64') for c in OHLCV_COLUMNS})
+    df['Close time'] = pd.Series(dtype='int64')
+    df.index = pd.DatetimeIndex([], name='Open time')
+    return df
+
+
+def delta_path(symbol: str, interval: str) -> str:
+    return os.path.join(CANDLE_STORE_DIR, f"{symbol}_{interval}.delta")
+
+
+def _read_delta(symbol: str, interval: str) -> pd.DataFrame:
+    """Świece z pliku delta w kolejności dopisania. Niepełny ostatni rekord (przerwany zapis) jest pomijany."""
+    try:
+        with open(delta_path(symbol, interval), 'rb') as f:
+            raw = f.read()
+    except OSError:
+        return empty_candles()
+    records = np.frombuffer(raw[:len(raw) // DELTA_DTYPE.itemsize * DELTA_DTYPE.itemsize], dtype=DELTA_DTYPE)
+    return pd.DataFrame({c: records[c] for c in STORE_COLUMNS},
+                        index=pd.DatetimeIndex(pd.to_datetime(records['open_ms'], unit='ms'), name='Open time'))
+
+
+def load_candles(symbol: str, interval: str) -> pd.DataFrame:
+    """Wczytuje zapisane zamknięte świece (plik główny + delta). Brak pliku / uszkodzony plik -> pusta ramka."""
+    path = store_path(symbol, interval)
+    base = empty_candles()
+    if os.path.exists(path):
+        try:
+            base = pd.read_parquet(path)
+        except Exception:
+            pass
+    delta = _read_delta(symbol, interval)
+    if delta.empty:
+        return base
+    merged = pd.concat([base, delta]) if not base.empty else delta
+    return merged[~merged.index.duplicated(keep='last')].sort_index().tail(MAX_STORED_BARS)
+
+
+def save_candles(symbol: str, interval: str, df: pd.DataFrame) -> None:
+    """
+    Zapis całej historii do pliku głównego - atomowo (plik tymczasowy + os.replace), aby czytelnik
+    nie zobaczył połowy pliku. Świece z delty są już w `df`, więc delta jest usuwana.
+    """
+    path = store_path(symbol, interval)
+    os.makedirs(CANDLE_STORE_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    df[STORE_COLUMNS].tail(MAX_STORED_BARS).to_parquet(tmp_path)
+    os.replace(tmp_path, path)
+    try:
+        os.remove(delta_path(symbol, interval))
+    except OSError:
+        pass
+
+
+def _append_delta(symbol: str, interval: str, rows: pd.DataFrame) -> int:
+    """Dopisuje świece na koniec pliku delta (O(liczba świec), bez odczytu historii). Zwraca liczbę rekordów w pliku."""
+    records = np.empty(len(rows), dtype=DELTA_DTYPE)
+    records['open_ms'] = pd.DatetimeIndex(rows.index).as_unit('ms').asi8
+    for c in STORE_COLUMNS:
+        records[c] = rows[c].to_numpy()
+    with open(delta_path(symbol, interval), 'ab') as f:
+        torn = f.tell() % DELTA_DTYPE.itemsize
+        if torn:
+            f.truncate(f.tell() - torn)  # Niepełny rekord po przerwanym zapisie - kolejne byłyby przesunięte
+        f.write(records.tobytes())
+        return f.tell() // DELTA_DTYPE.itemsize
+
+
+def append_candles(symbol: str, interval: str, closed: pd.DataFrame, replace: bool = False) -> pd.DataFrame:
+    """
+    Dokleja zamknięte świece do magazynu (duplikaty wg 'Open time' -> wygrywa nowsza wersja).
+    Tylko nowe lub zmienione świece są dopisywane do pliku delta; bez zmian - bez zapisu.
+    replace=True nadpisuje całą historię (np. gdy powstała luka w danych).
+    Zwraca pełną, zapisaną historię.
+    """
+    with _lock_for(store_path(symbol, interval)):
+        if replace:
+            if not closed.empty:
+                save_candles(symbol, interval, closed)
+            return closed.tail(MAX_STORED_BARS)
+        stored = load_candles(symbol, interval)
+        if closed.empty:
+            return stored.tail(MAX_STORED_BARS)
+        closed = closed[~closed.index.duplicated(keep='last')]
+        known = closed.index.isin(stored.index)
+        if known.any():
+            old = stored.loc[closed.index[known], STORE_COLUMNS].to_numpy()
+            same = (old == closed.loc[known, STORE_COLUMNS].to_numpy()).all(axis=1)
+            changed = ~known
+            changed[known.nonzero()[0][~same]] = True
+        else:
+            changed = np.ones(len(closed), dtype=bool)
+        if not changed.any():
+            return stored.tail(MAX_STORED_BARS)  # Wszystkie świece już zapisane - bez zapisu
+        merged = pd.concat([stored, closed[changed]]) if not stored.empty else closed[changed]
+        merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+        if stored.empty or _append_delta(symbol, interval, closed[changed]) >= DELTA_COMPACT_ROWS:
+            save_candles(symbol, interval, merged)  # Pierwszy zapis lub scalenie delty z plikiem głównym
+        return merged.tail(MAX_STORED_BARS)
+
+
+def is_contiguous(df: pd.DataFrame, interval: str, start_ms: Union[int, None] = None) -> bool:
+    """Czy świece następują co `interval` bez luk; start_ms: oczekiwany 'Open time' (ms) pierwszej świecy."""
+    if df.empty:
+        return start_ms is None
+    open_ms = pd.DatetimeIndex(df.index).as_unit('ms').asi8
+    if start_ms is not None and open_ms[0] != start_ms:
+        return False
+    return bool((np.diff(open_ms) == interval_to_ms(interval)).all())
+
+
+def resample_candles(base: pd.DataFrame, interval: str, base_interval: str) -> pd.DataFrame:
+    """
+    Świece `interval` złożone ze świec `base_interval` (open = pierwsza, high = max, low = min,
+    close = ostatnia, volume = suma). Granice liczone od epoki UTC, jak na Binance (1d od 00:00 UTC).
+    Niepełny pierwszy przedział (historia zaczyna się w jego środku) jest pomijany.
+    Zwraca ramkę STORE_COLUMNS; 'Close time' = koniec przedziału (ms), także dla bieżącego, otwartego.
+    """
+    step_ms, base_ms = interval_to_ms(interval), interval_to_ms(base_interval)
+    if step_ms % base_ms:
+        raise ValueError(f"Interwał {interval} nie jest wielokrotnością {base_interval}")
+    if base.empty:
+        return empty_candles()
+
+    open_ms = pd.DatetimeIndex(base.index).as_unit('ms').asi8
+    bucket = open_ms // step_ms
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])  # Baza posortowana po czasie
+    ends = np.r_[starts[1:], len(bucket)] - 1
+    values = {c: base[c].to_numpy(dtype='float64') for c in OHLCV_COLUMNS}
+    open_time = bucket[starts] * step_ms
+    out = pd.DataFrame({
+        'Open': values['Open'][starts],
+        'High': np.maximum.reduceat(values['High'], starts),
+        'Low': np.minimum.reduceat(values['Low'], starts),
+        'Close': values['Close'][ends],
+        'Volume': np.add.reduceat(values['Volume'], starts),
+        'Close time': open_time + step_ms - 1,
+    }, index=pd.DatetimeIndex(pd.to_datetime(open_time, unit='ms'), name='Open time'))
+    if open_ms[0] != open_time[0]:
+        out = out.iloc[1:]
+    return out
@@ -1,18 +1,29 @@
+import asyncio
+import os
+import threading
+import numpy as np
 import pandas as pd
-import requests
 import time
 import random
-from typing import List, Dict, Any, Union
-from sklearn.linear_model import LinearRegression
-import nltk
-
-# --- NLTK Vader ---
-try:
-    nltk.data.find('sentiment/vader_lexicon.zip')
-except LookupError:
-    nltk.download('vader_lexicon')
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
-SID = SentimentIntensityAnalyzer()
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Dict, Any, Union
+import candle_store
+import http_client
+import indicators
+import metrics
+import sentiment
+
+# --- Ciężkie zależności ładowane leniwie ---
+# nltk/VADER nie jest importowany przy starcie modułu (start workera uvicorn,
+# każdy rerun Streamlit); ładuje się przy pierwszym użyciu albo w warmup().
+
+def get_sentiment_analyzer():
+    """VADER SentimentIntensityAnalyzer (tworzony przy pierwszym użyciu)."""
+    return sentiment.get_analyzer()
+
+def warmup() -> None:
+    """Wstępne załadowanie leniwych zależności (np. w lifespan FastAPI), aby pierwsze żądanie było szybkie."""
+    get_sentiment_analyzer()
 
 # --- 1. POBIERANIE DANYCH ---
 
@@ -20,10 +31,9 @@ def fetch_top_symbols(limit: int = 50) -> List[str]:
     """Pobiera top symbole USDT wg wolumenu z Binance. Fallback: zwraca pustą listę."""
     url = "https://api.binance.com/api/v3/ticker/24hr"
     try:
-        r = requests.get(url, timeout=10)
-        r.raise_for_status()
-        tickers = r.json()
-    except Exception:
+        tickers = http_client.get(url).json()
+    except Exception as e:
+        print(f"Binance: błąd pobierania listy symboli: {e}")
         return []
 
     MIN_VOLUME = 500_000
@@ -36,33 +46,155 @@ def fetch_top_symbols(limit: int = 50) -> List[str]:
     usdt_pairs.sort(key=lambda x: float(x['quoteVolume']), reverse=True)
     return [t['symbol'] for t in usdt_pairs[:limit]] or []
 
-def fetch_crypto_data(symbol: str='BTCUSDT', interval: str='1h', limit: int=100) -> pd.DataFrame:
-    """Pobiera dane OHLCV z Binance. Fallback: zwraca 10 wierszy losowych danych."""
+KLINE_COLUMNS = [
+    'Open time','Open','High','Low','Close','Volume','Close time',
+    'Quote asset volume','Number of trades','Taker buy base asset volume',
+    'Taker buy quote asset volume','Ignore'
+]
+MAX_KLINES_PER_REQUEST = 1000  # Limit Binance dla /api/v3/klines
+
+def _request_klines(symbol: str, interval: str, limit: int, start_time: Union[int, None] = None) -> pd.DataFrame:
+    """
+    Zapytanie do /api/v3/klines -> ramka OHLCV + 'Close time' (ms). Powyżej MAX_KLINES_PER_REQUEST
+    świec - kolejne strony od startTime (bez start_time: okno `limit` świec kończące się teraz).
+    """
+    if limit > MAX_KLINES_PER_REQUEST:
+        step_ms = candle_store.interval_to_ms(interval)
+        if start_time is None:
+            start_time = (int(time.time()*1000)//step_ms - int(limit) + 1) * step_ms
+        pages = []
+        while limit > 0:
+            page = _request_klines(symbol, interval, min(limit, MAX_KLINES_PER_REQUEST), start_time)
+            pages.append(page)
+            limit -= len(page)
+            if len(page) < MAX_KLINES_PER_REQUEST:
+                break  # Doszliśmy do bieżącej świecy
+            start_time = int(page['Close time'].iloc[-1]) + 1
+        return pd.concat(pages)
     url = "https://api.binance.com/api/v3/klines"
-    params = {'symbol': symbol, 'interval': interval, 'limit': limit}
+    params = {'symbol': symbol, 'interval': interval, 'limit': int(limit)}
+    if start_time is not None:
+        params['startTime'] = int(start_time)
+    df = pd.DataFrame(http_client.get(url, params=params).json(), columns=KLINE_COLUMNS)
+    df[['Open','High','Low','Close','Volume']] = df[['Open','High','Low','Close','Volume']].astype(float)
+    df['Close time'] = df['Close time'].astype('int64')
+    df['Open time'] = pd.to_datetime(df['Open time'], unit='ms')
+    df.set_index('Open time', inplace=True)
+    return df[candle_store.STORE_COLUMNS]
+
+def fetch_crypto_data(symbol: str='BTCUSDT', interval: str='1h', limit: int=100, use_store: bool=True) -> pd.DataFrame:
+    """
+    Pobiera dane OHLCV z Binance przez lokalny magazyn świec: z API pobierane są tylko świece
+    po ostatnim zapisanym 'Close time' (+ bieżąca, otwarta świeca), reszta jest czytana z dysku.
+    Błąd API (po ponowieniach w http_client): dane z magazynu, a gdy ich brak - pusta ramka.
+    """
+    stored = candle_store.load_candles(symbol, interval) if use_store else candle_store.empty_candles()
     try:
-        r = requests.get(url, params=params, timeout=10)
-        r.raise_for_status()
-        klines = r.json()
-        df = pd.DataFrame(klines, columns=[
-            'Open time','Open','High','Low','Close','Volume','Close time',
-            'Quote asset volume','Number of trades','Taker buy base asset volume',
-            'Taker buy quote asset volume','Ignore'
-        ])
-        df[['Open','High','Low','Close','Volume']] = df[['Open','High','Low','Close','Volume']].astype(float)
-        df['Open time'] = pd.to_datetime(df['Open time'], unit='ms')
-        df.set_index('Open time', inplace=True)
-        return df[['Open','High','Low','Close','Volume']]
-    except Exception:
-        # Fallback - sztuczne dane
-        df = pd.DataFrame({
-            'Open': [random.uniform(10,100) for _ in range(10)],
-            'High': [random.uniform(10,100) for _ in range(10)],
-            'Low': [random.uniform(10,100) for _ in range(10)],
-            'Close': [random.uniform(10,100) for _ in range(10)],
-            'Volume': [random.uniform(1000,5000) for _ in range(10)]
-        }, index=pd.date_range(end=pd.Timestamp.now(), periods=10, freq=interval.upper()))
-        return df
+        now_ms = int(time.time()*1000)
+        step_ms = candle_store.interval_to_ms(interval)
+        incremental = False
+        if not stored.empty:
+            last_close = int(stored['Close time'].iloc[-1])
+            missing = max(0, (now_ms - last_close)//step_ms) + 1
+            # Inkrementalnie tylko, gdy magazyn + brakujące świece pokrywają żądane okno bez luki
+            incremental = len(stored) + missing >= limit
+        metrics.cache_result('candle_store', 'hit' if incremental else 'miss')
+        if incremental:
+            fresh = _request_klines(symbol, interval, missing + 1, start_time=last_close + 1)
+            if not candle_store.is_contiguous(fresh, interval, start_ms=last_close + 1):
+                # Świece nie zaczynają się tuż po zapisanej historii (np. przestój dłuższy niż strona) -
+                # doklejenie zostawiłoby lukę, więc pobieramy całe okno od nowa
+                print(f"Binance: luka w świecach {symbol} {interval} po {pd.to_datetime(last_close + 1, unit='ms')} - pobieram całe okno")
+                incremental = False
+        if not incremental:
+            fresh = _request_klines(symbol, interval, limit)
+        closed = fresh[fresh['Close time'] < now_ms]
+        live = fresh[fresh['Close time'] >= now_ms]
+        if use_store:
+            history = candle_store.append_candles(symbol, interval, closed, replace=not incremental)
+        else:
+            history = closed
+        df = pd.concat([history, live]) if not live.empty else history
+        df = df[~df.index.duplicated(keep='last')]
+        return df[['Open','High','Low','Close','Volume']].tail(limit)
+    except Exception as e:
+        if not stored.empty:
+            print(f"Binance: błąd klines {symbol} {interval} ({e}) - używam {len(stored)} świec z magazynu")
+            return stored[['Open','High','Low','Close','Volume']].tail(limit)
+        print(f"Binance: błąd klines {symbol} {interval} ({e}) - brak danych")
+        return stored[['Open','High','Low','Close','Volume']]
+
+# --- 1b. MULTI-TIMEFRAME ---
+# Z Binance pobieramy tylko interwał bazowy; grubsze świece są składane lokalnie (candle_store.resample_candles)
+# i zapisywane w magazynie obok bazy. Jedno pobranie bazy obsługuje skany wszystkich interwałów.
+BASE_INTERVAL = '1h'
+BASE_REUSE_SECONDS = int(os.environ.get("BASE_REUSE_SECONDS", 60))  # Świeże pobranie bazy wspólne dla interwałów
+BASE_WINDOW_BARS = 101 * 24  # Okno bazy pobierane zawsze w całości - starcza na 100 świec 1d
+_base_frames: Dict[str, Any] = {}  # symbol -> (monotonic, ramka bazowa)
+_base_lock = threading.Lock()
+
+def _fetch_base(symbol: str, limit: int, use_store: bool) -> pd.DataFrame:
+    """Świece bazowe; pobranie sprzed < BASE_REUSE_SECONDS (z co najmniej `limit` świecami) jest używane ponownie."""
+    window = max(int(limit), BASE_WINDOW_BARS)
+    with _base_lock:
+        cached = _base_frames.get(symbol)
+    if use_store and cached is not None and time.monotonic() - cached[0] < BASE_REUSE_SECONDS and len(cached[1]) >= limit:
+        metrics.cache_result('base_candles', 'hit')
+        return cached[1].tail(limit)
+    metrics.cache_result('base_candles', 'miss')
+    df = fetch_crypto_data(symbol, BASE_INTERVAL, window, use_store)
+    if use_store and not df.empty:
+        with _base_lock:
+            _base_frames[symbol] = (time.monotonic(), df)
+    return df.tail(limit)
+
+def fetch_timeframe(symbol: str = 'BTCUSDT', interval: str = '4h', limit: int = 100, use_store: bool = True) -> pd.DataFrame:
+    """
+    Jak fetch_crypto_data, ale interwały grubsze od BASE_INTERVAL są składane ze świec bazowych.
+    Zamknięte złożone świece trafiają do magazynu, więc po pierwszym razie składany jest tylko ogon.
+    """
+    step_ms, base_ms = candle_store.interval_to_ms(interval), candle_store.interval_to_ms(BASE_INTERVAL)
+    if step_ms == base_ms:
+        return _fetch_base(symbol, limit, use_store)
+    if step_ms < base_ms or step_ms % base_ms:
+        return fetch_crypto_data(symbol, interval, limit, use_store)
+    ratio = step_ms // base_ms
+    now_ms = int(time.time()*1000)
+    stored = candle_store.load_candles(symbol, interval) if use_store else candle_store.empty_candles()
+    incremental = False
+    if not stored.empty:
+        last_close = int(stored['Close time'].iloc[-1])
+        missing = max(0, (now_ms - last_close)//step_ms) + 1
+        incremental = len(stored) + missing >= limit
+    # Inkrementalnie: baza tylko od końca ostatniej zapisanej świecy; inaczej całe okno (+ przedział na wyrównanie)
+    base_limit = (missing if incremental else limit + 1) * ratio
+    base = _fetch_base(symbol, int(base_limit), use_store)
+    if base.empty:
+        return stored[['Open','High','Low','Close','Volume']].tail(limit)  # Baza niedostępna - to, co w magazynie
+    if incremental:
+        tail = base[base.index >= pd.to_datetime(last_close + 1, unit='ms')]
+        if candle_store.is_contiguous(tail, BASE_INTERVAL, start_ms=last_close + 1):
+            base = tail
+        else:
+            # Baza nie pokrywa godzin od ostatniej zapisanej świecy (lub ma dziurę) - składanie z niej
+            # dałoby przedziały z niesąsiednich godzin; zapisane świece są odrzucane i składane od nowa
+            print(f"Binance: luka w świecach bazowych {symbol} po {pd.to_datetime(last_close + 1, unit='ms')} - "
+                  f"składam {interval} od nowa")
+            incremental = False
+            base = _fetch_base(symbol, (limit + 1) * ratio, use_store)
+            if not candle_store.is_contiguous(base, BASE_INTERVAL):
+                print(f"Binance: luka w świecach bazowych {symbol} także w pełnym oknie (przerwa w notowaniach?) - "
+                      f"przedziały {interval} wokół niej są niepełne")
+    bars = candle_store.resample_candles(base, interval, BASE_INTERVAL)
+    closed = bars[bars['Close time'] < now_ms]
+    live = bars[bars['Close time'] >= now_ms]
+    if use_store:
+        history = candle_store.append_candles(symbol, interval, closed, replace=not incremental)
+    else:
+        history = closed
+    df = pd.concat([history, live]) if not live.empty else history
+    df = df[~df.index.duplicated(keep='last')]
+    return df[['Open','High','Low','Close','Volume']].tail(limit)
 
 # --- 2. TECHNICAL ANALYSIS ---
 
@@ -81,29 +213,36 @@ def technical_analysis(df: pd.DataFrame) -> pd.DataFrame:
     df['RSI'] = 100-(100/(1+rs))
     return df
 
+SUGGESTIONS = np.array(["TRZYMAJ", "MOCNE KUPNO", "KUPNO", "MOCNA SPRZEDAŻ", "SPRZEDAŻ", "Brak danych"], dtype=object)
+
+def score_universe(rsi, close, sma, volume, avg_volume):
+    """
+    Score dla całego uniwersum naraz (tablice o tej samej długości; NaN = brak wartości).
+    Reguły jak w score_asset. Zwraca (scores: int ndarray, suggestions: ndarray str).
+    """
+    rsi, close, sma, volume, avg_volume = (np.asarray(a, dtype='float64') for a in (rsi, close, sma, volume, avg_volume))
+    with np.errstate(invalid='ignore'):
+        # RSI
+        rsi_rules = [rsi < 30, rsi < 40, rsi > 70, rsi > 60]
+        score = np.select(rsi_rules, [60, 30, -60, -30], default=0)
+        sugestion = SUGGESTIONS[np.select(rsi_rules, [1, 2, 3, 4], default=0)]
+        # Trend
+        score += np.select([close > sma, close < sma], [40, -20], default=0)
+        # Wolumen
+        avg_volume = np.where(avg_volume == 0, 1.0, avg_volume)
+        score += np.where(volume > avg_volume*1.5, 15, 0)
+    return score.astype(int), sugestion
+
+def score_latest(latest: Any, avg_vol: float) -> Dict[str, Union[int,str,Any]]:
+    """Score dla ostatniego wiersza (RSI, Close, SMA_20, Volume) i średniego wolumenu."""
+    scores, sugestions = score_universe([latest['RSI']], [latest['Close']], [latest['SMA_20']], [latest['Volume']], [avg_vol])
+    return {'score':int(scores[0]),'sugestion':sugestions[0],'data':latest}
+
 def score_asset(df_analyzed: pd.DataFrame) -> Dict[str, Union[int,str,Any]]:
     """Score na podstawie RSI, SMA i wolumenu."""
     if df_analyzed.empty:
         return {'score':0,'sugestion':'Brak danych','data':None}
-    latest = df_analyzed.iloc[-1]
-    score = 0
-    sugestion = "TRZYMAJ"
-    # RSI
-    if latest['RSI'] < 30:
-        score += 60; sugestion="MOCNE KUPNO"
-    elif latest['RSI'] < 40:
-        score += 30; sugestion="KUPNO"
-    elif latest['RSI'] > 70:
-        score -= 60; sugestion="MOCNA SPRZEDAŻ"
-    elif latest['RSI'] > 60:
-        score -= 30; sugestion="SPRZEDAŻ"
-    # Trend
-    if latest['Close'] > latest['SMA_20']: score += 40
-    elif latest['Close'] < latest['SMA_20']: score -= 20
-    # Wolumen
-    avg_vol = df_analyzed['Volume'].tail(50).mean() or 1
-    if latest['Volume'] > avg_vol*1.5: score += 15
-    return {'score':int(score),'sugestion':sugestion,'data':latest}
+    return score_latest(df_analyzed.iloc[-1], df_analyzed['Volume'].tail(50).mean())
 
 # --- 3. RSI Analysis ---
 def get_rsi_analysis(df_analyzed: pd.DataFrame) -> Dict[str,str]:
@@ -120,42 +259,81 @@ def get_rsi_analysis(df_analyzed: pd.DataFrame) -> Dict[str,str]:
         return {'status':"PRESJA SPRZEDAJĄCYCH",'action':f"CZEKAJ (RSI:{rsi:.2f})"}
 
 # --- 4. ML Forecast ---
-def get_ml_forecast(df_analyzed: pd.DataFrame) -> Dict[str, Union[str,float]]:
-    if df_analyzed.empty or len(df_analyzed)<2:
-        return {'forecast_text':'N/A','next_price':None,'change_percent':0.0}
-    df_ml = df_analyzed[['Close']].copy()
-    df_ml['Prev_Close'] = df_ml['Close'].shift(1)
-    df_ml.dropna(inplace=True)
-    X = df_ml[['Prev_Close']]
-    y = df_ml['Close']
-    model = LinearRegression()
-    try:
-        model.fit(X,y)
-        next_price = model.predict([[X.iloc[-1,0]]])[0]
-        diff = (next_price - df_analyzed['Close'].iloc[-1])/df_analyzed['Close'].iloc[-1]*100
-        return {'forecast_text':f"{diff:+.2f}%","next_price":next_price,'change_percent':diff}
-    except:
-        return {'forecast_text':'Błąd','next_price':None,'change_percent':0.0}
+# Regresje liniowe 1-D dla wszystkich symboli naraz, w postaci zamkniętej (NumPy):
+# slope = cov(x,y)/var(x), intercept = mean(y) - slope*mean(x). Wynik jak z LinearRegression.
 
-def get_ml_monthly_forecast(df_analyzed: pd.DataFrame, interval: str) -> Dict[str, Any]:
-    if df_analyzed.empty or len(df_analyzed)<2:
-        return {'forecast_text':'Brak danych','monthly_price':None,'change_percent_30day':0.0,'forecast_timestamp':None}
+def _stack_closes(closes: List[np.ndarray]) -> np.ndarray:
+    """Macierz (symbole x max_długość) wyrównana do prawej; brakujące pozycje = NaN."""
+    width = max((len(c) for c in closes), default=0)
+    matrix = np.full((len(closes), width), np.nan)
+    for i, c in enumerate(closes):
+        if len(c):
+            matrix[i, width-len(c):] = c
+    return matrix
+
+def _batched_linreg(x: np.ndarray, y: np.ndarray, x_new: np.ndarray) -> np.ndarray:
+    """Predykcja w x_new dla każdego wiersza (regresja y~x po parach bez NaN)."""
+    mask = ~(np.isnan(x) | np.isnan(y))
+    n = mask.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mx = np.where(mask, x, 0).sum(axis=1)/n
+        my = np.where(mask, y, 0).sum(axis=1)/n
+        dx = np.where(mask, x - mx[:, None], 0)
+        dy = np.where(mask, y - my[:, None], 0)
+        sxx = (dx*dx).sum(axis=1)
+        slope = np.where(sxx > 0, (dx*dy).sum(axis=1)/sxx, 0.0)
+    return my + slope*(x_new - mx)
+
+def forecast_universe(frames: Dict[str, pd.DataFrame], interval: str) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """
+    Prognozy ML dla całego uniwersum jednym wywołaniem.
+    Zwraca {symbol: {'ml_1step': <jak get_ml_forecast>, 'ml_30day': <jak get_ml_monthly_forecast>}}.
+    """
+    out = {}
+    valid = {sym: df for sym, df in frames.items() if df is not None and not df.empty and len(df) >= 2}
+    for sym in frames:
+        if sym not in valid:
+            out[sym] = {
+                'ml_1step': {'forecast_text':'N/A','next_price':None,'change_percent':0.0},
+                'ml_30day': {'forecast_text':'Brak danych','monthly_price':None,'change_percent_30day':0.0,'forecast_timestamp':None},
+            }
+    if not valid:
+        return out
+
+    symbols = list(valid)
+    close = _stack_closes([valid[s]['Close'].to_numpy(dtype='float64') for s in symbols])
+    width = close.shape[1]
+    last_close = close[:, -1]
+
+    # 1 krok: Close_t ~ Close_(t-1); predykcja dla ostatniego Prev_Close (jak X.iloc[-1,0])
+    next_price = _batched_linreg(close[:, :-1], close[:, 1:], close[:, -2])
+
+    # 30 dni: Close ~ numer kroku; kroki liczone od początku danych symbolu (przesunięcie nie zmienia prognozy)
     interval_hours = {'1h':1,'4h':4,'1d':24}.get(interval,24)
     hours_in_month = 30*24
     steps = hours_in_month/interval_hours
-    df_ml = df_analyzed[['Close']].copy().reset_index(drop=True)
-    df_ml['Time_Step'] = df_ml.index
-    X = df_ml[['Time_Step']]; y = df_ml['Close']
-    model = LinearRegression()
-    try:
-        model.fit(X,y)
-        future_idx = df_ml.index[-1]+steps
-        future_price = model.predict([[future_idx]])[0]
-        diff = (future_price - df_analyzed['Close'].iloc[-1])/df_analyzed['Close'].iloc[-1]*100
-        future_ts = df_analyzed.index[-1]+pd.Timedelta(hours=hours_in_month)
-        return {'forecast_text':f"{diff:+.2f}%","monthly_price":future_price,'change_percent_30day':diff,'forecast_timestamp':future_ts}
-    except:
-        return {'forecast_text':'Błąd','monthly_price':None,'change_percent_30day':0.0,'forecast_timestamp':None}
+    time_step = np.broadcast_to(np.arange(width, dtype='float64'), close.shape)
+    time_step = np.where(np.isnan(close), np.nan, time_step)
+    monthly_price = _batched_linreg(time_step, close, np.full(len(symbols), width-1+steps))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        diff_1step = (next_price - last_close)/last_close*100
+        diff_30day = (monthly_price - last_close)/last_close*100
+
+    for i, sym in enumerate(symbols):
+        future_ts = valid[sym].index[-1]+pd.Timedelta(hours=hours_in_month)
+        out[sym] = {
+            'ml_1step': {'forecast_text':f"{diff_1step[i]:+.2f}%","next_price":float(next_price[i]),'change_percent':float(diff_1step[i])},
+            'ml_30day': {'forecast_text':f"{diff_30day[i]:+.2f}%","monthly_price":float(monthly_price[i]),
+                         'change_percent_30day':float(diff_30day[i]),'forecast_timestamp':future_ts},
+        }
+    return out
+
+def get_ml_forecast(df_analyzed: pd.DataFrame) -> Dict[str, Union[str,float]]:
+    return forecast_universe({'_': df_analyzed}, '1d')['_']['ml_1step']
+
+def get_ml_monthly_forecast(df_analyzed: pd.DataFrame, interval: str) -> Dict[str, Any]:
+    return forecast_universe({'_': df_analyzed}, interval)['_']['ml_30day']
 
 # --- 5. Social Sentiment ---
 def get_social_sentiment_forecast(symbol: str) -> Dict[str, Union[str,float]]:
@@ -172,3 +350,251 @@ def get_social_sentiment_forecast(symbol: str) -> Dict[str, Union[str,float]]:
         change=0.0
     summary=f"Wniosek: {direction} | Siła: {compound:+.2f}"
     return {'summary':summary,'change_percent_30day':change}
+
+# --- 6. SKANER RYNKU (współbieżny) ---
+
+# Stałe tokeny skanowane zawsze, niezależnie od rankingu wolumenu
+MUST_SCAN_SYMBOLS = ['BTCUSDT', 'ETHUSDT', 'BNBUSDT', 'SOLUSDT', 'XRPUSDT',
+                     'ADAUSDT', 'DOGEUSDT', 'AVAXUSDT', 'DOTUSDT', 'LINKUSDT', 'ZECUSDT']
+
+SCAN_CONCURRENCY = 16  # Domyślna liczba jednoczesnych zapytań o klines
+SCAN_KLINES_LIMIT = 100
+
+def _empty_ai_result(asset: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'data': pd.DataFrame(),
+        'analysis_rsi': {'status':'Brak danych','action':'CZEKAJ'},
+        'forecast_ml_percent':0,
+        'forecast_ml_price_30day':None,
+        'forecast_ml_text':'Brak danych',
+        'forecast_sentiment_percent':0,
+        'forecast_sentiment_text':'Brak danych',
+        'forecast_1step_price':None,
+        'forecast_monthly_timestamp':None,
+        'score': asset['score'],
+        'sugestion': asset['sugestion']
+    }
+
+def analyze_asset_3xai(sym: str, df_analyzed: pd.DataFrame, asset: Dict[str, Any], interval: str,
+                       forecast: Union[Dict[str, Any], None] = None) -> Dict[str, Any]:
+    """Analiza 3xAI (RSI, ML, Sentyment) na gotowej ramce z pierwszego przebiegu.
+    forecast: gotowy wynik forecast_universe dla symbolu (gdy brak - liczony tutaj)."""
+    if df_analyzed is None or df_analyzed.empty:
+        return _empty_ai_result(asset)
+    try:
+        rsi_res = get_rsi_analysis(df_analyzed)
+        sentiment_res = get_social_sentiment_forecast(sym)
+        forecast = forecast or forecast_universe({sym: df_analyzed}, interval)[sym]
+        ml_1step = forecast['ml_1step']
+        ml_30day = forecast['ml_30day']
+    except Exception:
+        return _empty_ai_result(asset)
+    return {
+        'data': df_analyzed,
+        'analysis_rsi': rsi_res,
+        'forecast_ml_percent': ml_30day['change_percent_30day'],
+        'forecast_ml_price_30day': ml_30day['monthly_price'],
+        'forecast_ml_text': ml_30day['forecast_text'],
+        'forecast_sentiment_percent': sentiment_res['change_percent_30day'],
+        'forecast_sentiment_text': sentiment_res['summary'],
+        'forecast_1step_price': ml_1step['next_price'],
+        'forecast_monthly_timestamp': ml_30day['forecast_timestamp'],
+        'score': asset['score'],
+        'sugestion': asset['sugestion']
+    }
+
+def _latest_from_state(sym: str, interval: str, df: pd.DataFrame) -> Union[Dict[str, float], None]:
+    """Ostatnie wartości wskaźników z przyrostowego stanu (bez liczenia rolling na całej ramce)."""
+    if df.empty:
+        return None
+    state = indicators.load_indicator_state(sym, interval)
+    with state.lock:
+        return indicators.sync_indicator_state(state, df, int(time.time()*1000))
+
+def _timed_fetch(fetcher: Callable[[str, str, int], pd.DataFrame], sym: str, interval: str, limit: int) -> pd.DataFrame:
+    with metrics.timer('scan.fetch'):
+        return fetcher(sym, interval, limit)
+
+def _timed_latest(sym: str, interval: str, df: pd.DataFrame) -> Union[Dict[str, float], None]:
+    with metrics.timer('scan.indicators'):
+        return _latest_from_state(sym, interval, df)
+
+async def _fetch_and_update(sym: str, interval: str, limit: int, semaphore: asyncio.Semaphore, pool: ThreadPoolExecutor,
+                            fetcher: Callable[[str, str, int], pd.DataFrame]):
+    """
+    Pobiera klines jednego symbolu (w wątku, z limitem współbieżności) i aktualizuje jego wskaźniki.
+    Aktualizacja stanu też idzie do puli - zapis JSON stanu na dysk nie blokuje pętli zdarzeń.
+    """
+    loop = asyncio.get_running_loop()
+    async with semaphore:
+        try:
+            df = await loop.run_in_executor(pool, _timed_fetch, fetcher, sym, interval, limit)
+        except Exception:
+            return sym, None, None
+    try:
+        return sym, df, await loop.run_in_executor(pool, _timed_latest, sym, interval, df)
+    except Exception:
+        return sym, None, None
+
+def rank_universe(symbols: List[str], latest_values: List[Union[Dict[str, float], None]]):
+    """Score całego uniwersum w jednym przebiegu. Zwraca (ranked_assets w kolejności wejścia, scores)."""
+    columns = ['RSI', 'Close', 'SMA_20', 'Volume', 'avg_volume_50']
+    matrix = np.full((len(symbols), len(columns)), np.nan)
+    for i, latest in enumerate(latest_values):
+        if latest is not None:
+            matrix[i] = [latest[c] for c in columns]
+    scores, sugestions = score_universe(*matrix.T)
+    missing = np.array([v is None for v in latest_values], dtype=bool)
+    scores[missing] = 0
+    sugestions[missing] = 'Brak danych'
+    ranked_assets = [
+        {'symbol': sym, 'score': int(scores[i]), 'sugestion': sugestions[i],
+         'data': pd.Series(latest_values[i]) if latest_values[i] is not None else None}
+        for i, sym in enumerate(symbols)
+    ]
+    return ranked_assets, scores
+
+async def scan_events(limit_symbols: int = 50, top_n: int = 10, interval: str = '4h',
+                      concurrency: int = SCAN_CONCURRENCY, klines_limit: int = SCAN_KLINES_LIMIT,
+                      symbols: Union[List[str], None] = None,
+                      fetcher: Union[Callable[[str, str, int], pd.DataFrame], None] = None):
+    """
+    Skan jako strumień zdarzeń (event, payload), emitowanych od razu, gdy są gotowe:
+      ('scored', asset)           - wstępny score symbolu zaraz po pobraniu jego klines,
+      ('ranking', final_ranking)  - pełny ranking po zeskanowaniu całego uniwersum,
+      ('analysis', (sym, result)) - wynik 3xAI dla każdego symbolu z Top N + MUST_SCAN,
+      ('done', None).
+    Ramki z pierwszego przebiegu są używane ponownie w fazie 3xAI (bez drugiego pobierania).
+    symbols/fetcher: własna lista symboli zamiast top wolumenu i własne źródło klines (benchmarki).
+    """
+    if symbols is None:
+        with metrics.timer('scan.symbols'):
+            symbols = await asyncio.to_thread(fetch_top_symbols, limit_symbols)
+    fetcher = fetcher or fetch_timeframe
+    all_symbols = list(dict.fromkeys(list(symbols) + MUST_SCAN_SYMBOLS))
+
+    # Własna pula wątków: domyślny executor asyncio ma min(32, CPU+4) wątków i dławiłby limit
+    concurrency = max(1, int(concurrency))
+    semaphore = asyncio.Semaphore(concurrency)
+    frames, latest_by_symbol = {}, {}
+    pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='scan')
+    tasks = [asyncio.ensure_future(_fetch_and_update(sym, interval, klines_limit, semaphore, pool, fetcher))
+             for sym in all_symbols]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            sym, df, latest = await next_done
+            frames[sym], latest_by_symbol[sym] = df, latest  # Surowe OHLCV z pierwszego przebiegu
+            yield 'scored', rank_universe([sym], [latest])[0][0]
+    finally:
+        # Klient rozłączył się w trakcie - nie czekamy na resztę pobrań. Bez wait: shutdown(wait=True)
+        # blokowałby pętlę zdarzeń serwera do końca trwających zapytań HTTP
+        for task in tasks:
+            task.cancel()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    with metrics.timer('scan.rank'):
+        ranked_assets, scores = rank_universe(all_symbols, [latest_by_symbol[sym] for sym in all_symbols])
+        # Pełna kolejność i tak jest potrzebna (cały ranking trafia do klienta) - Top N to jej początek
+        order = np.argsort(-scores, kind='stable')
+        final_ranking = [ranked_assets[i] for i in order]
+    yield 'ranking', final_ranking
+
+    # Top N + must scan
+    top_symbols = [all_symbols[i] for i in order[:max(int(top_n), 0)]]
+    final_symbols_for_ai = list(dict.fromkeys(top_symbols + MUST_SCAN_SYMBOLS))
+    assets_by_symbol = {a['symbol']: a for a in ranked_assets}
+
+    # --- Analiza 3xAI (bez ponownego pobierania danych; pełne SMA/RSI tylko dla wybranych) ---
+    analyzed = {}
+    with metrics.timer('scan.technical_analysis'):
+        for sym in final_symbols_for_ai:
+            df = frames.get(sym)
+            analyzed[sym] = technical_analysis(df.copy()) if df is not None and not df.empty else None
+    with metrics.timer('scan.forecast'):
+        forecasts = forecast_universe(analyzed, interval)  # Wszystkie regresje jednym wywołaniem
+    for sym in final_symbols_for_ai:
+        with metrics.timer('scan.analysis'):
+            result = analyze_asset_3xai(sym, analyzed[sym], assets_by_symbol[sym], interval, forecasts[sym])
+        yield 'analysis', (sym, result)
+    yield 'done', None
+
+async def scan_market_async(limit_symbols: int = 50, top_n: int = 10, interval: str = '4h',
+                            concurrency: int = SCAN_CONCURRENCY, klines_limit: int = SCAN_KLINES_LIMIT,
+                            symbols: Union[List[str], None] = None,
+                            fetcher: Union[Callable[[str, str, int], pd.DataFrame], None] = None):
+    """
+    Pełny skan: lista symboli -> współbieżne pobranie klines -> score całego uniwersum naraz ->
+    analiza 3xAI dla Top N + MUST_SCAN. Zwraca (results, final_ranking) w formacie dashboardu.
+    """
+    results, final_ranking = {}, []
+    async for event, payload in scan_events(limit_symbols, top_n, interval, concurrency, klines_limit,
+                                            symbols, fetcher):
+        if event == 'ranking':
+            final_ranking = payload
+        elif event == 'analysis':
+            sym, result = payload
+            results[sym] = result
+    return results, final_ranking
+
+def scan_market(limit_symbols: int = 50, top_n: int = 10, interval: str = '4h',
+                concurrency: int = SCAN_CONCURRENCY, klines_limit: int = SCAN_KLINES_LIMIT,
+                symbols: Union[List[str], None] = None,
+                fetcher: Union[Callable[[str, str, int], pd.DataFrame], None] = None):
+    """Synchroniczna nakładka na scan_market_async (Streamlit, skrypty)."""
+    return asyncio.run(scan_market_async(limit_symbols, top_n, interval, concurrency, klines_limit, symbols, fetcher))
+
+def _to_json_value(value: Any) -> Any:
+    """Konwersja typów numpy/pandas na typy JSON."""
+    if value is None:
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if hasattr(value, 'item'):
+        value = value.item()
+    if isinstance(value, float) and value != value:  # NaN
+        return None
+    return value
+
+def _latest_row_json(df_analyzed: Any) -> Union[Dict[str, Any], None]:
+    if df_analyzed is None or len(df_analyzed) == 0:
+        return None
+    latest = df_analyzed.iloc[-1]
+    row = {k: _to_json_value(v) for k, v in latest.items()}
+    row['timestamp'] = _to_json_value(df_analyzed.index[-1])
+    return row
+
+def _result_json(res: Dict[str, Any]) -> Dict[str, Any]:
+    """Wynik 3xAI jednego symbolu w formacie JSON (bez pełnej ramki)."""
+    asset = {k: _to_json_value(v) for k, v in res.items() if k not in ('data', 'analysis_rsi')}
+    asset['analysis_rsi'] = res['analysis_rsi']
+    asset['latest'] = _latest_row_json(res['data'])
+    return asset
+
+def _ranking_json(final_ranking: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [{'symbol': a['symbol'], 'score': a['score'], 'sugestion': a['sugestion']} for a in final_ranking]
+
+def scan_and_return_data_for_api(limit_symbols: int = 200, top_n: int = 10, interval: str = '4h',
+                                 concurrency: int = SCAN_CONCURRENCY) -> Dict[str, Any]:
+    """Skan dla API: ten sam silnik co dashboard, wynik w formacie JSON (bez pełnych ramek)."""
+    results, final_ranking = scan_market(limit_symbols, top_n, interval, concurrency)
+    with metrics.timer('api.serialize'):
+        ranking = _ranking_json(final_ranking)
+        assets = {sym: _result_json(res) for sym, res in results.items()}
+    return {'interval': interval, 'scanned': len(ranking), 'ranking': ranking, 'results': assets}
+
+async def stream_scan_for_api(limit_symbols: int = 200, top_n: int = 10, interval: str = '4h',
+                              concurrency: int = SCAN_CONCURRENCY):
+    """Zdarzenia scan_events w formacie JSON: (event, data) dla endpointu strumieniowego."""
+    scanned = analyzed = 0
+    async for event, payload in scan_events(limit_symbols, top_n, interval, concurrency):
+        if event == 'scored':
+            scanned += 1
+            yield event, {'symbol': payload['symbol'], 'score': payload['score'], 'sugestion': payload['sugestion']}
+        elif event == 'ranking':
+            yield event, {'interval': interval, 'scanned': len(payload), 'ranking': _ranking_json(payload)}
+        elif event == 'analysis':
+            analyzed += 1
+            sym, res = payload
+            yield event, {'symbol': sym, **_result_json(res)}
+        else:
+            yield event, {'interval': interval, 'scanned': scanned, 'analyzed': analyzed}
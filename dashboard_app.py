@@ -2,10 +2,9 @@ import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 import time
-from crypto_analyzer import (
-    fetch_top_symbols, fetch_crypto_data, technical_analysis, score_asset,
-    get_rsi_analysis, get_social_sentiment_forecast, get_ml_forecast, get_ml_monthly_forecast
-)
+from crypto_analyzer import MUST_SCAN_SYMBOLS, SCAN_CONCURRENCY, scan_market
+from scan_worker import covers, load_snapshot, snapshot_for_dashboard
+from stream_ingest import load_live_ranking
 
 # --- KONFIGURACJA STRONY ---
 st.set_page_config(layout="wide", page_title="Crypto AI Scanner PRO 🚀", initial_sidebar_state="expanded")
@@ -21,86 +20,14 @@ footer {visibility: hidden;}
 </style>
 """, unsafe_allow_html=True)
 
-# --- Stałe tokeny ---
-MUST_SCAN_SYMBOLS = ['BTCUSDT', 'ETHUSDT', 'BNBUSDT', 'SOLUSDT', 'XRPUSDT',
-                     'ADAUSDT', 'DOGEUSDT', 'AVAXUSDT', 'DOTUSDT', 'LINKUSDT', 'ZECUSDT']
-
 # --- FUNKCJA GŁÓWNA SKANU ---
+# Używany tylko, gdy nie działa scan_worker.py. Współbieżność nie zmienia wyniku, więc nie jest
+# częścią klucza cache (parametr z "_" jest pomijany przez st.cache_data)
 @st.cache_data(ttl=60*15)
-def run_auto_scan_and_analysis(limit_symbols_scan, top_score_n, interval, add_delay):
-    # 1. Pobranie listy symboli
-    dynamic_symbols = fetch_top_symbols(limit=limit_symbols_scan)
-    all_symbols = list(set(dynamic_symbols) | set(MUST_SCAN_SYMBOLS))
-
-    st.info(f"Skanuję {len(all_symbols)} par (stałe + dynamiczne) na interwale {interval}...")
-
-    ranked_assets = []
-
-    for i, sym in enumerate(all_symbols):
-        try:
-            df = fetch_crypto_data(sym, interval, limit=100)
-            df_analyzed = technical_analysis(df.copy())
-            asset_score = score_asset(df_analyzed)
-            asset_score['symbol'] = sym
-            ranked_assets.append(asset_score)
-        except Exception:
-            # fallback: minimalny wynik
-            ranked_assets.append({'symbol': sym, 'score':0, 'sugestion':'Brak danych', 'data':None})
-
-    final_ranking = sorted(ranked_assets, key=lambda x: x['score'], reverse=True)
-
-    # Top N + must scan
-    top_score_assets = final_ranking[:top_score_n]
-    top_symbols = {a['symbol'] for a in top_score_assets}
-    must_scan_missing = [s for s in MUST_SCAN_SYMBOLS if s not in top_symbols]
-    final_symbols_for_ai = list({a['symbol'] for a in top_score_assets + [a for a in ranked_assets if a['symbol'] in must_scan_missing]})
-
-    # --- 2. Analiza 3xAI ---
-    results = {}
-    for i, sym in enumerate(final_symbols_for_ai):
-        asset = next(a for a in ranked_assets if a['symbol']==sym)
-        try:
-            df = fetch_crypto_data(sym, interval, limit=100)
-            df_analyzed = technical_analysis(df.copy())
-
-            rsi_res = get_rsi_analysis(df_analyzed)
-            sentiment_res = get_social_sentiment_forecast(sym)
-            ml_1step = get_ml_forecast(df_analyzed)
-            ml_30day = get_ml_monthly_forecast(df_analyzed, interval)
-
-            results[sym] = {
-                'data': df_analyzed,
-                'analysis_rsi': rsi_res,
-                'forecast_ml_percent': ml_30day['change_percent_30day'],
-                'forecast_ml_price_30day': ml_30day['monthly_price'],
-                'forecast_ml_text': ml_30day['forecast_text'],
-                'forecast_sentiment_percent': sentiment_res['change_percent_30day'],
-                'forecast_sentiment_text': sentiment_res['summary'],
-                'forecast_1step_price': ml_1step['next_price'],
-                'forecast_monthly_timestamp': ml_30day['forecast_timestamp'],
-                'score': asset['score'],
-                'sugestion': asset['sugestion']
-            }
-        except Exception:
-            # fallback minimalny
-            results[sym] = {
-                'data': pd.DataFrame(),
-                'analysis_rsi': {'status':'Brak danych','action':'CZEKAJ'},
-                'forecast_ml_percent':0,
-                'forecast_ml_price_30day':None,
-                'forecast_ml_text':'Brak danych',
-                'forecast_sentiment_percent':0,
-                'forecast_sentiment_text':'Brak danych',
-                'forecast_1step_price':None,
-                'forecast_monthly_timestamp':None,
-                'score': asset['score'],
-                'sugestion': asset['sugestion']
-            }
-
-        if add_delay and i+1<len(final_symbols_for_ai):
-            time.sleep(1)  # krótsza przerwa, żeby nie blokować w demo
-
-    return results, final_ranking
+def run_auto_scan_and_analysis(limit_symbols_scan, top_score_n, interval, _concurrency):
+    # Współbieżny silnik skanu z crypto_analyzer (ten sam co w API)
+    st.info(f"Skanuję top {limit_symbols_scan} par + stałe tokeny na interwale {interval} (równolegle: {_concurrency})...")
+    return scan_market(limit_symbols_scan, top_score_n, interval, concurrency=_concurrency)
 
 
 # --- PANEL BOCZNY ---
@@ -109,7 +36,7 @@ with st.sidebar:
     limit_symbols_scan = st.slider("Ilość aktywów do wstępnego skanowania", 20, 200, 50, step=10)
     top_score_n = st.slider("Top X wg SCORE", 1, 15, 10)
     interval = st.selectbox("Interwał czasowy", ['1h','4h','1d'], index=1)
-    add_delay = st.checkbox("Dodaj krótką przerwę między analizami", value=True)
+    concurrency = st.slider("Równoległe zapytania do Binance", 1, 32, SCAN_CONCURRENCY)
 
     if st.button("Uruchom / Odśwież 🔄"):
         st.cache_data.clear()
@@ -117,7 +44,13 @@ with st.sidebar:
 
 
 # --- URUCHOMIENIE ANALIZY ---
-analysis_results, full_ranking = run_auto_scan_and_analysis(limit_symbols_scan, top_score_n, interval, add_delay)
+# Snapshot workera skanu (wspólny dla wszystkich sesji i API); skan w procesie Streamlit tylko awaryjnie
+snapshot = load_snapshot(interval)
+if covers(snapshot, limit_symbols_scan):
+    analysis_results, full_ranking = snapshot_for_dashboard(snapshot, limit_symbols_scan, top_score_n)
+    st.caption(f"Dane ze snapshotu workera skanu: {snapshot['meta']['created_at']}")
+else:
+    analysis_results, full_ranking = run_auto_scan_and_analysis(limit_symbols_scan, top_score_n, interval, concurrency)
 
 st.header(f"📊 Aktualny Skan Rynku ({interval})")
 st.write("🧩 DEBUG: liczba elementów w analysis_results =", len(analysis_results))
@@ -158,6 +91,14 @@ with col2:
     st.markdown("**⭐ Popularne Aktywa**")
     st.dataframe(df_popular[['Symbol','Score','ML Prognoza %','RSI Akcja']], use_container_width=True)
 
+# --- RANKING NA ŻYWO (demon stream_ingest.py) ---
+live = load_live_ranking(interval)
+if live and live['ranking']:
+    with st.expander(f"⚡ Ranking na żywo (WebSocket, aktualizacja: {live['updated_at']})"):
+        df_live = pd.DataFrame(live['ranking'])
+        df_live.index += 1
+        st.dataframe(df_live[['symbol','score','sugestion','close','rsi','updated_at']].head(top_score_n), use_container_width=True)
+
 # --- WYKRESY ---
 st.markdown("---")
 st.header("🧠 Szczegółowa Analiza 3xAI")
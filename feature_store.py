@@ -0,0 +1,166 @@
+# Plik: feature_store.py
+# Kolumnowy magazyn macierzy cech (wynik assemble_features) podzielony na miesiące.
+# Układ: feature_store/<RRRR-MM>.arrow (Arrow IPC, bez kompresji - plik da się zmapować w pamięć)
+# + feature_store/meta.json (lista tickerów dla kodów int16, kolumny, zakres dat).
+# Trening czyta przez mmap tylko potrzebne kolumny i miesiące - strony pliku trafiają do RAM
+# dopiero przy dostępie. Odczyt z jednego miesiąca jest zero-copy (widok na plik); przy kilku
+# miesiącach pandas skleja kawałki w jedną tablicę na kolumnę - to jedyna kopia (filtr dat
+# i targetu to wycinek, nie kopia, bo wiersze są posortowane po dacie).
+
+import json
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Union
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+FEATURE_STORE_DIR = os.environ.get("FEATURE_STORE_DIR", "feature_store")
+TICKER_CODE_DTYPE = np.int16  # Do 32767 tickerów
+
+
+def _meta_path() -> str:
+    return os.path.join(FEATURE_STORE_DIR, "meta.json")
+
+
+def partition_path(month: str) -> str:
+    return os.path.join(FEATURE_STORE_DIR, f"{month}.arrow")
+
+
+def load_meta() -> Dict[str, Any]:
+    """Metadane magazynu ({} gdy magazyn jest pusty)."""
+    try:
+        with open(_meta_path()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_atomic(path: str, write) -> None:
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _write_meta(meta: Dict[str, Any]) -> None:
+    def write(tmp_path):
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f, indent=2, default=str)
+    _write_atomic(_meta_path(), write)
+
+
+def write_features(features: pd.DataFrame) -> List[str]:
+    """
+    Zapisuje macierz cech (index 'date', kolumna kategoryczna 'ticker', reszta numeryczna) jako
+    partycje miesięczne. Miesiące obecne w `features` są nadpisywane, starsze zostają (historia).
+    Zwraca listę zapisanych miesięcy.
+    """
+    os.makedirs(FEATURE_STORE_DIR, exist_ok=True)
+    meta = load_meta()
+
+    # Kody tickerów wspólne dla wszystkich partycji: lista w meta.json tylko rośnie
+    known = list(meta.get('tickers', []))
+    tickers = features['ticker'].astype('category')
+    known_set = set(known)
+    known += [str(t) for t in tickers.cat.categories if str(t) not in known_set]
+    remap = pd.Index(known).get_indexer(tickers.cat.categories.astype(str))
+    codes = remap[tickers.cat.codes.to_numpy()].astype(TICKER_CODE_DTYPE)
+
+    value_cols = [c for c in features.columns if c != 'ticker']
+    dates = pd.DatetimeIndex(features.index)
+    order = np.argsort(dates.to_numpy(), kind='stable') if not dates.is_monotonic_increasing else None
+    if order is not None:
+        features, dates, codes = features.iloc[order], dates[order], codes[order]
+    # Wiersze posortowane po dacie -> każdy miesiąc to ciągły zakres [lo, hi)
+    months = dates.to_numpy().astype('datetime64[M]')
+    bounds = np.flatnonzero(months[1:] != months[:-1]) + 1
+    written = []
+    for lo, hi in zip(np.r_[0, bounds], np.r_[bounds, len(months)]):
+        if lo == hi:
+            continue
+        month = str(months[lo])
+        table = pa.table(
+            {'date': pa.array(dates[lo:hi].to_numpy()), 'ticker': pa.array(codes[lo:hi])}
+            | {c: pa.array(features[c].to_numpy()[lo:hi]) for c in value_cols}
+        )
+        if lo == 0 and os.path.exists(partition_path(month)):
+            # Najstarszy miesiąc bywa niepełny (okno danych zaczyna się w jego środku) - starsze dni zostają
+            old = _open_partition(month)
+            if old.schema.equals(table.schema):
+                keep = old.column('date').to_numpy() < dates[0].to_datetime64()
+                table = pa.concat_tables([old.filter(pa.array(keep)), table]).combine_chunks()
+
+        def write(tmp_path, table=table):
+            with pa.OSFile(tmp_path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        _write_atomic(partition_path(month), write)
+        written.append(month)
+
+    months_stored = sorted(f[:-6] for f in os.listdir(FEATURE_STORE_DIR) if f.endswith('.arrow'))
+    _write_meta({
+        'tickers': known,
+        'columns': value_cols,
+        'order': list(features.columns),
+        'months': months_stored,
+        'start': dates.min().isoformat() if len(dates) else meta.get('start'),
+        'end': dates.max().isoformat() if len(dates) else meta.get('end'),
+        'updated_at': datetime.now(timezone.utc).isoformat(),
+    })
+    return written
+
+
+def _open_partition(month: str) -> pa.Table:
+    """Partycja zmapowana w pamięć (zero-copy - bufory wskazują bezpośrednio na plik)."""
+    return pa.ipc.open_file(pa.memory_map(partition_path(month), 'r')).read_all()
+
+
+def read_features(columns: Union[List[str], None] = None, start=None, end=None,
+                  labeled_only: bool = False) -> pd.DataFrame:
+    """
+    Cechy z magazynu w formacie assemble_features (index 'date', 'ticker' jako kategoria).
+    columns: tylko te kolumny (+ 'ticker'); start/end: zakres dat (włącznie) - niepotrzebne miesiące
+    nie są otwierane; labeled_only: tylko wiersze ze znanym targetem (jak labeled_rows).
+    Kolumny z jednego miesiąca to widoki na zmapowany plik; z kilku - jedna sklejona kopia na kolumnę.
+    """
+    meta = load_meta()
+    if not meta:
+        raise FileNotFoundError(f"Pusty magazyn cech: {FEATURE_STORE_DIR}")
+    order = list(columns) if columns is not None else list(meta['order'])
+    if 'ticker' not in order:
+        order.append('ticker')
+    value_cols = [c for c in order if c != 'ticker']
+
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+    months = [m for m in meta['months']
+              if (start is None or m >= start.strftime('%Y-%m')) and (end is None or m <= end.strftime('%Y-%m'))]
+    if not months:
+        empty = {c: np.empty(0, dtype=np.float32) for c in value_cols}
+        empty['ticker'] = pd.Categorical([], categories=meta['tickers'])
+        return pd.DataFrame(empty, index=pd.DatetimeIndex([], name='date'))[order]
+
+    needed = ['date', 'ticker'] + value_cols + (['target'] if labeled_only and 'target' not in value_cols else [])
+    table = pa.concat_tables([_open_partition(m).select(needed) for m in months])
+
+    # Filtr wierszy liczony na zmapowanych kolumnach. Wiersze są posortowane po dacie, a bez targetu
+    # są tylko ostatnie dni - zwykle zostaje ciągły zakres, czyli wycinek (zero-copy) zamiast kopii
+    dates = table.column('date').to_numpy()
+    mask = np.ones(len(dates), dtype=bool)
+    if start is not None:
+        mask &= dates >= start.to_datetime64()
+    if end is not None:
+        mask &= dates <= end.to_datetime64()
+    if labeled_only:
+        mask &= ~np.isnan(table.column('target').to_numpy())
+    if not mask.all():
+        keep = np.flatnonzero(mask)
+        if len(keep) and keep[-1] - keep[0] + 1 == len(keep):
+            table = table.slice(int(keep[0]), len(keep))
+        else:
+            table = table.filter(pa.array(mask))  # Np. ticker bez notowań w środku zakresu
+
+    out = table.select(value_cols).to_pandas(split_blocks=True)
+    out.index = pd.DatetimeIndex(table.column('date').to_numpy(), name='date')
+    out['ticker'] = pd.Categorical.from_codes(table.column('ticker').to_numpy(),
+                                              categories=meta['tickers']).remove_unused_categories()
+    return out[order]
@@ -1,6 +1,14 @@
 # features_news.py
+import hashlib
+import json
+import os
+import threading
+import time
 import pandas as pd
-import requests
+import http_client
+import metrics
+import sentiment
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
 # --- KONFIGURACJA NEWS ---
@@ -15,60 +23,149 @@ TICKERS = [
     "OKTA","TSM","GILD","SNOW","GOOG","PLTR","IBM","MSFT","AAPL","NFLX"
 ]
 
-def get_news_sentiment(ticker, days=365):
-    """
-    Pobiera newsy z NewsAPI i Finnhub i zwraca średni sentyment dla ticker w ostatnich 'days' dniach.
-    """
-from datetime import datetime, timedelta
+REQUEST_TIMEOUT = 10  # s - jedno zawieszone zapytanie nie blokuje całego treningu
+NEWS_WORKERS = 8
+# Minimalny odstęp między zapytaniami do danego dostawcy (s)
+PROVIDER_MIN_INTERVAL = {'newsapi': 1.0, 'finnhub': 1.0}
+
+# --- Cache na dysku (TTL) ---
+NEWS_CACHE_DIR = os.environ.get("NEWS_CACHE_DIR", "cache/news")
+NEWS_CACHE_TTL = int(os.environ.get("NEWS_CACHE_TTL", 6*3600))
+
+
+class RateLimiter:
+    """Prosty limiter: co najmniej min_interval sekund między kolejnymi zapytaniami (bezpieczny wątkowo)."""
+
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+_limiters = {provider: RateLimiter(interval) for provider, interval in PROVIDER_MIN_INTERVAL.items()}
+
+
+def _cache_path(provider, ticker, start_str, end_str):
+    key = hashlib.sha1(f"{provider}|{ticker}|{start_str}|{end_str}".encode()).hexdigest()
+    return os.path.join(NEWS_CACHE_DIR, provider, f"{key}.json")
+
+
+def cache_get(provider, ticker, start_str, end_str):
+    """Wartość z cache lub None, gdy brak wpisu albo minął TTL."""
+    path = _cache_path(provider, ticker, start_str, end_str)
+    try:
+        if time.time() - os.path.getmtime(path) > NEWS_CACHE_TTL:
+            value = None
+        else:
+            with open(path) as f:
+                value = json.load(f)['value']
+    except (OSError, ValueError, KeyError):
+        value = None
+    metrics.cache_result(f"news_{provider}", 'miss' if value is None else 'hit')
+    return value
+
+
+def cache_put(provider, ticker, start_str, end_str, value):
+    path = _cache_path(provider, ticker, start_str, end_str)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({'provider': provider, 'ticker': ticker, 'start': start_str, 'end': end_str, 'value': value}, f)
+    os.replace(tmp_path, path)
+
 
-def build_news_features(tickers, days=365):
+def _date_window(days):
     end_date = datetime.today()  # <-- dzisiaj
     start_date = end_date - timedelta(days=days)
-    start_str = start_date.strftime("%Y-%m-%d")
-    end_str = end_date.strftime("%Y-%m-%d")
+    return start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")
 
-    # --- NewsAPI ---
-    url_newsapi = f"https://newsapi.org/v2/everything?q={ticker}&from={start_str}&to={end_str}&language=en&apiKey={NEWSAPI_KEY}"
+
+# --- Dostawcy ---
+
+def fetch_newsapi_articles(ticker, start_str, end_str):
+    """Artykuły z NewsAPI (lista słowników). Błąd -> [] (bez zapisu do cache)."""
+    cached = cache_get('newsapi', ticker, start_str, end_str)
+    if cached is not None:
+        return cached
+    url_newsapi = "https://newsapi.org/v2/everything"
+    params = {'q': ticker, 'from': start_str, 'to': end_str, 'language': 'en', 'apiKey': NEWSAPI_KEY}
     try:
-        res = requests.get(url_newsapi).json()
-        articles = res.get("articles", [])
-    except:
-        articles = []
+        _limiters['newsapi'].wait()
+        res = http_client.get(url_newsapi, params=params, timeout=REQUEST_TIMEOUT).json()
+        if res.get('status') == 'error':
+            raise ValueError(res.get('message'))
+        articles = [
+            {k: a.get(k) for k in ('title', 'description', 'publishedAt')}
+            for a in res.get("articles", [])
+        ]
+    except Exception as e:
+        print(f"NewsAPI: błąd dla {ticker}: {e}")
+        return []
+    cache_put('newsapi', ticker, start_str, end_str, articles)
+    return articles
 
-    # --- Finnhub ---
-    url_finnhub = f"https://finnhub.io/api/v1/news-sentiment?symbol={ticker}&token={FINNHUB_KEY}"
+
+def fetch_finnhub_sentiment(ticker, start_str, end_str):
+    """Średni sentyment z Finnhub. Błąd -> 0 (bez zapisu do cache)."""
+    cached = cache_get('finnhub', ticker, start_str, end_str)
+    if cached is not None:
+        return cached
+    url_finnhub = "https://finnhub.io/api/v1/news-sentiment"
     try:
-        res2 = requests.get(url_finnhub).json()
-        finnhub_sentiment = res2.get("score", {}).get("avg", 0)
-    except:
-        finnhub_sentiment = 0
-
-    # Prosta heurystyka NewsAPI: +1 jeśli "up"/"gain"/"bull", -1 jeśli "down"/"loss"/"bear"
-    sentiment_sum = 0
-    for article in articles:
-        title = article.get('title') or ""
-        desc  = article.get('description') or ""
-        text = (title + " " + desc).lower()
-        score = 0
-        if any(w in text for w in ['up','gain','rise','bull']):
-            score += 1
-        if any(w in text for w in ['down','loss','fall','bear']):
-            score -= 1
-        sentiment_sum += score
-
-    newsapi_sentiment = sentiment_sum / len(articles) if articles else 0
-    sentiment = 0.5 * newsapi_sentiment + 0.5 * finnhub_sentiment
-    return sentiment
+        _limiters['finnhub'].wait()
+        res2 = http_client.get(url_finnhub, params={'symbol': ticker, 'token': FINNHUB_KEY}, timeout=REQUEST_TIMEOUT).json()
+        finnhub_sentiment = (res2.get("score") or {}).get("avg", 0) or 0
+    except Exception as e:
+        print(f"Finnhub: błąd dla {ticker}: {e}")
+        return 0
+    cache_put('finnhub', ticker, start_str, end_str, finnhub_sentiment)
+    return finnhub_sentiment
+
+
+def get_news_sentiment(ticker, days=365):
+    """
+    Pobiera newsy z NewsAPI i Finnhub i zwraca średni sentyment dla ticker w ostatnich 'days' dniach.
+    Nagłówki oceniane są VADER-em (z memoizacją w module sentiment).
+    """
+    start_str, end_str = _date_window(days)
+    articles = fetch_newsapi_articles(ticker, start_str, end_str)
+    finnhub_sentiment = fetch_finnhub_sentiment(ticker, start_str, end_str)
+    texts = [sentiment.article_text(a) for a in articles]
+    newsapi_sentiment = float(sentiment.score_texts(texts).mean()) if texts else 0
+    return 0.5 * newsapi_sentiment + 0.5 * finnhub_sentiment
+
 
 def build_news_features(tickers=TICKERS, days=365):
     """
-    Buduje DataFrame: ticker | date | sentiment
+    Buduje DataFrame: ticker | date | sentiment (szereg dzienny, nie tylko "dzisiaj").
+    sentiment w danym dniu = średni VADER compound nagłówków z tego dnia; w dniu dzisiejszym
+    mieszany 50/50 z bieżącym wynikiem Finnhub (jak wcześniej).
+    Tickery są deduplikowane, a zapytania do obu dostawców idą równolegle (z limitami i cache).
     """
-    rows = []
-    today = datetime.today().date()
-    for t in tickers:
-        sentiment = get_news_sentiment(t, days=days)
-        rows.append({'ticker': t, 'date': today, 'sentiment': sentiment})
-    df = pd.DataFrame(rows)
-    return df
+    tickers = list(dict.fromkeys(tickers))
+    start_str, end_str = _date_window(days)
+    with ThreadPoolExecutor(max_workers=NEWS_WORKERS) as pool:
+        articles = {t: pool.submit(fetch_newsapi_articles, t, start_str, end_str) for t in tickers}
+        finnhub = {t: pool.submit(fetch_finnhub_sentiment, t, start_str, end_str) for t in tickers}
+        articles = {t: f.result() for t, f in articles.items()}
+        finnhub = {t: f.result() for t, f in finnhub.items()}
+
+    # Wszystkie nagłówki wszystkich tickerów - jedna partia VADER
+    daily = sentiment.daily_sentiment(articles)[['ticker', 'date', 'sentiment']]
+
+    today = pd.Timestamp(datetime.today().date())
+    today_rows = pd.DataFrame({'ticker': tickers, 'date': today, 'finnhub': [finnhub[t] for t in tickers]})
+    today_rows = today_rows.merge(daily, on=['ticker', 'date'], how='left')
+    today_rows['sentiment'] = 0.5 * today_rows['sentiment'].fillna(0) + 0.5 * today_rows['finnhub']
 
+    history = daily[daily['date'] != today]
+    df = pd.concat([history, today_rows[['ticker', 'date', 'sentiment']]], ignore_index=True)
+    return df.sort_values(['ticker', 'date']).reset_index(drop=True)
@@ -3,36 +3,56 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 
+FEATURE_DTYPE = np.float32  # Cechy trzymane w float32 - połowa pamięci float64, LightGBM i tak liczy w float32
+FEATURE_COLUMNS = ['ret_1', 'ret_5', 'ret_21', 'vol_21', 'vol_63', 'ma_10', 'ma_50', 'rsi_14', 'vol_z']
+
+def price_features_from_panel(close, volume):
+    """
+    Liczy cechy dla wszystkich tickerów naraz na szerokich macierzach (data x ticker)
+    i tylko raz, na końcu, przekształca wynik do formatu długiego (index=data, kolumna 'ticker').
+    """
+    close = close.astype('float64')
+    # Wolumen tylko w dniach z ceną, luki uzupełniane ostatnią wartością (jak w wersji per-ticker)
+    volume = volume.reindex(index=close.index, columns=close.columns).where(close.notna()).ffill()
+
+    ret_1 = close.pct_change(1, fill_method=None)
+    delta = close.diff()
+    up = delta.clip(lower=0).rolling(14).mean()
+    down = (-delta.clip(upper=0)).rolling(14).mean()
+    rs = up / down.replace(0, np.nan)
+
+    wide = {
+        'ret_1': ret_1,
+        'ret_5': close.pct_change(5, fill_method=None),
+        'ret_21': close.pct_change(21, fill_method=None),
+        'vol_21': ret_1.rolling(21).std(),
+        'vol_63': ret_1.rolling(63).std(),
+        'ma_10': close.rolling(10).mean() / close - 1,
+        'ma_50': close.rolling(50).mean() / close - 1,
+        'rsi_14': 100 - (100 / (1 + rs)),
+        'vol_z': volume.pct_change(1, fill_method=None).rolling(21).mean(),
+    }
+
+    # (data, ticker, cecha) -> (ticker, data, cecha): wiersze w kolejności ticker-major.
+    # Jedna prealokowana macierz float32 wypełniana kolumna po kolumnie (bez np.stack w float64)
+    n_dates, n_tickers = close.shape
+    panel = np.empty((n_tickers, n_dates, len(FEATURE_COLUMNS)), dtype=FEATURE_DTYPE)
+    for j, c in enumerate(FEATURE_COLUMNS):
+        panel[:, :, j] = wide.pop(c).to_numpy().T
+    values = panel.reshape(n_tickers * n_dates, len(FEATURE_COLUMNS))
+    codes = np.repeat(np.arange(n_tickers, dtype=np.int16), n_dates)
+    dates = np.tile(close.index.to_numpy(), n_tickers)
+
+    keep = ~np.isnan(values).any(axis=1)
+    big = pd.DataFrame(values[keep], columns=FEATURE_COLUMNS, copy=False,
+                       index=pd.Index(dates[keep], name=close.index.name))
+    big['ticker'] = pd.Categorical.from_codes(codes[keep], categories=close.columns.astype(str))
+    return big
+
 def build_price_features(tickers, start=None, end=None):
-    from datetime import datetime, timedelta
     if start is None:
         start = (datetime.today() - timedelta(days=730)).strftime("%Y-%m-%d")
     if end is None:
         end = datetime.today().strftime("%Y-%m-%d")  # do dzisiaj
     data = yf.download(tickers, start=start, end=end, auto_adjust=True, progress=False)
-    close = data['Close']
-    volume = data['Volume']
-    feats = {}
-    for t in close.columns:
-        px = close[t].dropna()
-        vol = volume[t].reindex(px.index).ffill()
-        df = pd.DataFrame(index=px.index)
-        df['ret_1'] = px.pct_change(1)
-        df['ret_5'] = px.pct_change(5)
-        df['ret_21'] = px.pct_change(21)
-        df['vol_21'] = df['ret_1'].rolling(21).std()
-        df['vol_63'] = df['ret_1'].rolling(63).std()
-        df['ma_10'] = px.rolling(10).mean()/px - 1
-        df['ma_50'] = px.rolling(50).mean()/px - 1
-        delta = px.diff()
-        up = delta.clip(lower=0).rolling(14).mean()
-        down = (-delta.clip(upper=0)).rolling(14).mean()
-        rs = up / down.replace(0,np.nan)
-        df['rsi_14'] = 100 - (100/(1+rs))
-        df['vol_z'] = (vol.pct_change(1)).rolling(21).mean()
-        df['ticker'] = t
-        feats[t] = df
-    big = pd.concat(feats.values(), axis=0).dropna()
-    big['ticker'] = big['ticker'].astype('category')
-    return big
-
+    return price_features_from_panel(data['Close'], data['Volume'])
@@ -0,0 +1,136 @@
+# Plik: http_client.py
+# Wspólny klient HTTP dla wszystkich zapytań do zewnętrznych API (Binance, NewsAPI, Finnhub):
+# jedna sesja z pulą połączeń keep-alive, limit równoległych zapytań na hosta,
+# ponawianie 429/5xx z wykładniczym backoffem (z jitterem) i obsługą Retry-After,
+# oraz metryki per endpoint.
+
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Union
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+
+REQUEST_TIMEOUT = 10  # s
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", 32))  # Połączenia keep-alive na hosta
+# Maksymalna liczba równoległych zapytań do jednego hosta
+HOST_CONCURRENCY = {'api.binance.com': 16}
+DEFAULT_HOST_CONCURRENCY = 8
+MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", 4))
+BACKOFF_BASE = 0.5  # s
+BACKOFF_MAX = 30    # s
+RETRY_STATUSES = {418, 429, 500, 502, 503, 504}  # 418: blokada IP Binance po zignorowaniu 429
+
+_session = None
+_session_lock = threading.Lock()
+_host_limits: Dict[str, threading.BoundedSemaphore] = {}
+_metrics_lock = threading.Lock()
+_metrics: Dict[str, Dict[str, Any]] = {}
+
+
+def get_session() -> requests.Session:
+    """Współdzielona sesja (tworzona przy pierwszym użyciu)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def _host_limit(host: str) -> threading.BoundedSemaphore:
+    with _session_lock:
+        if host not in _host_limits:
+            _host_limits[host] = threading.BoundedSemaphore(HOST_CONCURRENCY.get(host, DEFAULT_HOST_CONCURRENCY))
+        return _host_limits[host]
+
+
+def _retry_after(response: requests.Response) -> Union[float, None]:
+    """Wartość nagłówka Retry-After w sekundach (liczba albo data HTTP)."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff(attempt: int) -> float:
+    """Wykładniczy backoff z pełnym jitterem."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt))
+
+
+def _record(endpoint: str, status: Union[int, None], elapsed: float, retried: bool) -> None:
+    with _metrics_lock:
+        m = _metrics.get(endpoint)
+        if m is None:
+            m = _metrics[endpoint] = {'requests': 0, 'retries': 0, 'errors': 0,
+                                      'status': defaultdict(int), 'total_s': 0.0, 'max_s': 0.0}
+        m['requests'] += 1
+        m['retries'] += int(retried)
+        m['status'][str(status) if status is not None else 'connection_error'] += 1
+        if status is None or status >= 400:
+            m['errors'] += 1
+        m['total_s'] += elapsed
+        m['max_s'] = max(m['max_s'], elapsed)
+
+
+def get_metrics() -> Dict[str, Dict[str, Any]]:
+    """Kopia metryk: endpoint -> liczniki zapytań/ponowień/błędów, statusy i czasy (s)."""
+    with _metrics_lock:
+        return {
+            endpoint: dict(m, status=dict(m['status']), avg_s=m['total_s'] / m['requests'])
+            for endpoint, m in _metrics.items()
+        }
+
+
+def reset_metrics() -> None:
+    with _metrics_lock:
+        _metrics.clear()
+
+
+def get(url: str, params: Union[Dict[str, Any], None] = None, timeout: float = REQUEST_TIMEOUT,
+        max_retries: int = MAX_RETRIES) -> requests.Response:
+    """
+    GET przez współdzieloną sesję. 429/418/5xx i błędy połączenia są ponawiane (Retry-After ma
+    pierwszeństwo przed backoffem). Po wyczerpaniu prób: requests.HTTPError / requests.RequestException.
+    """
+    parts = urlsplit(url)
+    endpoint = f"{parts.netloc}{parts.path}"
+    limit = _host_limit(parts.netloc)
+    session = get_session()
+    for attempt in range(max_retries + 1):
+        last = attempt == max_retries
+        start = time.perf_counter()
+        try:
+            with limit:
+                response = session.get(url, params=params, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            _record(endpoint, None, time.perf_counter() - start, attempt > 0)
+            if last:
+                raise
+            delay = _backoff(attempt)
+            print(f"HTTP {endpoint}: {type(e).__name__}, ponowienie {attempt+1}/{max_retries} za {delay:.1f}s")
+        else:
+            _record(endpoint, response.status_code, time.perf_counter() - start, attempt > 0)
+            retry_after = _retry_after(response)
+            # Retry-After dłuższe niż BACKOFF_MAX: nie czekamy w wątku skanu, błąd idzie do wywołującego
+            give_up = last or (retry_after is not None and retry_after > BACKOFF_MAX)
+            if response.status_code not in RETRY_STATUSES or give_up:
+                response.raise_for_status()
+                return response
+            delay = retry_after if retry_after is not None else _backoff(attempt)
+            print(f"HTTP {endpoint}: status {response.status_code}, ponowienie {attempt+1}/{max_retries} za {delay:.1f}s")
+        time.sleep(delay)  # Poza semaforem hosta - inne wątki mogą w tym czasie korzystać z limitu
@@ -0,0 +1,176 @@
+# Plik: indicators.py
+# Strumieniowy stan wskaźników (SMA20, RSI14, średni wolumen 50) dla pary symbol/interwał.
+# Aktualizacja jedną zamkniętą świecą kosztuje O(okno) - niezależnie od długości historii -
+# a wynik jest taki sam jak w crypto_analyzer.technical_analysis / score_asset.
+
+import json
+import math
+import os
+import threading
+from collections import deque
+from typing import Any, Dict, Iterable, Union
+import pandas as pd
+import candle_store
+
+SMA_WINDOW = 20
+RSI_WINDOW = 14
+VOLUME_WINDOW = 50
+
+
+def _nanmean(values: Iterable[float]) -> float:
+    valid = [v for v in values if not math.isnan(v)]
+    return math.fsum(valid)/len(valid) if valid else math.nan
+
+
+def _indicator_values(closes, gains, losses, volumes) -> Dict[str, float]:
+    """Wartości wskaźników z okien (te same reguły co rolling(min_periods=1) w technical_analysis)."""
+    gain = _nanmean(gains)
+    loss = _nanmean(losses)
+    if loss == 0:
+        loss = 1.0  # Unikamy dzielenia przez 0 (jak loss.replace(0,1))
+    rsi = 100-(100/(1+gain/loss)) if not (math.isnan(gain) or math.isnan(loss)) else math.nan
+    return {
+        'Close': closes[-1],
+        'SMA_20': _nanmean(closes),
+        'RSI': rsi,
+        'Volume': volumes[-1],
+        'avg_volume_50': _nanmean(volumes),
+    }
+
+
+class IndicatorState:
+    """Stan wskaźników aktualizowany jedną zamkniętą świecą naraz."""
+
+    def __init__(self, symbol: str, interval: str):
+        self.symbol = symbol
+        self.interval = interval
+        self.lock = threading.Lock()  # Chroni stan przy równoległych skanach tego samego symbolu
+        self._clear()
+
+    def _clear(self) -> None:
+        self.last_open_time: Union[int, None] = None  # ms, ostatnia zamknięta świeca
+        self.closes = deque(maxlen=SMA_WINDOW)
+        self.gains = deque(maxlen=RSI_WINDOW)
+        self.losses = deque(maxlen=RSI_WINDOW)
+        self.volumes = deque(maxlen=VOLUME_WINDOW)
+
+    @property
+    def empty(self) -> bool:
+        return self.last_open_time is None
+
+    def reset(self) -> None:
+        self._clear()
+
+    def _deltas(self, close: float):
+        if not self.closes:
+            return math.nan, math.nan  # Pierwsza świeca nie ma zmiany (jak diff())
+        delta = close - self.closes[-1]
+        return max(delta, 0.0), max(-delta, 0.0)
+
+    def update(self, open_time: int, close: float, volume: float) -> None:
+        """Dodaje zamkniętą świecę (wartości wskaźników: values() / peek())."""
+        gain, loss = self._deltas(close)
+        self.gains.append(gain)
+        self.losses.append(loss)
+        self.closes.append(float(close))
+        self.volumes.append(float(volume))
+        self.last_open_time = int(open_time)
+
+    def peek(self, close: float, volume: float) -> Dict[str, float]:
+        """Wartości wskaźników z dodatkową (otwartą) świecą - bez zmiany stanu."""
+        gain, loss = self._deltas(close)
+        return _indicator_values(
+            list(self.closes)[-(SMA_WINDOW-1):] + [float(close)],
+            list(self.gains)[-(RSI_WINDOW-1):] + [gain],
+            list(self.losses)[-(RSI_WINDOW-1):] + [loss],
+            list(self.volumes)[-(VOLUME_WINDOW-1):] + [float(volume)],
+        )
+
+    def values(self) -> Dict[str, float]:
+        if self.empty:
+            return {'Close': math.nan, 'SMA_20': math.nan, 'RSI': math.nan, 'Volume': math.nan, 'avg_volume_50': math.nan}
+        return _indicator_values(list(self.closes), list(self.gains), list(self.losses), list(self.volumes))
+
+    # --- Serializacja ---
+    def to_dict(self) -> Dict[str, Any]:
+        nan_to_none = lambda xs: [None if math.isnan(x) else x for x in xs]
+        return {
+            'symbol': self.symbol, 'interval': self.interval, 'last_open_time': self.last_open_time,
+            'closes': list(self.closes), 'gains': nan_to_none(self.gains),
+            'losses': nan_to_none(self.losses), 'volumes': list(self.volumes),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'IndicatorState':
+        none_to_nan = lambda xs: [math.nan if x is None else float(x) for x in xs]
+        state = cls(data['symbol'], data['interval'])
+        state.last_open_time = data.get('last_open_time')
+        state.closes.extend(float(x) for x in data.get('closes', []))
+        state.gains.extend(none_to_nan(data.get('gains', [])))
+        state.losses.extend(none_to_nan(data.get('losses', [])))
+        state.volumes.extend(float(x) for x in data.get('volumes', []))
+        return state
+
+
+# --- Trwałość stanu (obok magazynu świec) ---
+
+_states: Dict[tuple, IndicatorState] = {}
+_states_lock = threading.Lock()
+
+
+def state_path(symbol: str, interval: str) -> str:
+    return os.path.join(candle_store.CANDLE_STORE_DIR, f"{symbol}_{interval}.indicators.json")
+
+
+def save_indicator_state(state: IndicatorState) -> None:
+    path = state_path(state.symbol, state.interval)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state.to_dict(), f)
+    os.replace(tmp_path, path)
+
+
+def load_indicator_state(symbol: str, interval: str) -> IndicatorState:
+    """Stan z pamięci procesu, a przy pierwszym użyciu - z dysku (lub nowy, pusty)."""
+    key = (symbol, interval)
+    with _states_lock:
+        state = _states.get(key)
+        if state is not None:
+            return state
+        try:
+            with open(state_path(symbol, interval)) as f:
+                state = IndicatorState.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError):
+            state = IndicatorState(symbol, interval)
+        _states[key] = state
+        return state
+
+
+def sync_indicator_state(state: IndicatorState, df: pd.DataFrame, now_ms: int, persist: bool = True) -> Dict[str, float]:
+    """
+    Dokłada do stanu tylko nowe zamknięte świece z ramki OHLCV i zwraca wskaźniki dla ostatniego
+    wiersza ramki (otwarta świeca jest liczona przez peek, bez zapisu w stanie).
+    Luka między stanem a ramką -> stan jest odbudowywany z ramki.
+    """
+    if df.empty:
+        return state.values()
+    step_ms = candle_store.interval_to_ms(state.interval)
+    open_ms = df.index.as_unit('ms').asi8
+    closes = df['Close'].to_numpy()
+    volumes = df['Volume'].to_numpy()
+    is_closed = open_ms + step_ms <= now_ms
+
+    new = is_closed & (open_ms > state.last_open_time) if not state.empty else is_closed
+    new_idx = new.nonzero()[0]
+    if len(new_idx) and not state.empty and open_ms[new_idx[0]] != state.last_open_time + step_ms:
+        state.reset()
+        new_idx = is_closed.nonzero()[0]
+    for i in new_idx:
+        state.update(open_ms[i], closes[i], volumes[i])
+    if persist and len(new_idx):
+        save_indicator_state(state)
+
+    if not is_closed[-1]:
+        return state.peek(closes[-1], volumes[-1])
+    return state.values()
@@ -0,0 +1,150 @@
+# Plik: inference.py
+# Prognozy 21-dniowe na żądanie z boosterów zapisanych przez trening (model_store), bez budowania
+# macierzy cech z dwóch lat historii. Boostery są wczytywane raz na wersję (api_server trzyma je
+# w pamięci), a cechy liczone tylko dla ostatniego wiersza: najdłuższe okno to vol_63, więc
+# wystarczy FEATURE_WINDOW_BARS ostatnich świec dziennych. Wszystkie tickery idą do jednego predict.
+# lightgbm, yfinance i features_prices (import yfinance) ładowane przy pierwszym użyciu - import
+# api_server nie płaci za nie przy zimnym starcie, jeśli /predict nie jest wołany.
+
+import os
+import threading
+from datetime import timedelta
+from typing import Any, Dict, List, Tuple, Union
+import numpy as np
+import pandas as pd
+import feature_store
+import metrics
+from response_cache import SingleFlightCache
+
+# Modele do uśrednienia (np. "ensemble_1,ensemble_2"); domyślnie ensemble crona, a bez niego sim_*
+INFERENCE_MODELS = [m.strip() for m in os.environ.get("INFERENCE_MODELS", "").split(",") if m.strip()]
+FEATURE_WINDOW_BARS = 63 + 1  # vol_63: odchylenie z 63 zwrotów = 64 ceny (pozostałe okna są krótsze)
+PRICE_LOOKBACK_DAYS = 100     # Dni kalendarzowe pobierane z yfinance - zapas na luki w notowaniach
+PRICE_CACHE_TTL = int(os.environ.get("INFERENCE_PRICE_TTL", 15*60))  # s - świece dzienne zmieniają się raz na dobę
+DEFAULT_SENTIMENT = 0.0       # Jak w treningu dla dni bez newsów
+MAX_TICKERS = 250
+
+_price_cache = SingleFlightCache("inference_prices")
+_boosters: Dict[str, Tuple[Any, Dict[str, Any]]] = {}  # nazwa -> (lgb.Booster, metadane wersji)
+_boosters_lock = threading.Lock()
+
+
+# --- Modele ---
+def model_names() -> List[str]:
+    import model_store  # lightgbm
+    if INFERENCE_MODELS:
+        return INFERENCE_MODELS
+    return model_store.list_models("ensemble_") or model_store.list_models("sim_")
+
+
+def load_models() -> List[Tuple[Any, Dict[str, Any]]]:
+    """
+    Boostery do prognozy. Plik modelu jest parsowany tylko przy nowej wersji 'latest'
+    (sprawdzenie zmian = odczyt małego JSON-a), więc kolejne żądania używają boostera z pamięci.
+    """
+    import lightgbm as lgb
+    import model_store
+    models = []
+    for name in model_names():
+        meta = model_store.load_meta(name)
+        if meta is None:
+            continue
+        with _boosters_lock:
+            cached = _boosters.get(name)
+            if cached is None or cached[1]['version'] != meta['version']:
+                try:
+                    booster = lgb.Booster(model_file=model_store.booster_path(name, meta['version']))
+                except Exception as e:
+                    print(f"[inference] Nie udało się wczytać modelu {name} {meta['version']}: {e}")
+                    continue
+                cached = _boosters[name] = (booster, meta)
+        models.append(cached)
+    return models
+
+
+def default_tickers() -> List[str]:
+    """Tickery z ostatniego treningu (feature_store)."""
+    return list(feature_store.load_meta().get('tickers', []))
+
+
+# --- Cechy ostatniego wiersza ---
+def _download_window(tickers: Tuple[str, ...]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Ceny i wolumeny (data x ticker) z końcowego okna. end=dziś (wyłącznie) - tylko zamknięte świece, jak w treningu."""
+    import yfinance as yf
+    today = pd.Timestamp.now(tz='UTC').normalize()
+    start = (today - timedelta(days=PRICE_LOOKBACK_DAYS)).strftime("%Y-%m-%d")
+    with metrics.timer('inference.prices'):
+        data = yf.download(list(tickers), start=start, end=today.strftime("%Y-%m-%d"),
+                           auto_adjust=True, progress=False)
+    if data is None or data.empty:
+        return pd.DataFrame(), pd.DataFrame()
+    close, volume = data['Close'], data['Volume']
+    if isinstance(close, pd.Series):  # Starsze yfinance: jeden ticker bez poziomu kolumn
+        close, volume = close.to_frame(tickers[0]), volume.to_frame(tickers[0])
+    return close, volume
+
+
+def last_row_features(close: pd.DataFrame, volume: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cechy z ostatniej daty okna (index=ticker, kolumny FEATURE_COLUMNS). Te same wzory co w treningu
+    (price_features_from_panel), ale na FEATURE_WINDOW_BARS wierszach zamiast całej historii.
+    Tickery bez kompletnych cech na ostatnią datę (brak notowania, za krótka historia) są pomijane.
+    """
+    from features_prices import FEATURE_COLUMNS, FEATURE_DTYPE, price_features_from_panel
+    close = close.dropna(how='all')
+    if close.empty:
+        return pd.DataFrame(columns=FEATURE_COLUMNS, dtype=FEATURE_DTYPE)
+    close = close.tail(FEATURE_WINDOW_BARS)
+    feats = price_features_from_panel(close, volume)
+    latest = feats[feats.index == close.index[-1]]
+    latest = latest.set_index(latest['ticker'].astype(str).rename('ticker'))[FEATURE_COLUMNS]
+    latest.attrs['as_of'] = close.index[-1]
+    return latest
+
+
+# --- Prognoza ---
+def predict(tickers: Union[List[str], None] = None, top_k: Union[int, None] = None,
+            sentiment: Union[Dict[str, float], None] = None) -> Tuple[Dict[str, Any], str]:
+    """
+    Ranking prognoz zwrotu z horyzontu modelu dla podanych tickerów (domyślnie: z ostatniego treningu).
+    Przy kilku modelach - średnia (jak average_top_crypto.csv). sentiment: opcjonalnie ticker -> wartość,
+    brak = DEFAULT_SENTIMENT. Zwraca (wynik, status cache cen). FileNotFoundError, gdy brak modelu.
+    """
+    import model_store
+    from features_prices import FEATURE_DTYPE
+    models = load_models()
+    if not models:
+        raise FileNotFoundError(model_store.MODEL_DIR)
+    tickers = list(dict.fromkeys(t.strip().upper() for t in (tickers or default_tickers()) if t.strip()))
+    if not tickers:
+        raise ValueError("Brak tickerów do prognozy")
+    if len(tickers) > MAX_TICKERS:
+        raise ValueError(f"Za dużo tickerów ({len(tickers)} > {MAX_TICKERS})")
+
+    key = tuple(sorted(tickers))
+    (close, volume), status = _price_cache.get_or_compute(key, lambda: _download_window(key), ttl=PRICE_CACHE_TTL)
+    with metrics.timer('inference.features'):
+        feats = last_row_features(close, volume)
+        as_of = feats.attrs.get('as_of')
+        latest = feats.reindex([t for t in tickers if t in feats.index])
+        sentiment = {k.strip().upper(): v for k, v in (sentiment or {}).items()}
+        latest['sentiment'] = np.array([sentiment.get(t, DEFAULT_SENTIMENT) for t in latest.index], dtype=FEATURE_DTYPE)
+
+    preds = np.zeros(len(latest))
+    if len(latest):
+        with metrics.timer('inference.predict'):
+            # Jedno wywołanie predict na model dla całego koszyka
+            preds = np.mean([booster.predict(latest[meta['features']].to_numpy()) for booster, meta in models], axis=0)
+
+    ranked = pd.DataFrame({'ticker': latest.index, 'pred': preds}).sort_values('pred', ascending=False)
+    ranked['pred_%'] = ranked['pred'] * 100
+    ranked['rank'] = np.arange(1, len(ranked) + 1)
+    if top_k is not None:
+        ranked = ranked.head(top_k)
+    return {
+        'as_of': None if as_of is None else pd.Timestamp(as_of).strftime('%Y-%m-%d'),
+        'horizon': models[0][1].get('horizon'),
+        'models': [{'name': meta['name'], 'version': meta['version']} for _, meta in models],
+        'predictions': ranked.to_dict(orient='records'),
+        'missing': [t for t in tickers if t not in latest.index],
+    }, status
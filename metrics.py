@@ -0,0 +1,250 @@
+# Plik: metrics.py
+# Lekka instrumentacja w pamięci procesu: histogramy czasów etapów, liczniki (zapytania, błędy,
+# trafienia cache), szczytowe zużycie pamięci. Eksport w formacie Prometheus (/metrics w api_server)
+# oraz jako raport JSON z jednego uruchomienia (cron).
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Tuple, Union
+
+PREFIX = "cryptoai_"
+# Granice koszyków histogramu (s) - od pojedynczych wywołań numpy po pełny skan/trening
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_lock = threading.Lock()
+_histograms: Dict[Tuple[str, Tuple], Dict[str, Any]] = {}
+_counters: Dict[Tuple[str, Tuple], float] = {}
+_started_at = time.time()
+_worker_peak_rss = 0  # Największe szczytowe RSS zgłoszone przez procesy robocze (merge_state)
+
+_HELP = {
+    'stage_seconds': ("histogram", "Czas etapu przetwarzania"),
+    'http_request_seconds': ("histogram", "Czas obsługi żądania HTTP"),
+    'http_requests_total': ("counter", "Żądania HTTP wg ścieżki i statusu"),
+    'cache_requests_total': ("counter", "Odczyty cache wg wyniku (hit/miss/coalesced)"),
+    'errors_total': ("counter", "Błędy wg miejsca wystąpienia"),
+}
+
+
+def _key(name: str, labels: Dict[str, Any]) -> Tuple[str, Tuple]:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def observe(name: str, value: float, **labels) -> None:
+    """Dodaje obserwację do histogramu `name` z etykietami."""
+    with _lock:
+        h = _histograms.get(_key(name, labels))
+        if h is None:
+            h = _histograms[_key(name, labels)] = {'buckets': [0] * len(BUCKETS), 'count': 0, 'sum': 0.0, 'max': 0.0}
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                h['buckets'][i] += 1
+        h['count'] += 1
+        h['sum'] += value
+        h['max'] = max(h['max'], value)
+
+
+def inc(name: str, value: float = 1, **labels) -> None:
+    with _lock:
+        key = _key(name, labels)
+        _counters[key] = _counters.get(key, 0) + value
+
+
+@contextmanager
+def timer(stage: str, **labels):
+    """Mierzy czas bloku jako etap `stage` (histogram stage_seconds); wyjątek liczony w errors_total."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        inc('errors_total', where=stage)
+        raise
+    finally:
+        observe('stage_seconds', time.perf_counter() - start, stage=stage, **labels)
+
+
+def cache_result(cache: str, result: str, count: int = 1) -> None:
+    """Odczyt cache: result = 'hit' | 'miss' | 'coalesced'."""
+    if count:
+        inc('cache_requests_total', count, cache=cache, result=result)
+
+
+def peak_rss_bytes(children: bool = False) -> Union[int, None]:
+    """
+    Szczytowe RSS procesu (None, gdy platforma nie udostępnia modułu resource). children=True:
+    największe RSS zakończonych procesów potomnych (np. puli ProcessPoolExecutor po jej zamknięciu).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    return resource.getrusage(who).ru_maxrss * 1024  # Linux: KB
+
+
+def reset() -> None:
+    global _started_at, _worker_peak_rss
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+        _started_at = time.time()
+        _worker_peak_rss = 0
+
+
+# --- Procesy robocze ---
+# Rejestr żyje w pamięci procesu, więc etapy mierzone w ProcessPoolExecutor przepadłyby razem
+# z procesem. Worker zwraca export_state() razem z wynikiem, a proces główny robi merge_state().
+def export_state() -> Dict[str, Any]:
+    """Surowy stan rejestru (do przesłania z procesu roboczego; zwykłe dict/tuple - pickle)."""
+    with _lock:
+        return {
+            'histograms': {k: dict(v, buckets=list(v['buckets'])) for k, v in _histograms.items()},
+            'counters': dict(_counters),
+            'peak_rss_bytes': peak_rss_bytes(),
+        }
+
+
+def merge_state(state: Dict[str, Any]) -> None:
+    """Dolicza stan z export_state() innego procesu do rejestru tego procesu."""
+    global _worker_peak_rss
+    with _lock:
+        for key, h in state['histograms'].items():
+            mine = _histograms.get(key)
+            if mine is None:
+                _histograms[key] = dict(h, buckets=list(h['buckets']))
+                continue
+            mine['buckets'] = [a + b for a, b in zip(mine['buckets'], h['buckets'])]
+            mine['count'] += h['count']
+            mine['sum'] += h['sum']
+            mine['max'] = max(mine['max'], h['max'])
+        for key, value in state['counters'].items():
+            _counters[key] = _counters.get(key, 0) + value
+        _worker_peak_rss = max(_worker_peak_rss, state.get('peak_rss_bytes') or 0)
+
+
+def peak_rss_workers_bytes() -> Union[int, None]:
+    """Największe szczytowe RSS procesów roboczych: zgłoszone przez merge_state lub RUSAGE_CHILDREN."""
+    children = peak_rss_bytes(children=True) or 0
+    with _lock:
+        peak = max(_worker_peak_rss, children)
+    return peak or None
+
+
+# --- Eksport ---
+def _labels_str(labels: Tuple, extra: str = "") -> str:
+    parts = ['{}="{}"'.format(k, v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _upstream_counters() -> Dict[Tuple[str, Tuple], float]:
+    """Metryki http_client (per endpoint) jako liczniki w tym samym rejestrze."""
+    import http_client
+    out = {}
+    for endpoint, m in http_client.get_metrics().items():
+        for status, n in m['status'].items():
+            out[_key('upstream_requests_total', {'endpoint': endpoint, 'status': status})] = n
+        out[_key('upstream_retries_total', {'endpoint': endpoint})] = m['retries']
+        out[_key('upstream_errors_total', {'endpoint': endpoint})] = m['errors']
+        out[_key('upstream_seconds_total', {'endpoint': endpoint})] = m['total_s']
+    return out
+
+
+def render_prometheus() -> str:
+    """Wszystkie metryki w formacie tekstowym Prometheus (text/plain; version=0.0.4)."""
+    with _lock:
+        histograms = {k: dict(v, buckets=list(v['buckets'])) for k, v in _histograms.items()}
+        counters = dict(_counters)
+    counters.update(_upstream_counters())
+
+    lines = []
+    declared = set()
+
+    def declare(name, default_type):
+        if name not in declared:
+            kind, help_text = _HELP.get(name, (default_type, name))
+            lines.append(f"# HELP {PREFIX}{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}{name} {kind}")
+            declared.add(name)
+
+    for (name, labels), h in sorted(histograms.items()):
+        declare(name, "histogram")
+        for bound, n in zip(BUCKETS, h['buckets']):
+            le = 'le="%s"' % bound
+            lines.append(f"{PREFIX}{name}_bucket{_labels_str(labels, le)} {n}")
+        le = 'le="+Inf"'
+        lines.append(f"{PREFIX}{name}_bucket{_labels_str(labels, le)} {h['count']}")
+        lines.append(f"{PREFIX}{name}_sum{_labels_str(labels)} {h['sum']}")
+        lines.append(f"{PREFIX}{name}_count{_labels_str(labels)} {h['count']}")
+    for (name, labels), value in sorted(counters.items()):
+        declare(name, "counter")
+        lines.append(f"{PREFIX}{name}{_labels_str(labels)} {value}")
+
+    rss = peak_rss_bytes()
+    if rss is not None:
+        lines.append(f"# HELP {PREFIX}peak_rss_bytes Szczytowe RSS procesu")
+        lines.append(f"# TYPE {PREFIX}peak_rss_bytes gauge")
+        lines.append(f"{PREFIX}peak_rss_bytes {rss}")
+    workers_rss = peak_rss_workers_bytes()
+    if workers_rss is not None:
+        lines.append(f"# HELP {PREFIX}peak_rss_workers_bytes Szczytowe RSS procesów roboczych")
+        lines.append(f"# TYPE {PREFIX}peak_rss_workers_bytes gauge")
+        lines.append(f"{PREFIX}peak_rss_workers_bytes {workers_rss}")
+    return "\n".join(lines) + "\n"
+
+
+def snapshot() -> Dict[str, Any]:
+    """Podsumowanie do raportu: etapy (count/sum/mean/max), liczniki, trafienia cache, upstream, pamięć."""
+    import http_client
+    with _lock:
+        histograms = {k: dict(v) for k, v in _histograms.items()}
+        counters = dict(_counters)
+
+    stages = {}
+    for (name, labels), h in histograms.items():
+        label = ",".join(f"{k}={v}" for k, v in labels)
+        stages[f"{name}[{label}]" if name != 'stage_seconds' else dict(labels).get('stage', label)] = {
+            'count': h['count'], 'total_s': h['sum'], 'mean_s': h['sum'] / h['count'], 'max_s': h['max'],
+        }
+
+    caches: Dict[str, Dict[str, float]] = {}
+    other = {}
+    for (name, labels), value in counters.items():
+        lab = dict(labels)
+        if name == 'cache_requests_total':
+            caches.setdefault(lab['cache'], {})[lab['result']] = value
+        else:
+            other[f"{name}[{','.join(f'{k}={v}' for k, v in labels)}]"] = value
+    for stats in caches.values():
+        total = sum(stats.values())
+        stats['hit_rate'] = (total - stats.get('miss', 0)) / total if total else None
+
+    rss = peak_rss_bytes()
+    workers_rss = peak_rss_workers_bytes()
+    return {
+        'stages': stages, 'counters': other, 'caches': caches, 'upstream': http_client.get_metrics(),
+        'peak_rss_mb': rss / 2**20 if rss is not None else None,
+        'peak_rss_workers_mb': workers_rss / 2**20 if workers_rss is not None else None,
+    }
+
+
+def write_run_report(path: str, **extra) -> Dict[str, Any]:
+    """Raport JSON z bieżącego uruchomienia (np. cron): czasy etapów, cache, upstream, pamięć."""
+    report = dict(
+        extra,
+        started_at=datetime.fromtimestamp(_started_at, timezone.utc).isoformat(),
+        finished_at=datetime.now(timezone.utc).isoformat(),
+        duration_s=time.time() - _started_at,
+        **snapshot(),
+    )
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(report, f, indent=2, default=str)
+    os.replace(tmp_path, path)
+    return report
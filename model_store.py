@@ -0,0 +1,101 @@
+# Plik: model_store.py
+# Wersjonowane artefakty modeli LightGBM: plik boostera (.txt) + metadane (schemat cech, zakres danych).
+# Układ: models/<nazwa>/<wersja>.txt, models/<nazwa>/<wersja>.json, models/<nazwa>/latest.json
+
+import json
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Tuple, Union
+import lightgbm as lgb
+
+MODEL_DIR = os.environ.get("MODEL_DIR", "models")
+KEEP_VERSIONS = 5  # Ile ostatnich wersji trzymamy na dysku
+
+
+def _model_dir(name: str) -> str:
+    return os.path.join(MODEL_DIR, name)
+
+
+def _write_json(path: str, data: Dict[str, Any]) -> None:
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+
+def booster_path(name: str, version: str) -> str:
+    return os.path.join(_model_dir(name), f"{version}.txt")
+
+
+def save_model(model: Any, name: str, meta: Dict[str, Any]) -> str:
+    """Zapisuje booster (LGBMRegressor lub lgb.Booster) jako nową wersję i przestawia 'latest'. Zwraca wersję."""
+    booster = model.booster_ if hasattr(model, 'booster_') else model
+    os.makedirs(_model_dir(name), exist_ok=True)
+    version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    booster.save_model(booster_path(name, version))
+    meta = dict(meta, name=name, version=version, num_trees=booster.num_trees(),
+                created_at=datetime.now(timezone.utc).isoformat())
+    _write_json(os.path.join(_model_dir(name), f"{version}.json"), meta)
+    _write_json(os.path.join(_model_dir(name), "latest.json"), {'version': version})
+    _prune_versions(name)
+    return version
+
+
+def _prune_versions(name: str) -> None:
+    versions = sorted(f[:-4] for f in os.listdir(_model_dir(name)) if f.endswith('.txt'))
+    for version in versions[:-KEEP_VERSIONS]:
+        for ext in ('.txt', '.json'):
+            try:
+                os.remove(os.path.join(_model_dir(name), version + ext))
+            except OSError:
+                pass
+
+
+def load_meta(name: str) -> Union[Dict[str, Any], None]:
+    """Metadane najnowszej wersji modelu (None, gdy model nie istnieje)."""
+    try:
+        with open(os.path.join(_model_dir(name), "latest.json")) as f:
+            version = json.load(f)['version']
+        with open(os.path.join(_model_dir(name), f"{version}.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def load_latest(name: str) -> Tuple[Union[lgb.Booster, None], Union[Dict[str, Any], None]]:
+    """Najnowszy booster i jego metadane; (None, None), gdy brak zapisanego modelu."""
+    meta = load_meta(name)
+    if meta is None:
+        return None, None
+    try:
+        return lgb.Booster(model_file=booster_path(name, meta['version'])), meta
+    except Exception:
+        return None, None
+
+
+def list_models(prefix: str = "") -> List[str]:
+    """Nazwy modeli z zapisaną wersją 'latest' (opcjonalnie tylko z danym prefiksem)."""
+    try:
+        names = os.listdir(MODEL_DIR)
+    except OSError:
+        return []
+    return sorted(n for n in names if n.startswith(prefix) and os.path.exists(os.path.join(_model_dir(n), "latest.json")))
+
+
+# --- Najlepsze hiperparametry (zapisywane przez tune_model_crypto.py) ---
+def best_params_path() -> str:
+    return os.path.join(MODEL_DIR, "best_params.json")
+
+
+def save_best_params(params: Dict[str, Any], meta: Dict[str, Any]) -> None:
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    _write_json(best_params_path(), dict(meta, params=params, tuned_at=datetime.now(timezone.utc).isoformat()))
+
+
+def load_best_params() -> Dict[str, Any]:
+    """Zawartość best_params.json ({'params': ..., 'tuned_at': ..., ...}); {} gdy strojenia jeszcze nie było."""
+    try:
+        with open(best_params_path()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
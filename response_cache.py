@@ -0,0 +1,69 @@
+# Plik: response_cache.py
+# Cache wyników w pamięci procesu z TTL + single-flight: równoczesne identyczne żądania
+# czekają na jedno obliczenie zamiast uruchamiać własny skan.
+
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Tuple
+import metrics
+from candle_store import interval_to_ms
+
+SCAN_CACHE_MIN_TTL = 5                                              # s - tuż przed zamknięciem świecy
+SCAN_CACHE_MAX_TTL = int(os.environ.get("SCAN_CACHE_MAX_TTL", 15*60))  # s - bieżąca świeca też się zmienia
+
+
+def ttl_until_candle_close(interval: str, now: float = None) -> float:
+    """Sekundy do zamknięcia bieżącej świecy (granice interwałów liczone od epoki UTC, jak na Binance)."""
+    now_ms = int((time.time() if now is None else now) * 1000)
+    step_ms = interval_to_ms(interval)
+    remaining = (step_ms - now_ms % step_ms) / 1000
+    return min(max(remaining, SCAN_CACHE_MIN_TTL), SCAN_CACHE_MAX_TTL)
+
+
+class SingleFlightCache:
+    """Cache klucz -> wynik z TTL. Błędy nie są cache'owane (trafiają do wszystkich czekających)."""
+
+    def __init__(self, name: str = "response"):
+        self.name = name  # Etykieta w metrykach cache
+        self._lock = threading.Lock()
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}  # klucz -> (wygasa [monotonic], wynik)
+        self._inflight: Dict[Hashable, Future] = {}
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any], ttl: float) -> Tuple[Any, str]:
+        """Zwraca (wynik, status), status: 'HIT' | 'COALESCED' | 'MISS'."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                metrics.cache_result(self.name, 'hit')
+                return entry[1], 'HIT'
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = Future()
+        if not leader:
+            metrics.cache_result(self.name, 'coalesced')
+            return flight.result(), 'COALESCED'
+        metrics.cache_result(self.name, 'miss')
+
+        try:
+            result = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            flight.set_exception(e)
+            raise
+        with self._lock:
+            now = time.monotonic()
+            # Sprzątanie wygasłych wpisów przy okazji zapisu
+            for k in [k for k, (expires, _) in self._entries.items() if expires <= now]:
+                del self._entries[k]
+            self._entries[key] = (now + ttl, result)
+            del self._inflight[key]
+        flight.set_result(result)
+        return result, 'MISS'
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
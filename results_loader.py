@@ -0,0 +1,52 @@
+# Plik: results_loader.py
+# Wspólny loader wyników crona (CSV w top_results_crypto/) z cache w pamięci procesu.
+# Kluczem jest (mtime, rozmiar) pliku: plik jest parsowany ponownie tylko wtedy, gdy cron go nadpisze,
+# a sprawdzenie zmian to jeden os.stat - tani poll zamiast blokującego time.sleep w dashboardzie.
+
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Tuple, Union
+import pandas as pd
+
+RESULTS_DIR = "top_results_crypto"
+AVG_FILE = f"{RESULTS_DIR}/average_top_crypto.csv"
+RESULTS_POLL_SECONDS = int(os.environ.get("RESULTS_POLL_SECONDS", 60))  # Co ile dashboard sprawdza plik
+
+_lock = threading.Lock()
+_cache: Dict[str, Tuple[Tuple[int, int], pd.DataFrame]] = {}  # ścieżka -> ((mtime_ns, rozmiar), ramka)
+
+
+def file_signature(path: str) -> Union[Tuple[int, int], None]:
+    """(mtime_ns, rozmiar) pliku albo None, gdy plik nie istnieje."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def load_csv(path: str) -> pd.DataFrame:
+    """
+    CSV z cache współdzielonego przez wszystkie sesje; ponowne parsowanie tylko po zmianie pliku.
+    Zwraca kopię (sesje mogą ją modyfikować). FileNotFoundError, gdy pliku jeszcze nie ma.
+    """
+    signature = file_signature(path)
+    if signature is None:
+        raise FileNotFoundError(path)
+    with _lock:
+        cached = _cache.get(path)
+        if cached is None or cached[0] != signature:
+            # Plik zapisany w trakcie odczytu zmieni sygnaturę - następny poll wczyta go ponownie
+            cached = _cache[path] = (signature, pd.read_csv(path))
+    return cached[1].copy()
+
+
+def load_average_top(path: str = AVG_FILE) -> pd.DataFrame:
+    """Uśrednione prognozy ensemble (ticker, pred_%)."""
+    return load_csv(path)
+
+
+def last_modified(path: str = AVG_FILE) -> Union[datetime, None]:
+    signature = file_signature(path)
+    return datetime.fromtimestamp(signature[0] / 1e9) if signature else None
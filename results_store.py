@@ -0,0 +1,230 @@
+# Plik: results_store.py
+# Historia prognoz w SQLite (tylko dopisywanie): każde uruchomienie crona to nowy 'run' z prognozami
+# per ticker i symulacja (0 = średnia ensemble). Zrealizowane zwroty są dopisywane później, gdy
+# horyzont minie (target z macierzy cech), więc można liczyć trafność prognoz w dowolnym zakresie dat.
+# Baza nie trafia do gita (rosnący plik binarny w każdym commicie crona): w GitHub Actions jest
+# przenoszona między uruchomieniami przez cache i publikowana jako artefakt, a wdrożone api_server
+# wskazuje trwały wolumen przez RESULTS_DB_PATH.
+#
+# Tabele: runs(run_id, run_at, as_of, horizon, job, simulations)
+#         predictions(run_id, simulation, ticker, run_at, as_of, pred, rank)  - indeksy po (ticker, run_at), (run_at)
+#         realized(ticker, as_of, horizon, realized)                           - zwrot z horyzontu od as_of
+
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Union
+import numpy as np
+import pandas as pd
+
+RESULTS_DB_PATH = os.environ.get("RESULTS_DB_PATH", "results_store/results.sqlite")
+ENSEMBLE_SIMULATION = 0  # Numer "symulacji" dla średniej z ensemble
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_at TEXT NOT NULL,
+    as_of TEXT NOT NULL,
+    horizon INTEGER NOT NULL,
+    job TEXT NOT NULL,
+    simulations INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS predictions (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    simulation INTEGER NOT NULL,
+    ticker TEXT NOT NULL,
+    run_at TEXT NOT NULL,
+    as_of TEXT NOT NULL,
+    pred REAL NOT NULL,
+    rank INTEGER NOT NULL,
+    PRIMARY KEY (run_id, simulation, ticker)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS predictions_ticker_run_at ON predictions (ticker, run_at);
+CREATE INDEX IF NOT EXISTS predictions_run_at ON predictions (run_at);
+CREATE TABLE IF NOT EXISTS realized (
+    ticker TEXT NOT NULL,
+    as_of TEXT NOT NULL,
+    horizon INTEGER NOT NULL,
+    realized REAL NOT NULL,
+    PRIMARY KEY (ticker, as_of, horizon)
+) WITHOUT ROWID;
+"""
+
+
+def _connect(readonly: bool = False) -> sqlite3.Connection:
+    """Połączenie z bazą. readonly: bez tworzenia pliku (FileNotFoundError, gdy bazy jeszcze nie ma)."""
+    if readonly:
+        if not os.path.exists(RESULTS_DB_PATH):
+            raise FileNotFoundError(RESULTS_DB_PATH)
+        return sqlite3.connect(f"file:{RESULTS_DB_PATH}?mode=ro", uri=True, timeout=30)
+    os.makedirs(os.path.dirname(RESULTS_DB_PATH) or '.', exist_ok=True)
+    conn = sqlite3.connect(RESULTS_DB_PATH, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")  # Odczyty API nie blokują zapisu crona
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+@contextmanager
+def _db(readonly: bool = False) -> Iterator[sqlite3.Connection]:
+    """Połączenie na czas bloku: commit po sukcesie (rollback po błędzie) i zawsze zamknięcie."""
+    conn = _connect(readonly)
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def checkpoint() -> None:
+    """
+    Przenosi WAL do pliku bazy i przełącza dziennik na DELETE - cache i artefakt zawierają jeden,
+    kompletny plik .sqlite (bez -wal/-shm). Kolejny zapis crona ponownie włącza WAL.
+    """
+    if not os.path.exists(RESULTS_DB_PATH):
+        return
+    conn = sqlite3.connect(RESULTS_DB_PATH, timeout=30)
+    try:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        conn.close()
+
+
+def _day(value) -> str:
+    return pd.Timestamp(value).strftime('%Y-%m-%d')
+
+
+def _utc_iso(value, end_of_day: bool = False) -> str:
+    """Granica zakresu w formacie kolumny run_at. Sama data jako koniec zakresu obejmuje cały dzień."""
+    ts = pd.Timestamp(value)
+    ts = ts.tz_localize('UTC') if ts.tzinfo is None else ts.tz_convert('UTC')
+    if end_of_day:
+        ts = ts + pd.Timedelta(days=1) if ts == ts.normalize() else ts + pd.Timedelta(microseconds=1)
+    return ts.isoformat()
+
+
+# --- Zapis (cron) ---
+def record_run(predictions: pd.DataFrame, as_of, horizon: int, job: str, run_at: Union[datetime, None] = None) -> int:
+    """
+    Dopisuje jedno uruchomienie. predictions: kolumny ticker, simulation, pred (wszystkie tickery z
+    ostatniej daty, nie tylko Top K). Ranking liczony w obrębie symulacji. Zwraca run_id.
+    """
+    run_at = (run_at or datetime.now(timezone.utc)).isoformat()
+    as_of = _day(as_of)
+    ranked = predictions.assign(
+        rank=predictions.groupby('simulation')['pred'].rank(ascending=False, method='first').astype(int)
+    )
+    with _db() as conn:
+        cur = conn.execute(
+            "INSERT INTO runs (run_at, as_of, horizon, job, simulations) VALUES (?, ?, ?, ?, ?)",
+            (run_at, as_of, int(horizon), job, int(ranked['simulation'].nunique())),
+        )
+        run_id = cur.lastrowid
+        conn.executemany(
+            "INSERT INTO predictions (run_id, simulation, ticker, run_at, as_of, pred, rank) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            ((run_id, int(sim), str(t), run_at, as_of, float(p), int(r))
+             for sim, t, p, r in ranked[['simulation', 'ticker', 'pred', 'rank']].itertuples(index=False)),
+        )
+    return run_id
+
+
+def pending_realized(horizon: int) -> pd.DataFrame:
+    """Pary (ticker, as_of) z prognozami, dla których nie znamy jeszcze zrealizowanego zwrotu."""
+    with _db() as conn:
+        return pd.read_sql_query(
+            """SELECT DISTINCT p.ticker, p.as_of FROM predictions p JOIN runs USING (run_id)
+               LEFT JOIN realized r ON r.ticker = p.ticker AND r.as_of = p.as_of AND r.horizon = runs.horizon
+               WHERE runs.horizon = ? AND r.realized IS NULL""",
+            conn, params=(int(horizon),),
+        )
+
+
+def record_realized(targets: pd.DataFrame, horizon: int) -> int:
+    """
+    Uzupełnia zrealizowane zwroty dla oczekujących prognoz. targets: index z datami, kolumny
+    ticker i target (jak macierz cech - target to zwrot z `horizon` dni od danej daty). Zwraca liczbę nowych wierszy.
+    """
+    pending = pending_realized(horizon)
+    if pending.empty:
+        return 0
+    known = targets.loc[targets['target'].notna(), ['ticker', 'target']]
+    known = pd.DataFrame({
+        'ticker': known['ticker'].astype(str).to_numpy(),
+        'as_of': pd.DatetimeIndex(known.index).strftime('%Y-%m-%d'),
+        'realized': known['target'].to_numpy(dtype='float64'),
+    })
+    rows = pending.merge(known, on=['ticker', 'as_of'])
+    if rows.empty:
+        return 0
+    with _db() as conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO realized (ticker, as_of, horizon, realized) VALUES (?, ?, ?, ?)",
+            ((t, d, int(horizon), float(v)) for t, d, v in rows[['ticker', 'as_of', 'realized']].itertuples(index=False)),
+        )
+    return len(rows)
+
+
+# --- Odczyt (api_server) ---
+def history(ticker: Union[str, None] = None, start=None, end=None, simulation: Union[int, None] = ENSEMBLE_SIMULATION,
+            limit: int = 5000) -> pd.DataFrame:
+    """Prognozy (z faktycznym zwrotem, gdy już znany) w zakresie dat uruchomienia [start, end]."""
+    conditions = []
+    if ticker is not None:
+        conditions.append(("p.ticker = ?", ticker))
+    if start is not None:
+        conditions.append(("p.run_at >= ?", _utc_iso(start)))
+    if end is not None:
+        conditions.append(("p.run_at < ?", _utc_iso(end, end_of_day=True)))
+    if simulation is not None:
+        conditions.append(("p.simulation = ?", int(simulation)))
+    where = [c for c, _ in conditions]
+    params = [v for _, v in conditions]
+    query = f"""
+        SELECT p.run_id, p.run_at, p.as_of, p.simulation, p.ticker, p.pred, p.rank, runs.horizon, r.realized
+        FROM predictions p JOIN runs USING (run_id)
+        LEFT JOIN realized r ON r.ticker = p.ticker AND r.as_of = p.as_of AND r.horizon = runs.horizon
+        {'WHERE ' + ' AND '.join(where) if where else ''}
+        ORDER BY p.run_at DESC, p.simulation, p.rank
+        LIMIT ?"""
+    with _db(readonly=True) as conn:
+        return pd.read_sql_query(query, conn, params=params + [int(limit)])
+
+
+def _spearman(a: np.ndarray, b: np.ndarray) -> Union[float, None]:
+    if len(a) < 3:
+        return None
+    ic = pd.Series(a).rank().corr(pd.Series(b).rank())
+    return None if pd.isna(ic) else float(ic)
+
+
+def accuracy(start=None, end=None, ticker: Union[str, None] = None, simulation: int = ENSEMBLE_SIMULATION,
+             top_k: int = 5) -> Dict[str, Any]:
+    """
+    Trafność prognoz ze zrealizowanym zwrotem: MAE, trafność kierunku, IC (korelacja rang prognozy
+    i zwrotu w obrębie uruchomienia) oraz średni zwrot Top K. Ogółem i per uruchomienie.
+    """
+    df = history(ticker, start, end, simulation, limit=10**9)
+    df = df[df['realized'].notna()]
+    if df.empty:
+        return {'evaluated': 0, 'runs': []}
+
+    def stats(g: pd.DataFrame) -> Dict[str, Any]:
+        err = g['pred'] - g['realized']
+        return {
+            'n': int(len(g)),
+            'mae': float(err.abs().mean()),
+            'bias': float(err.mean()),
+            'hit_rate': float((np.sign(g['pred']) == np.sign(g['realized'])).mean()),
+            'ic': _spearman(g['pred'].to_numpy(), g['realized'].to_numpy()),
+            'top_k_realized': float(g.loc[g['rank'] <= top_k, 'realized'].mean()) if (g['rank'] <= top_k).any() else None,
+        }
+
+    runs: List[Dict[str, Any]] = [
+        {'run_id': int(run_id), 'run_at': g['run_at'].iloc[0], 'as_of': g['as_of'].iloc[0], **stats(g)}
+        for run_id, g in df.groupby('run_id', sort=False)
+    ]
+    ics = [r['ic'] for r in runs if r['ic'] is not None]
+    overall = stats(df)
+    overall['ic'] = float(np.mean(ics)) if ics else None  # Średnie IC z uruchomień (nie z puli)
+    return {'evaluated': int(len(df)), 'simulation': simulation, 'top_k': top_k, 'overall': overall, 'runs': runs}
@@ -1,17 +1,27 @@
 import os
 import pandas as pd
 import subprocess
-import time
+import metrics
+import results_store
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from train_model_crypto import (HORIZON, RUN_REPORT_FILE, TOP_K, build_feature_matrix, fit_or_update,
+                                load_training_frames, predict_top, store_features)
 
 # Stała liczba symulacji (zoptymalizowana dla darmowego tieru)
 NUM_SIMULATIONS = 5 
 RESULTS_DIR = "top_results_crypto"
 AVG_FILE = f"{RESULTS_DIR}/average_top_crypto.csv"
+ENSEMBLE_WORKERS = int(os.environ.get("ENSEMBLE_WORKERS", os.cpu_count() or 1))
+ENSEMBLE_BASE_SEED = 42
+# Commit plików CSV z wynikami do repozytorium - opcjonalny (RESULTS_GIT_PUSH=1). Historia prognoz
+# (results_store) i raport czasów nie są commitowane.
+RESULTS_GIT_PUSH = os.environ.get("RESULTS_GIT_PUSH", "0") == "1"
+RESULTS_CSV_FILES = [AVG_FILE] + [f"{RESULTS_DIR}/last_top_crypto_{i}.csv" for i in range(1, NUM_SIMULATIONS + 1)]
 
 
 def git_push_results():
-    """Wypycha zaktualizowany plik CSV do repozytorium GitHub, wymuszając operacje Git."""
+    """Wypycha zaktualizowane pliki CSV z wynikami do repozytorium GitHub, wymuszając operacje Git."""
     print("--- ROZPOCZĘTO OPERACJĘ ZAPISU GIT ---")
     
     # 1. Konfiguracja Gita
@@ -25,11 +35,10 @@ def git_push_results():
     except subprocess.CalledProcessError:
         print("Brak zmian do pobrania lub błąd 'pull'. Kontynuuję.")
     
-    # 3. Dodanie plików (w tym folderu, jeśli nie jest jeszcze śledzony)
+    # 3. Dodanie plików CSV (bez run_timing.json i pozostałych raportów z RESULTS_DIR)
     try:
-        subprocess.run(["git", "add", RESULTS_DIR], check=True)
-        subprocess.run(["git", "add", AVG_FILE], check=True)
-        print("✅ Dodano folder i plik do stage'a.")
+        subprocess.run(["git", "add", "--"] + [f for f in RESULTS_CSV_FILES if os.path.exists(f)], check=True)
+        print("✅ Dodano pliki CSV do stage'a.")
     except Exception as e:
         print(f"❌ BŁĄD w 'git add': {e}")
         return
@@ -59,41 +68,72 @@ def git_push_results():
         print("Błąd autoryzacji. MUSISZ SPRAWDZIĆ USTAWIENIA GITHUB (Read and write permissions).")
 
 
+# --- ENSEMBLE W JEDNYM PROCESIE ---
+# Cechy budujemy raz, a N modeli z różnymi seedami (bagging) trenujemy równolegle w puli procesów.
+
+_worker_data = {}
+
+def _init_worker(X, y):
+    """Dane treningowe trafiają do procesu roboczego raz (initializer), a nie z każdym zadaniem."""
+    _worker_data['X'] = X
+    _worker_data['y'] = y
+
+def _train_member(sim, n_jobs):
+    model = fit_or_update(f"ensemble_{sim}", _worker_data['X'], _worker_data['y'],
+                          seed=ENSEMBLE_BASE_SEED + sim, bagging=True, n_jobs=n_jobs)
+    return sim, model
+
+def _train_member_in_worker(sim, n_jobs):
+    """W procesie roboczym: metryki tego zadania (train.fit, RSS) wracają do procesu głównego z modelem."""
+    metrics.reset()  # Proces roboczy obsługuje kolejne zadania - bez podwójnego liczenia
+    sim, model = _train_member(sim, n_jobs)
+    return sim, model, metrics.export_state()
+
+def train_ensemble(X, y, num_simulations=NUM_SIMULATIONS, workers=ENSEMBLE_WORKERS):
+    """Trenuje num_simulations modeli (różne seedy + bagging). Zwraca {sim: model}."""
+    workers = max(1, min(workers, num_simulations))
+    n_jobs = max(1, (os.cpu_count() or 1) // workers) # Bez nadsubskrypcji rdzeni
+    sims = range(1, num_simulations + 1)
+
+    if workers == 1:
+        _init_worker(X, y)
+        return dict(_train_member(sim, n_jobs) for sim in sims)
+
+    models = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(X, y)) as pool:
+        for sim, model, state in pool.map(_train_member_in_worker, sims, [n_jobs]*num_simulations):
+            metrics.merge_state(state)
+            models[sim] = model
+    return models
+
 def run_and_aggregate_simulations(num_simulations=NUM_SIMULATIONS):
     
-    dfs = []
     os.makedirs(RESULTS_DIR, exist_ok=True)
     
-    print(f"--- ROZPOCZĘTO WIELOKROTNĄ SYMULACJĘ KRYPTOWALUT ({num_simulations} cykli) ---")
+    print(f"--- ROZPOCZĘTO WIELOKROTNĄ SYMULACJĘ KRYPTOWALUT ({num_simulations} modeli, {ENSEMBLE_WORKERS} procesów) ---")
 
-    for sim in range(1, num_simulations + 1):
-        print(f"=== Symulacja {sim}/{num_simulations} ===")
-        
-        env = os.environ.copy()
-        env["SIMULATION_NUMBER"] = str(sim)
-        
-        try:
-             # 🚨 KRYTYCZNA ZMIANA: Użycie 'python' jako pierwszego argumentu.
-             # Ta konstrukcja jest najbardziej niezawodna w środowiskach CI/CD.
-             subprocess.run(["python", "train_model_crypto.py"], check=True, env=env)
-        except subprocess.CalledProcessError as e:
-             # Zatrzymujemy działanie całego Workflow, jeśli trenowanie zawiedzie.
-             print(f"BŁĄD: train_model_crypto.py zakończył się niepowodzeniem w symulacji {sim}. Szczegóły: {e}")
-             print("Prawdopodobnie błąd pobierania danych z zewnętrznego API. Przerywam.")
-             return # Przerywamy działanie, jeśli model nie jest trenowany
+    # 1. Cechy budujemy tylko raz i odkładamy do feature_store (trening czyta je przez mmap)
+    try:
+        features, Xcols = build_feature_matrix()
+    except Exception as e:
+        print(f"BŁĄD: budowanie cech zakończyło się niepowodzeniem. Szczegóły: {e}")
+        print("Prawdopodobnie błąd pobierania danych z zewnętrznego API. Przerywam.")
+        return
+    start, end = store_features(features)
+    del features
+    train, latest = load_training_frames(Xcols, start, end)
 
-        
-        top_file = f"{RESULTS_DIR}/last_top_crypto_{sim}.csv"
-        try:
-            df = pd.read_csv(top_file)
-            df['simulation_id'] = sim
-            dfs.append(df)
-        except FileNotFoundError:
-            print(f"Ostrzeżenie: Plik {top_file} nie został znaleziony.")
-        
-        if sim < num_simulations:
-            print(f"Pauza 60 sekund przed kolejną symulacją...")
-            time.sleep(60)
+    # 2. Trening ensemble
+    with metrics.timer('train.ensemble'):
+        models = train_ensemble(train[Xcols], train['target'], num_simulations)
+
+    # Prognozy dla wszystkich tickerów z ostatniej daty (historia i trafność liczone na całym przekroju)
+    dfs = []
+    for sim, model in sorted(models.items()):
+        with metrics.timer('train.predict'):
+            df = predict_top(model, latest, Xcols, top_k=len(latest))
+        df['simulation_id'] = sim
+        dfs.append(df)
 
     # 3. Łączymy i agregujemy wyniki
     if not dfs:
@@ -101,16 +141,36 @@ def run_and_aggregate_simulations(num_simulations=NUM_SIMULATIONS):
         return
 
     all_runs = pd.concat(dfs)
-    avg_df = all_runs.groupby("ticker")["pred_%"].mean().reset_index()
-    avg_df = avg_df.sort_values("pred_%", ascending=False)
+    avg_all = all_runs.groupby("ticker", observed=True)[["pred", "pred_%"]].mean().reset_index()
+    avg_all = avg_all.sort_values("pred_%", ascending=False)
+    avg_df = avg_all[["ticker", "pred_%"]].head(TOP_K)
+
+    # Historia: każda symulacja + średnia ensemble (simulation=0); zwroty dla dojrzałych starszych prognoz
+    with metrics.timer('results.store'):
+        history = pd.concat([
+            all_runs.rename(columns={'simulation_id': 'simulation'})[['ticker', 'simulation', 'pred']],
+            avg_all[['ticker', 'pred']].assign(simulation=results_store.ENSEMBLE_SIMULATION),
+        ])
+        run_id = results_store.record_run(history, as_of=latest.index.max(), horizon=HORIZON,
+                                          job='run_multiple_simulations_crypto')
+        realized = results_store.record_realized(train[['ticker', 'target']], HORIZON)
+        results_store.checkpoint()  # Jeden plik .sqlite dla cache/artefaktu
+    print(f"Zapisano uruchomienie {run_id} w {results_store.RESULTS_DB_PATH} (nowe zrealizowane zwroty: {realized}).")
     
-    # Zapisujemy do pliku
-    avg_df.to_csv(AVG_FILE, index=False)
+    # Zapisujemy do pliku atomowo - dashboard (results_loader) nie trafi na częściowo zapisany CSV
+    tmp_file = f"{AVG_FILE}.{os.getpid()}.tmp"
+    avg_df.to_csv(tmp_file, index=False)
+    os.replace(tmp_file, AVG_FILE)
     
     print(f"Zapisano plik średnich: {AVG_FILE}")
 
-    # 4. WYKONANIE ZAPISU NA GITHUB
-    git_push_results()
+    report = metrics.write_run_report(RUN_REPORT_FILE, job='run_multiple_simulations_crypto',
+                                      simulations=num_simulations, workers=ENSEMBLE_WORKERS)
+    print(f"Czas etapów: " + ", ".join(f"{k} {v['total_s']:.1f}s" for k, v in report['stages'].items()))
+
+    # 4. ZAPIS NA GITHUB (opcjonalnie, RESULTS_GIT_PUSH=1)
+    if RESULTS_GIT_PUSH:
+        git_push_results()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,225 @@
+# Plik: scan_worker.py
+# Samodzielny worker skanu: co SCAN_REFRESH_SECONDS (i zaraz po zamknięciu świecy) skanuje całe
+# uniwersum każdego interwału i publikuje niezmienny snapshot. api_server i dashboard tylko czytają
+# snapshot, więc liczba skanów Binance nie zależy od liczby frontendów ani użytkowników.
+#
+# Układ: scan_snapshots/<interwał>/<wersja>/meta.json   - uniwersum, ranking, wyniki 3xAI (JSON)
+#        scan_snapshots/<interwał>/<wersja>/frames.arrow - ramki po analizie technicznej (Arrow IPC, mmap)
+#        scan_snapshots/<interwał>/CURRENT              - nazwa aktualnej wersji (podmieniana atomowo)
+#
+# Uruchomienie: python scan_worker.py [--intervals 1h 4h 1d] [--limit 200] [--once]
+
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Tuple, Union
+import pandas as pd
+import pyarrow as pa
+import metrics
+from crypto_analyzer import (MUST_SCAN_SYMBOLS, SCAN_CONCURRENCY, _ranking_json, _result_json,
+                             fetch_top_symbols, scan_market)
+from response_cache import ttl_until_candle_close
+
+SCAN_SNAPSHOT_DIR = os.environ.get("SCAN_SNAPSHOT_DIR", "scan_snapshots")
+SCAN_REFRESH_SECONDS = int(os.environ.get("SCAN_REFRESH_SECONDS", 300))  # Bieżąca świeca też się zmienia
+SNAPSHOT_UNIVERSE = 200  # Maksymalne limit_symbols w API - mniejsze żądania to wycinek tego uniwersum
+SNAPSHOT_MAX_AGE = int(os.environ.get("SNAPSHOT_MAX_AGE", 3 * SCAN_REFRESH_SECONDS))  # Starszy = worker nie działa
+KEEP_SNAPSHOTS = 3  # Starsze wersje usuwane (czytelnik trzymający mmap starej wersji nadal ją widzi)
+SNAPSHOT_MIN_COVERAGE = 0.9  # Minimalny odsetek symboli uniwersum z danymi - inaczej zostaje poprzedni snapshot
+FRAME_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'SMA_20', 'RSI']
+
+
+def _interval_dir(interval: str) -> str:
+    return os.path.join(SCAN_SNAPSHOT_DIR, interval)
+
+
+def _current_path(interval: str) -> str:
+    return os.path.join(_interval_dir(interval), "CURRENT")
+
+
+# --- Publikacja (worker) ---
+def _frames_table(results: Dict[str, Dict[str, Any]]) -> Tuple[pa.Table, Dict[str, List[int]]]:
+    """Ramki wszystkich symboli w jednej tabeli; zwraca (tabela, {symbol: [offset, długość]})."""
+    frames = {sym: res['data'] for sym, res in results.items()
+              if isinstance(res.get('data'), pd.DataFrame) and not res['data'].empty}
+    offsets, pos = {}, 0
+    for sym, df in frames.items():
+        offsets[sym] = [pos, len(df)]
+        pos += len(df)
+    if not frames:
+        return pa.table({'time': pa.array([], pa.timestamp('ms'))} | {c: pa.array([], pa.float64()) for c in FRAME_COLUMNS}), offsets
+    stacked = pd.concat([df.reindex(columns=FRAME_COLUMNS) for df in frames.values()])
+    table = pa.table({'time': pa.array(pd.DatetimeIndex(stacked.index).to_numpy())}
+                     | {c: pa.array(stacked[c].to_numpy(dtype='float64')) for c in FRAME_COLUMNS})
+    return table, offsets
+
+
+def publish_snapshot(interval: str, universe: List[str], results: Dict[str, Dict[str, Any]],
+                     final_ranking: List[Dict[str, Any]], limit_symbols: int = SNAPSHOT_UNIVERSE) -> str:
+    """Zapisuje nową wersję snapshotu i przestawia CURRENT. Zwraca wersję."""
+    version = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    final_dir = os.path.join(_interval_dir(interval), version)
+    tmp_dir = f"{final_dir}.{os.getpid()}.tmp"
+    os.makedirs(tmp_dir)
+
+    with metrics.timer('snapshot.write', interval=interval):
+        table, offsets = _frames_table(results)
+        with pa.OSFile(os.path.join(tmp_dir, "frames.arrow"), 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        meta = {
+            'interval': interval, 'version': version, 'created_at': datetime.now(timezone.utc).isoformat(),
+            'limit_symbols': limit_symbols, 'universe': universe,
+            'scanned': sum(1 for a in final_ranking if a.get('data') is not None),  # Symbole z danymi
+            'ranking': _ranking_json(final_ranking),
+            'results': {sym: _result_json(res) for sym, res in results.items()},
+            'frames': offsets,
+        }
+        with open(os.path.join(tmp_dir, "meta.json"), 'w') as f:
+            json.dump(meta, f)
+        os.rename(tmp_dir, final_dir)  # Kompletny katalog pojawia się naraz
+
+        current_tmp = f"{_current_path(interval)}.{os.getpid()}.tmp"
+        with open(current_tmp, 'w') as f:
+            f.write(version)
+        os.replace(current_tmp, _current_path(interval))
+    _prune_snapshots(interval)
+    return version
+
+
+def _prune_snapshots(interval: str) -> None:
+    versions = sorted(d for d in os.listdir(_interval_dir(interval))
+                      if os.path.isdir(os.path.join(_interval_dir(interval), d)) and not d.endswith('.tmp'))
+    for version in versions[:-KEEP_SNAPSHOTS]:
+        shutil.rmtree(os.path.join(_interval_dir(interval), version), ignore_errors=True)
+
+
+def refresh(interval: str, limit_symbols: int = SNAPSHOT_UNIVERSE, concurrency: int = SCAN_CONCURRENCY) -> str:
+    """
+    Jeden skan całego uniwersum (analiza 3xAI dla każdego symbolu - wycinki Top N bez ponownego skanu).
+    Pusta lista symboli albo zbyt mało symboli z danymi (awaria Binance) -> RuntimeError, bez publikacji.
+    W metadanych zapisywana jest faktyczna liczba symboli uniwersum, więc krótsza lista obsłuży
+    tylko żądania z mniejszym limit_symbols (covers).
+    """
+    universe = fetch_top_symbols(limit_symbols)
+    if not universe:
+        raise RuntimeError("pusta lista symboli z Binance")
+    n_all = len(set(universe) | set(MUST_SCAN_SYMBOLS))
+    results, final_ranking = scan_market(len(universe), n_all, interval, concurrency, symbols=universe)
+    with_data = {a['symbol'] for a in final_ranking if a.get('data') is not None}
+    covered = len(with_data & set(universe))
+    if covered < SNAPSHOT_MIN_COVERAGE * len(universe):
+        raise RuntimeError(f"dane tylko dla {covered}/{len(universe)} symboli")
+    return publish_snapshot(interval, universe, results, final_ranking, len(universe))
+
+
+def run(intervals: List[str], limit_symbols: int = SNAPSHOT_UNIVERSE, concurrency: int = SCAN_CONCURRENCY,
+        once: bool = False) -> None:
+    next_due = {interval: 0.0 for interval in intervals}
+    while True:
+        for interval in intervals:
+            if time.time() < next_due[interval]:
+                continue
+            start = time.perf_counter()
+            try:
+                version = refresh(interval, limit_symbols, concurrency)
+                print(f"[{interval}] Snapshot {version} ({time.perf_counter() - start:.1f}s)")
+            except Exception as e:
+                print(f"[{interval}] BŁĄD skanu - zostaje poprzedni snapshot: {e}")
+            # Kolejny skan za SCAN_REFRESH_SECONDS albo tuż po zamknięciu świecy, jeśli wcześniej
+            next_due[interval] = time.time() + min(SCAN_REFRESH_SECONDS, ttl_until_candle_close(interval) + 1)
+        if once:
+            return
+        time.sleep(max(1.0, min(next_due.values()) - time.time()))
+
+
+# --- Odczyt (api_server, dashboard) ---
+_snapshots: Dict[str, Dict[str, Any]] = {}  # interwał -> ostatnio wczytany snapshot
+_snapshots_lock = threading.Lock()
+
+
+def load_snapshot(interval: str) -> Union[Dict[str, Any], None]:
+    """
+    Aktualny snapshot: {'meta': ..., 'frames': pa.Table zmapowana z pliku}. Pliki są parsowane raz
+    na wersję (sprawdzenie zmian = odczyt CURRENT). None, gdy worker niczego nie opublikował
+    albo snapshot jest starszy niż SNAPSHOT_MAX_AGE.
+    """
+    try:
+        with open(_current_path(interval)) as f:
+            version = f.read().strip()
+    except OSError:
+        return None
+    with _snapshots_lock:
+        snap = _snapshots.get(interval)
+        if snap is None or snap['meta']['version'] != version:
+            path = os.path.join(_interval_dir(interval), version)
+            try:
+                with open(os.path.join(path, "meta.json")) as f:
+                    meta = json.load(f)
+                frames = pa.ipc.open_file(pa.memory_map(os.path.join(path, "frames.arrow"), 'r')).read_all()
+            except (OSError, ValueError, pa.ArrowInvalid):
+                return None
+            snap = _snapshots[interval] = {'meta': meta, 'frames': frames}
+    return snap if snapshot_age(snap) <= SNAPSHOT_MAX_AGE else None
+
+
+def snapshot_age(snap: Dict[str, Any]) -> float:
+    return (pd.Timestamp.now(tz='UTC') - pd.Timestamp(snap['meta']['created_at'])).total_seconds()
+
+
+def covers(snap: Union[Dict[str, Any], None], limit_symbols: int) -> bool:
+    """Czy snapshot obsłuży żądanie (uniwersum workera miało co najmniej limit_symbols symboli)."""
+    return snap is not None and snap['meta']['limit_symbols'] >= limit_symbols
+
+
+def _select(meta: Dict[str, Any], limit_symbols: int, top_n: int) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Ranking i symbole do analizy tak, jak zwróciłby je skan z tymi parametrami (wycinek uniwersum)."""
+    scanned = set(meta['universe'][:limit_symbols]) | set(MUST_SCAN_SYMBOLS)
+    ranking = [a for a in meta['ranking'] if a['symbol'] in scanned]
+    top_symbols = [a['symbol'] for a in ranking[:top_n]]
+    return ranking, list(dict.fromkeys(top_symbols + MUST_SCAN_SYMBOLS))
+
+
+def snapshot_for_api(snap: Dict[str, Any], limit_symbols: int, top_n: int) -> Dict[str, Any]:
+    """Odpowiedź w formacie scan_and_return_data_for_api - bez skanu, same wycinki snapshotu."""
+    meta = snap['meta']
+    ranking, selected = _select(meta, limit_symbols, top_n)
+    return {
+        'interval': meta['interval'], 'scanned': len(ranking), 'ranking': ranking,
+        'results': {sym: meta['results'][sym] for sym in selected if sym in meta['results']},
+        'snapshot': {'version': meta['version'], 'created_at': meta['created_at']},
+    }
+
+
+def frame(snap: Dict[str, Any], symbol: str) -> pd.DataFrame:
+    """Ramka symbolu ze snapshotu (wycinek zmapowanej tabeli - kopiowane są tylko jej wiersze)."""
+    offset = snap['meta']['frames'].get(symbol)
+    if offset is None:
+        return pd.DataFrame()
+    df = snap['frames'].slice(*offset).to_pandas()
+    return df.set_index(pd.DatetimeIndex(df.pop('time'), name='Open time'))
+
+
+def snapshot_for_dashboard(snap: Dict[str, Any], limit_symbols: int, top_n: int):
+    """(results, final_ranking) w formacie scan_market - pełne ramki tylko dla wybranych symboli."""
+    meta = snap['meta']
+    ranking, selected = _select(meta, limit_symbols, top_n)
+    results = {}
+    for sym in selected:
+        res = meta['results'].get(sym)
+        if res is not None:
+            results[sym] = dict(res, data=frame(snap, sym))
+    return results, ranking
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Worker skanu rynku publikujący snapshoty dla API i dashboardu.")
+    parser.add_argument("--intervals", nargs="+", default=['1h', '4h', '1d'], choices=['1h', '4h', '1d'])
+    parser.add_argument("--limit", type=int, default=SNAPSHOT_UNIVERSE, help="Liczba symboli z top wolumenu")
+    parser.add_argument("--concurrency", type=int, default=SCAN_CONCURRENCY)
+    parser.add_argument("--once", action="store_true", help="Jeden przebieg i koniec (np. cron)")
+    args = parser.parse_args()
+    run(args.intervals, args.limit, args.concurrency, args.once)
@@ -0,0 +1,155 @@
+# Plik: sentiment.py
+# Wsadowa ocena sentymentu nagłówków (VADER) z memoizacją po hashu treści:
+# ograniczony LRU w pamięci + cache SQLite na dysku (wyniki przeżywają kolejne uruchomienia).
+
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List
+import numpy as np
+import pandas as pd
+import metrics
+
+SENTIMENT_CACHE_PATH = os.environ.get("SENTIMENT_CACHE_PATH", "cache/sentiment.sqlite")
+LRU_SIZE = 50_000
+SQLITE_CHUNK = 500  # Limit parametrów w zapytaniu IN (...)
+
+_analyzer = None
+_analyzer_lock = threading.Lock()
+
+
+def get_analyzer():
+    """SentimentIntensityAnalyzer tworzony przy pierwszym użyciu (pobiera leksykon, gdy go brak)."""
+    global _analyzer
+    with _analyzer_lock:
+        if _analyzer is None:
+            import nltk
+            try:
+                nltk.data.find('sentiment/vader_lexicon.zip')
+            except LookupError:
+                nltk.download('vader_lexicon')
+            from nltk.sentiment.vader import SentimentIntensityAnalyzer
+            _analyzer = SentimentIntensityAnalyzer()
+        return _analyzer
+
+
+class _LRUCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, float]:
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._data:
+                    self._data.move_to_end(key)
+                    found[key] = self._data[key]
+        return found
+
+    def put_many(self, items: Dict[str, float]) -> None:
+        with self._lock:
+            for key, value in items.items():
+                self._data[key] = value
+                self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+_lru = _LRUCache(LRU_SIZE)
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def _connect():
+    os.makedirs(os.path.dirname(SENTIMENT_CACHE_PATH) or '.', exist_ok=True)
+    conn = sqlite3.connect(SENTIMENT_CACHE_PATH, timeout=30)
+    conn.execute("CREATE TABLE IF NOT EXISTS sentiment (hash TEXT PRIMARY KEY, compound REAL NOT NULL)")
+    return conn
+
+
+def _disk_get_many(keys: List[str]) -> Dict[str, float]:
+    found = {}
+    try:
+        with _connect() as conn:
+            for i in range(0, len(keys), SQLITE_CHUNK):
+                chunk = keys[i:i+SQLITE_CHUNK]
+                rows = conn.execute(
+                    f"SELECT hash, compound FROM sentiment WHERE hash IN ({','.join('?'*len(chunk))})", chunk
+                ).fetchall()
+                found.update(rows)
+    except sqlite3.Error as e:
+        print(f"Cache sentymentu niedostępny: {e}")
+    return found
+
+
+def _disk_put_many(items: Dict[str, float]) -> None:
+    try:
+        with _connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO sentiment (hash, compound) VALUES (?, ?)", items.items())
+    except sqlite3.Error as e:
+        print(f"Cache sentymentu niedostępny: {e}")
+
+
+def score_texts(texts: List[str]) -> np.ndarray:
+    """
+    Wynik VADER 'compound' dla każdego tekstu. Każdy unikalny tekst jest oceniany co najwyżej raz:
+    najpierw LRU, potem cache na dysku, a dopiero brakujące teksty idą do VADER (jednym przebiegiem).
+    """
+    keys = [text_hash(t) for t in texts]
+    unique = dict(zip(keys, texts))
+    scores = _lru.get_many(unique)
+
+    missing = [k for k in unique if k not in scores]
+    if missing:
+        from_disk = _disk_get_many(missing)
+        scores.update(from_disk)
+        _lru.put_many(from_disk)
+
+    to_score = [k for k in missing if k not in scores]
+    metrics.cache_result('sentiment', 'hit', len(unique) - len(to_score))
+    metrics.cache_result('sentiment', 'miss', len(to_score))
+    if to_score:
+        analyzer = get_analyzer()
+        fresh = {k: analyzer.polarity_scores(unique[k])['compound'] for k in to_score}
+        scores.update(fresh)
+        _lru.put_many(fresh)
+        _disk_put_many(fresh)
+
+    return np.array([scores[k] for k in keys], dtype='float64')
+
+
+def article_text(article: Dict[str, str]) -> str:
+    title = article.get('title') or ""
+    desc = article.get('description') or ""
+    return (title + " " + desc).strip()
+
+
+def daily_sentiment(articles_by_ticker: Dict[str, List[Dict[str, str]]]) -> pd.DataFrame:
+    """
+    Szereg czasowy sentymentu: ticker | date | sentiment | n_articles (średni compound z danego dnia).
+    Wszystkie nagłówki wszystkich tickerów są oceniane w jednej partii.
+    """
+    rows = [
+        (ticker, article.get('publishedAt'), article_text(article))
+        for ticker, articles in articles_by_ticker.items()
+        for article in articles
+        if article.get('publishedAt')
+    ]
+    if not rows:
+        return pd.DataFrame({'ticker': pd.Series(dtype=object), 'date': pd.Series(dtype='datetime64[ns]'),
+                             'sentiment': pd.Series(dtype='float64'), 'n_articles': pd.Series(dtype='int64')})
+    df = pd.DataFrame(rows, columns=['ticker', 'published', 'text'])
+    df['date'] = pd.to_datetime(df['published'], utc=True, errors='coerce').dt.tz_localize(None).dt.normalize()
+    df['sentiment'] = score_texts(df['text'].tolist())
+    return (
+        df.dropna(subset=['date'])
+        .groupby(['ticker', 'date'])['sentiment']
+        .agg(sentiment='mean', n_articles='size')
+        .reset_index()
+    )
@@ -0,0 +1,170 @@
+# Plik: stream_ingest.py
+# Demon strumieniowy: subskrypcja kline przez WebSocket (Binance combined streams) dla skanowanego
+# uniwersum. Każda ZAMKNIĘTA świeca aktualizuje magazyn świec, stan wskaźników i score tylko
+# tego jednego symbolu, po czym ranking jest publikowany do pliku JSON (czyta go api_server i dashboard).
+#
+# Uruchomienie: python stream_ingest.py --interval 4h --limit 200
+# Testy lokalne: BINANCE_WS_URL=ws://localhost:8765/stream (dowolny serwer WS wysyłający ten sam format).
+
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Union
+import pandas as pd
+import candle_store
+import indicators
+from crypto_analyzer import MUST_SCAN_SYMBOLS, _to_json_value, fetch_crypto_data, fetch_top_symbols, score_universe
+
+BINANCE_WS_URL = os.environ.get("BINANCE_WS_URL", "wss://stream.binance.com:9443/stream")
+LIVE_RANKING_DIR = os.environ.get("LIVE_RANKING_DIR", "live_ranking")
+MAX_STREAMS_PER_CONNECTION = 1024  # Limit Binance dla jednego połączenia
+RECONNECT_MAX_DELAY = 60
+
+
+def live_ranking_path(interval: str) -> str:
+    return os.path.join(LIVE_RANKING_DIR, f"{interval}.json")
+
+
+def load_live_ranking(interval: str) -> Union[Dict[str, Any], None]:
+    """Ostatni opublikowany ranking na żywo (None, gdy demon nie działa / brak pliku)."""
+    try:
+        with open(live_ranking_path(interval)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class LiveScorer:
+    """Score i ranking aktualizowane push-em: zamknięta świeca -> przeliczenie jednego symbolu."""
+
+    def __init__(self, interval: str, symbols: List[str]):
+        self.interval = interval
+        self.symbols = list(dict.fromkeys(symbols))
+        self.assets: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    # --- Start: stan wskaźników z REST (magazyn świec -> dociągane tylko brakujące świece) ---
+    def bootstrap(self) -> None:
+        for sym in self.symbols:
+            self.resync(sym)
+        self.publish()
+
+    def resync(self, sym: str) -> None:
+        df = fetch_crypto_data(sym, self.interval, limit=indicators.VOLUME_WINDOW + 1)
+        state = indicators.load_indicator_state(sym, self.interval)
+        with state.lock:
+            latest = indicators.sync_indicator_state(state, df, int(time.time()*1000))
+        self._rescore(sym, latest)
+
+    def _rescore(self, sym: str, latest: Dict[str, float]) -> None:
+        scores, sugestions = score_universe([latest['RSI']], [latest['Close']], [latest['SMA_20']],
+                                            [latest['Volume']], [latest['avg_volume_50']])
+        with self._lock:
+            self.assets[sym] = {
+                'symbol': sym, 'score': int(scores[0]), 'sugestion': sugestions[0],
+                'close': _to_json_value(latest['Close']), 'rsi': _to_json_value(latest['RSI']),
+                'sma_20': _to_json_value(latest['SMA_20']),
+                'updated_at': _now_iso(),
+            }
+
+    # --- Obsługa wiadomości ---
+    def handle_message(self, raw: Union[str, bytes]) -> Union[str, None]:
+        """Przetwarza jedną wiadomość kline. Zwraca symbol, jeśli ranking się zmienił."""
+        msg = json.loads(raw)
+        k = msg.get('data', msg).get('k')
+        if not k or not k.get('x') or k.get('i') != self.interval:
+            return None  # Interesują nas tylko zamknięte świece
+        sym = k['s']
+        open_time = int(k['t'])
+        close, volume = float(k['c']), float(k['v'])
+
+        state = indicators.load_indicator_state(sym, self.interval)
+        step_ms = candle_store.interval_to_ms(self.interval)
+        with state.lock:
+            if not state.empty and open_time <= state.last_open_time:
+                return None  # Duplikat
+            gap = state.empty or open_time != state.last_open_time + step_ms
+            if not gap:
+                state.update(open_time, close, volume)
+                indicators.save_indicator_state(state)
+                latest = state.values()
+        candle = pd.DataFrame(
+            {'Open': float(k['o']), 'High': float(k['h']), 'Low': float(k['l']), 'Close': close,
+             'Volume': volume, 'Close time': int(k['T'])},
+            index=pd.DatetimeIndex([pd.to_datetime(open_time, unit='ms')], name='Open time'),
+        )
+        if gap:
+            # Luka (np. po rozłączeniu): najpierw dociągamy brakujące świece z REST - pobranie
+            # inkrementalne startuje od ostatniej zapisanej świecy, więc świeca z WS nie może trafić
+            # do magazynu wcześniej (luka nie zostałaby nigdy uzupełniona)
+            self.resync(sym)
+            stored = candle_store.load_candles(sym, self.interval)
+            if stored.empty or stored.index[-1] < pd.to_datetime(open_time - step_ms, unit='ms'):
+                return sym  # REST nie uzupełnił luki - świecę pobierze kolejny resync
+        candle_store.append_candles(sym, self.interval, candle)
+        if not gap:
+            self._rescore(sym, latest)
+        return sym
+
+    def ranking(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return sorted(self.assets.values(), key=lambda a: a['score'], reverse=True)
+
+    def publish(self) -> None:
+        path = live_ranking_path(self.interval)
+        os.makedirs(LIVE_RANKING_DIR, exist_ok=True)
+        payload = {'interval': self.interval, 'updated_at': _now_iso(), 'ranking': self.ranking()}
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, path)
+
+
+def stream_urls(symbols: List[str], interval: str, base_url: str = BINANCE_WS_URL) -> List[str]:
+    streams = [f"{s.lower()}@kline_{interval}" for s in symbols]
+    return [
+        f"{base_url}?streams=" + "/".join(streams[i:i+MAX_STREAMS_PER_CONNECTION])
+        for i in range(0, len(streams), MAX_STREAMS_PER_CONNECTION)
+    ]
+
+
+async def _consume(url: str, scorer: LiveScorer) -> None:
+    import websockets  # Tylko demon; api_server/dashboard czytają jedynie plik z rankingiem
+    delay = 1
+    while True:
+        try:
+            async with websockets.connect(url, ping_interval=20) as ws:
+                delay = 1
+                async for raw in ws:
+                    # Zapis Parquet/JSON (i ewentualny resync z REST) poza pętlą zdarzeń
+                    if await asyncio.to_thread(scorer.handle_message, raw):
+                        scorer.publish()
+        except (OSError, websockets.WebSocketException) as e:
+            print(f"WebSocket rozłączony ({e}); ponowne połączenie za {delay}s")
+            await asyncio.sleep(delay)
+            delay = min(delay*2, RECONNECT_MAX_DELAY)
+
+
+async def run(interval: str = '4h', limit_symbols: int = 200, base_url: str = BINANCE_WS_URL) -> None:
+    symbols = list(dict.fromkeys(fetch_top_symbols(limit_symbols) + MUST_SCAN_SYMBOLS))
+    scorer = LiveScorer(interval, symbols)
+    print(f"Bootstrap {len(symbols)} symboli ({interval}) z REST...")
+    await asyncio.to_thread(scorer.bootstrap)
+    print("Subskrypcja strumieni kline...")
+    await asyncio.gather(*(_consume(url, scorer) for url in stream_urls(symbols, interval, base_url)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Strumieniowe pobieranie kline i ranking na żywo.")
+    parser.add_argument("--interval", default="4h", choices=['1h', '4h', '1d'])
+    parser.add_argument("--limit", type=int, default=200, help="Liczba symboli z top wolumenu")
+    args = parser.parse_args()
+    asyncio.run(run(args.interval, args.limit))
@@ -0,0 +1,34 @@
+# Moduły projektu leżą w katalogu głównym repozytorium (bez pakietu)
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import candle_store  # noqa: E402
+
+HOUR_MS = candle_store.interval_to_ms('1h')
+
+
+class FakeClock:
+    def __init__(self, now_ms):
+        self.now_ms = now_ms
+
+    def __call__(self):
+        return self.now_ms / 1000
+
+
+def fake_klines(clock):
+    """Zamiennik _request_klines: deterministyczne świece 1h do bieżącej (otwartej) włącznie."""
+    def request(symbol, interval, limit, start_time=None):
+        current = int(clock.now_ms) // HOUR_MS * HOUR_MS
+        start = current - (int(limit) - 1) * HOUR_MS if start_time is None else -(-int(start_time) // HOUR_MS) * HOUR_MS
+        opens = np.arange(start, min(current, start + (int(limit) - 1) * HOUR_MS) + 1, HOUR_MS, dtype=np.int64)
+        close = 100.0 + (opens // HOUR_MS) % 7
+        return pd.DataFrame(
+            {'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close,
+             'Volume': 1000.0 + (opens // HOUR_MS) % 5, 'Close time': opens + HOUR_MS - 1},
+            index=pd.DatetimeIndex(pd.to_datetime(opens, unit='ms'), name='Open time'),
+        )
+    return request
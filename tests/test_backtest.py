@@ -0,0 +1,68 @@
+# Plik: tests/test_backtest.py
+# Wektorowy backtest_topk: między rebalansami wagi dryfują ze zwrotami (bez darmowego dziennego
+# rebalansu), a obrót w dniu rebalansu liczony jest od wag po dryfie. Wzorzec: pętla po dniach.
+
+import numpy as np
+import pytest
+import backtest
+
+
+def loop_backtest(P, R, top_k, rebalance_every, tcost, capital=10000.0):
+    """Symulacja dzień po dniu: wagi po zwrotach przechodzą na kolejny dzień."""
+    R = np.nan_to_num(R)
+    ranks = backtest.rank_matrix(P)
+    weights = np.zeros(P.shape[1])
+    value = capital
+    equity, turnover = [], []
+    for t in range(P.shape[0]):
+        traded = 0.0
+        if t % rebalance_every == 0:
+            held = (ranks[t] < top_k) & ~np.isnan(P[t])
+            target = held / held.sum() if held.any() else np.zeros(P.shape[1])
+            traded = np.abs(target - weights).sum()
+            weights = target
+        value *= 1 + (weights * R[t]).sum() - traded * tcost
+        grown = weights * (1 + R[t])
+        weights = grown / grown.sum() if grown.sum() > 0 else grown
+        equity.append(value)
+        turnover.append(traded)
+    return np.array(equity), np.array(turnover)
+
+
+@pytest.fixture
+def market():
+    rng = np.random.default_rng(0)
+    P = rng.normal(size=(120, 6))
+    P[rng.random(P.shape) < 0.05] = np.nan
+    R = rng.normal(0.001, 0.05, size=P.shape)
+    return P, R
+
+
+@pytest.mark.parametrize('top_k', [1, 2, 4])
+@pytest.mark.parametrize('rebalance_every', [1, 5, 21])
+@pytest.mark.parametrize('tcost', [0.0, 0.003])
+def test_matches_day_by_day_simulation(market, top_k, rebalance_every, tcost):
+    P, R = market
+    res = backtest.backtest_topk(P, R, top_k, rebalance_every, tcost, initial_capital=10000.0)
+    equity, turnover = loop_backtest(P, R, top_k, rebalance_every, tcost)
+    np.testing.assert_allclose(res['turnover'], turnover, atol=1e-12)
+    np.testing.assert_allclose(res['equity'], equity, rtol=1e-9)
+
+
+def test_hold_without_rebalance_is_buy_and_hold():
+    rng = np.random.default_rng(1)
+    R = rng.normal(0.002, 0.04, size=(60, 3))
+    P = np.tile([3.0, 2.0, 1.0], (60, 1))
+    res = backtest.backtest_topk(P, R, top_k=2, rebalance_every=60, tcost=0.0, initial_capital=1.0)
+    expected = np.cumprod(1 + R[:, :2], axis=0).mean(axis=1)  # Po 0.5 w każdym aktywie, bez dokupowania
+    np.testing.assert_allclose(res['equity'], expected, rtol=1e-12)
+    assert res['turnover'][0] == pytest.approx(1.0) and not res['turnover'][1:].any()
+
+
+def test_unchanged_picks_still_pay_drift_turnover():
+    # Te same tickery przy każdym rebalansie - obrót > 0, bo wagi rozjechały się od równych
+    R = np.tile([0.05, -0.05], (10, 1))
+    P = np.tile([1.0, 2.0], (10, 1))
+    res = backtest.backtest_topk(P, R, top_k=2, rebalance_every=5, tcost=0.001)
+    assert res['turnover'][5] > 0
+    assert not res['turnover'][[1, 2, 3, 4, 6, 7, 8, 9]].any()
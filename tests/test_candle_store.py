@@ -0,0 +1,149 @@
+# Plik: tests/test_candle_store.py
+# Świece 4h/1d składane lokalnie z 1h (resample_candles) muszą mieć granice jak na Binance
+# (od epoki UTC, 1d od 00:00 UTC) i wartości jak agregacja OHLCV w pandas. Dopisywanie świec idzie
+# przez plik delta - bez przepisywania całej historii przy każdej świecy.
+
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import candle_store
+
+HOUR_MS = candle_store.interval_to_ms('1h')
+
+
+def hourly(start, hours, seed=0):
+    rng = np.random.default_rng(seed)
+    opens = pd.date_range(start, periods=hours, freq='h', name='Open time')
+    close = 100 + np.cumsum(rng.normal(size=hours))
+    return pd.DataFrame({
+        'Open': close - rng.uniform(0, 1, hours), 'High': close + rng.uniform(1, 2, hours),
+        'Low': close - rng.uniform(1, 2, hours), 'Close': close, 'Volume': rng.uniform(10, 20, hours),
+        'Close time': opens.as_unit('ms').asi8 + HOUR_MS - 1,
+    }, index=opens)
+
+
+def pandas_resample(base, rule):
+    agg = base.resample(rule, origin='epoch', label='left', closed='left').agg(
+        {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'})
+    return agg.dropna()
+
+
+@pytest.mark.parametrize('interval,rule', [('4h', '4h'), ('1d', '24h')])
+@pytest.mark.parametrize('start', ['2026-03-01 00:00', '2026-03-01 02:00', '2026-03-01 13:00'])
+def test_resample_matches_pandas_and_skips_partial_first_bucket(interval, rule, start):
+    base = hourly(start, 24 * 5 + 7)
+    out = candle_store.resample_candles(base, interval, '1h')
+    expected = pandas_resample(base, rule)
+    step = pd.Timedelta(candle_store.interval_to_ms(interval), unit='ms')
+    if base.index[0] != expected.index[0]:
+        expected = expected.iloc[1:]  # Niepełny pierwszy przedział jest pomijany
+
+    assert list(out.columns) == candle_store.STORE_COLUMNS
+    assert list(out.index) == list(expected.index)
+    assert all(ts.value % step.value == 0 for ts in out.index)  # Granice od epoki UTC
+    for c in ['Open', 'High', 'Low', 'Close', 'Volume']:
+        np.testing.assert_allclose(out[c].to_numpy(), expected[c].to_numpy(), rtol=1e-12)
+    np.testing.assert_array_equal(out['Close time'].to_numpy(),
+                                  out.index.as_unit('ms').asi8 + candle_store.interval_to_ms(interval) - 1)
+
+
+def test_daily_buckets_start_at_midnight_utc():
+    base = hourly('2026-03-01 00:00', 48)
+    out = candle_store.resample_candles(base, '1d', '1h')
+    assert list(out.index) == [pd.Timestamp('2026-03-01'), pd.Timestamp('2026-03-02')]
+    assert out['Volume'].iloc[0] == pytest.approx(base['Volume'].iloc[:24].sum())
+
+
+def test_open_last_bucket_is_kept():
+    # Bieżący (niepełny) przedział: 'Close time' = koniec przedziału, wartości z dostępnych godzin
+    base = hourly('2026-03-01 00:00', 4 * 3 + 2)
+    out = candle_store.resample_candles(base, '4h', '1h')
+    assert len(out) == 4
+    assert out['Close'].iloc[-1] == base['Close'].iloc[-1]
+    assert out['Close time'].iloc[-1] == int(pd.Timestamp('2026-03-01 12:00').value // 10**6) + 4 * HOUR_MS - 1
+
+
+def test_interval_must_be_multiple_of_base():
+    with pytest.raises(ValueError):
+        candle_store.resample_candles(hourly('2026-03-01', 10), '12h', '8h')
+
+
+def test_empty_base_gives_empty_store_frame():
+    out = candle_store.resample_candles(candle_store.empty_candles(), '4h', '1h')
+    assert out.empty and list(out.columns) == candle_store.STORE_COLUMNS
+
+
+# --- Dopisywanie (plik delta) ---
+SYMBOL = 'AAAUSDT'
+
+
+def delta_rows():
+    path = candle_store.delta_path(SYMBOL, '1h')
+    return os.path.getsize(path) // candle_store.DELTA_DTYPE.itemsize if os.path.exists(path) else 0
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(candle_store, 'CANDLE_STORE_DIR', str(tmp_path))
+    monkeypatch.setattr(candle_store, 'DELTA_COMPACT_ROWS', 5)
+    return tmp_path
+
+
+def test_append_writes_delta_without_rewriting_store(store):
+    base = hourly('2026-03-01', 200)
+    candle_store.append_candles(SYMBOL, '1h', base.iloc[:100])
+    path = candle_store.store_path(SYMBOL, '1h')
+    before = os.stat(path).st_mtime_ns
+
+    for k in range(100, 103):
+        out = candle_store.append_candles(SYMBOL, '1h', base.iloc[k:k + 1])
+        assert list(out.index) == list(base.index[:k + 1])
+    assert os.stat(path).st_mtime_ns == before
+    assert delta_rows() == 3
+    pd.testing.assert_frame_equal(candle_store.load_candles(SYMBOL, '1h'), base.iloc[:103], check_freq=False)
+
+
+def test_unchanged_candles_are_not_written(store):
+    base = hourly('2026-03-01', 50)
+    candle_store.append_candles(SYMBOL, '1h', base)
+    candle_store.append_candles(SYMBOL, '1h', base.iloc[-10:])
+    assert delta_rows() == 0
+
+
+def test_revised_candle_wins(store):
+    base = hourly('2026-03-01', 50)
+    candle_store.append_candles(SYMBOL, '1h', base)
+    revised = base.iloc[[-1]].assign(Close=1.0)
+    candle_store.append_candles(SYMBOL, '1h', revised)
+    stored = candle_store.load_candles(SYMBOL, '1h')
+    assert len(stored) == 50 and stored['Close'].iloc[-1] == 1.0
+
+
+def test_deltas_are_compacted(store):
+    base = hourly('2026-03-01', 100)
+    candle_store.append_candles(SYMBOL, '1h', base.iloc[:50])
+    for k in range(50, 60):
+        candle_store.append_candles(SYMBOL, '1h', base.iloc[k:k + 1])
+        assert delta_rows() < candle_store.DELTA_COMPACT_ROWS
+    pd.testing.assert_frame_equal(candle_store.load_candles(SYMBOL, '1h'), base.iloc[:60], check_freq=False)
+
+
+def test_torn_delta_record_is_ignored(store):
+    base = hourly('2026-03-01', 60)
+    candle_store.append_candles(SYMBOL, '1h', base.iloc[:50])
+    candle_store.append_candles(SYMBOL, '1h', base.iloc[50:52])
+    with open(candle_store.delta_path(SYMBOL, '1h'), 'ab') as f:
+        f.write(b'\x00' * (candle_store.DELTA_DTYPE.itemsize // 2))  # Przerwany zapis
+    pd.testing.assert_frame_equal(candle_store.load_candles(SYMBOL, '1h'), base.iloc[:52], check_freq=False)
+    candle_store.append_candles(SYMBOL, '1h', base.iloc[52:53])
+    pd.testing.assert_frame_equal(candle_store.load_candles(SYMBOL, '1h'), base.iloc[:53], check_freq=False)
+
+
+def test_replace_drops_deltas(store):
+    base = hourly('2026-03-01', 100)
+    candle_store.append_candles(SYMBOL, '1h', base.iloc[:50])
+    candle_store.append_candles(SYMBOL, '1h', base.iloc[50:51])
+    candle_store.append_candles(SYMBOL, '1h', base.iloc[80:], replace=True)
+    assert delta_rows() == 0
+    pd.testing.assert_frame_equal(candle_store.load_candles(SYMBOL, '1h'), base.iloc[80:], check_freq=False)
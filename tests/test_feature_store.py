@@ -0,0 +1,110 @@
+# Plik: tests/test_feature_store.py
+# Odczyty zakresów dat z miesięcznych partycji muszą zwracać dokładnie te wiersze, co filtr
+# na pełnej macierzy cech (także na granicach miesięcy i dla labeled_only).
+
+import numpy as np
+import pandas as pd
+import pytest
+import feature_store
+
+TICKERS = ['BTC-USD', 'ETH-USD', 'SOL-USD']
+HORIZON = 21
+
+
+@pytest.fixture(autouse=True)
+def store_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(feature_store, 'FEATURE_STORE_DIR', str(tmp_path))
+
+
+def features_frame(start='2025-11-20', days=100, seed=0):
+    """Macierz w formacie assemble_features: index 'date', float32, 'ticker' kategoria, target NaN na końcu."""
+    rng = np.random.default_rng(seed)
+    dates = np.repeat(pd.date_range(start, periods=days, freq='D'), len(TICKERS))
+    n = len(dates)
+    target = rng.normal(size=n).astype(np.float32)
+    target[-HORIZON * len(TICKERS):] = np.nan
+    return pd.DataFrame({
+        'ret_1': rng.normal(size=n).astype(np.float32),
+        'vol_21': rng.normal(size=n).astype(np.float32),
+        'ticker': pd.Categorical(np.tile(TICKERS, days)),
+        'target': target,
+    }, index=pd.DatetimeIndex(dates, name='date'))
+
+
+def expected(features, columns, start=None, end=None, labeled_only=False):
+    mask = np.ones(len(features), dtype=bool)
+    if start is not None:
+        mask &= features.index >= pd.Timestamp(start)
+    if end is not None:
+        mask &= features.index <= pd.Timestamp(end)
+    if labeled_only:
+        mask &= features['target'].notna().to_numpy()
+    return features.loc[mask, columns + ['ticker']]
+
+
+def assert_same(got, want):
+    assert list(got.columns) == list(want.columns)
+    assert got.index.name == 'date'
+    assert list(got.index) == list(want.index)
+    for c in want.columns:
+        if c == 'ticker':
+            assert got[c].astype(str).tolist() == want[c].astype(str).tolist()
+        else:
+            np.testing.assert_array_equal(got[c].to_numpy(), want[c].to_numpy())
+
+
+def test_write_splits_into_months():
+    features = features_frame()
+    written = feature_store.write_features(features)
+    assert written == ['2025-11', '2025-12', '2026-01', '2026-02']
+    assert feature_store.load_meta()['months'] == written
+
+
+@pytest.mark.parametrize('start,end', [
+    (None, None),
+    ('2025-12-01', '2025-12-31'),   # Dokładnie jeden miesiąc
+    ('2025-11-30', '2025-12-01'),   # Granica miesięcy
+    ('2025-12-15', '2026-01-15'),   # Środek dwóch miesięcy
+    ('2026-02-27', '2026-02-27'),   # Jeden dzień (jak 'latest')
+    ('2024-01-01', '2024-12-31'),   # Poza magazynem
+])
+@pytest.mark.parametrize('labeled_only', [False, True])
+def test_range_reads_match_filter(start, end, labeled_only):
+    features = features_frame()
+    feature_store.write_features(features)
+    got = feature_store.read_features(['ret_1', 'target'], start=start, end=end, labeled_only=labeled_only)
+    assert_same(got, expected(features, ['ret_1', 'target'], start, end, labeled_only))
+
+
+def test_labeled_read_with_gap_in_the_middle():
+    # Ticker bez targetu w środku zakresu - wiersze nie tworzą ciągłego wycinka (ścieżka filter)
+    features = features_frame()
+    features.iloc[30, features.columns.get_loc('target')] = np.nan
+    feature_store.write_features(features)
+    got = feature_store.read_features(['vol_21'], labeled_only=True)
+    assert_same(got, expected(features, ['vol_21'], labeled_only=True))
+
+
+def test_single_month_read_is_zero_copy(monkeypatch):
+    features = features_frame()
+    feature_store.write_features(features)
+    # Jedno wspólne mapowanie, żeby porównać adresy wyniku z buforem pliku
+    table = feature_store._open_partition('2026-02')  # Ostatnie HORIZON dni bez targetu
+    monkeypatch.setattr(feature_store, '_open_partition', lambda month: table)
+    buffer = table.column('ret_1').chunk(0).buffers()[1]
+
+    for labeled_only in (False, True):
+        got = feature_store.read_features(['ret_1'], start='2026-02-01', end='2026-02-28', labeled_only=labeled_only)
+        address = got['ret_1'].to_numpy().__array_interface__['data'][0]
+        assert buffer.address <= address < buffer.address + buffer.size
+
+
+def test_rewrite_keeps_older_days_of_first_month():
+    features = features_frame()
+    feature_store.write_features(features)
+    # Kolejny zapis zaczyna się w środku grudnia - dni grudnia sprzed startu muszą zostać
+    update = features_frame(start='2025-12-10', days=90, seed=1)
+    feature_store.write_features(update)
+    combined = pd.concat([features[features.index < pd.Timestamp('2025-12-10')], update])
+    got = feature_store.read_features(['ret_1', 'target'])
+    assert_same(got, expected(combined, ['ret_1', 'target']))
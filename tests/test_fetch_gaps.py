@@ -0,0 +1,87 @@
+# Plik: tests/test_fetch_gaps.py
+# Pobranie inkrementalne po przestoju: świece nie mogą być doklejane ani składane (4h/1d) z luką
+# między zapisaną historią a nowymi świecami.
+
+import time
+import numpy as np
+import pytest
+import candle_store
+import crypto_analyzer
+from conftest import HOUR_MS, FakeClock, fake_klines
+
+SYMBOL = 'AAAUSDT'
+
+
+@pytest.fixture
+def clock(tmp_path, monkeypatch):
+    clock = FakeClock(1_700_000_000_000 // (24 * HOUR_MS) * (24 * HOUR_MS) + HOUR_MS // 2)
+    monkeypatch.setattr(candle_store, 'CANDLE_STORE_DIR', str(tmp_path))
+    monkeypatch.setattr(crypto_analyzer, '_base_frames', {})
+    monkeypatch.setattr(crypto_analyzer, 'BASE_REUSE_SECONDS', 0)
+    monkeypatch.setattr(time, 'time', clock)
+    monkeypatch.setattr(crypto_analyzer, '_request_klines', fake_klines(clock))
+    return clock
+
+
+def open_times(interval):
+    return candle_store.load_candles(SYMBOL, interval).index.as_unit('ms').asi8
+
+
+def test_incremental_fetch_refetches_window_after_gap(clock, monkeypatch):
+    crypto_analyzer.fetch_crypto_data(SYMBOL, '1h', 200)
+    clock.now_ms += 30 * HOUR_MS
+    full = fake_klines(clock)
+    calls = []
+
+    def lossy(symbol, interval, limit, start_time=None):
+        # Pierwsza strona po przestoju "zgubiona": odpowiedź zaczyna się 10 h po start_time
+        calls.append(start_time)
+        if start_time is not None:
+            return full(symbol, interval, limit, start_time + 10 * HOUR_MS)
+        return full(symbol, interval, limit)
+    monkeypatch.setattr(crypto_analyzer, '_request_klines', lossy)
+
+    df = crypto_analyzer.fetch_crypto_data(SYMBOL, '1h', 200)
+    assert calls[-1] is None  # Całe okno pobrane ponownie
+    opens = open_times('1h')
+    assert np.all(np.diff(opens) == HOUR_MS)
+    assert opens[-1] == int(clock.now_ms) // HOUR_MS * HOUR_MS - HOUR_MS
+    assert len(df) == 200 and np.all(np.diff(df.index.as_unit('ms').asi8) == HOUR_MS)
+
+
+@pytest.mark.parametrize('interval', ['4h', '1d'])
+def test_timeframe_rebuilds_after_base_gap(clock, monkeypatch, interval):
+    crypto_analyzer.fetch_timeframe(SYMBOL, interval, 50)
+    clock.now_ms += 3 * 24 * HOUR_MS
+    real_base = crypto_analyzer._fetch_base
+    holes = []
+
+    def base_with_hole(symbol, limit, use_store):
+        # Pierwsze pobranie bazy pomija kilka godzin (niepełna historia po przestoju)
+        df = real_base(symbol, limit, use_store)
+        if not holes:
+            holes.append(True)
+            return df.drop(df.index[-40:-30])
+        return df
+    monkeypatch.setattr(crypto_analyzer, '_fetch_base', base_with_hole)
+
+    df = crypto_analyzer.fetch_timeframe(SYMBOL, interval, 50)
+    step = candle_store.interval_to_ms(interval)
+    assert np.all(np.diff(open_times(interval)) == step)
+
+    # Te same świece, co przy złożeniu z pełnej, ciągłej bazy
+    monkeypatch.setattr(crypto_analyzer, '_fetch_base', real_base)
+    expected = crypto_analyzer.fetch_timeframe(SYMBOL, interval, 50, use_store=False)
+    assert list(df.index) == list(expected.index)
+    np.testing.assert_allclose(df.to_numpy(), expected.to_numpy())
+
+
+def test_is_contiguous():
+    clock = FakeClock(1_700_000_000_000)
+    df = fake_klines(clock)('X', '1h', 10)
+    first = int(df.index[0].value // 10**6)
+    assert candle_store.is_contiguous(df, '1h')
+    assert candle_store.is_contiguous(df, '1h', start_ms=first)
+    assert not candle_store.is_contiguous(df, '1h', start_ms=first - HOUR_MS)
+    assert not candle_store.is_contiguous(df.drop(df.index[4]), '1h')
+    assert not candle_store.is_contiguous(df.iloc[:0], '1h', start_ms=first)
@@ -0,0 +1,75 @@
+# Plik: tests/test_forecast.py
+# Zamknięta postać regresji (_batched_linreg / forecast_universe) musi dawać wyniki jak dawne
+# dopasowanie LinearRegression osobno dla każdego symbolu.
+
+import numpy as np
+import pandas as pd
+import pytest
+import crypto_analyzer
+
+LinearRegression = pytest.importorskip('sklearn.linear_model').LinearRegression
+
+
+def frame(n, seed):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(scale=0.02, size=n)))
+    index = pd.date_range('2026-01-01', periods=n, freq='4h', name='Open time')
+    return pd.DataFrame({'Close': close}, index=index)
+
+
+def sklearn_1step(df):
+    """Dawne get_ml_forecast: Close_t ~ Close_(t-1), predykcja dla ostatniego Prev_Close."""
+    ml = df[['Close']].copy()
+    ml['Prev_Close'] = ml['Close'].shift(1)
+    ml = ml.dropna()
+    model = LinearRegression().fit(ml[['Prev_Close']].to_numpy(), ml['Close'].to_numpy())
+    return model.predict([[ml['Prev_Close'].iloc[-1]]])[0]
+
+
+def sklearn_30day(df, interval):
+    """Dawne get_ml_monthly_forecast: Close ~ numer kroku, predykcja 30 dni naprzód."""
+    steps = 30 * 24 / {'1h': 1, '4h': 4, '1d': 24}.get(interval, 24)
+    t = np.arange(len(df), dtype='float64')[:, None]
+    model = LinearRegression().fit(t, df['Close'].to_numpy())
+    return model.predict([[len(df) - 1 + steps]])[0]
+
+
+@pytest.mark.parametrize('interval', ['1h', '4h', '1d'])
+def test_universe_matches_per_asset_linear_regression(interval):
+    # Różne długości historii - krótsze serie są wyrównane do prawej i dopełnione NaN
+    frames = {f'S{i}USDT': frame(n, seed=i) for i, n in enumerate([2, 3, 25, 100, 100, 250])}
+    out = crypto_analyzer.forecast_universe(frames, interval)
+    for sym, df in frames.items():
+        last = df['Close'].iloc[-1]
+        assert out[sym]['ml_1step']['next_price'] == pytest.approx(sklearn_1step(df), rel=1e-9), sym
+        assert out[sym]['ml_30day']['monthly_price'] == pytest.approx(sklearn_30day(df, interval), rel=1e-9), sym
+        assert out[sym]['ml_1step']['change_percent'] == pytest.approx((sklearn_1step(df) - last) / last * 100, abs=1e-7)
+        assert out[sym]['ml_30day']['forecast_timestamp'] == df.index[-1] + pd.Timedelta(hours=30 * 24)
+
+
+def test_constant_series_predicts_mean():
+    # var(x) = 0: LinearRegression daje nachylenie 0 i wyraz wolny = średnia y
+    df = pd.DataFrame({'Close': np.full(30, 50.0)}, index=pd.date_range('2026-01-01', periods=30, freq='D'))
+    out = crypto_analyzer.forecast_universe({'FLAT': df}, '1d')['FLAT']
+    assert out['ml_1step']['next_price'] == pytest.approx(sklearn_1step(df))
+    assert out['ml_1step']['change_percent'] == pytest.approx(0.0)
+
+
+def test_batched_linreg_ignores_nan_pairs():
+    rng = np.random.default_rng(7)
+    x = rng.normal(size=(4, 40))
+    y = 3 * x + rng.normal(size=(4, 40))
+    x[1, :15] = np.nan
+    y[2, 5] = np.nan
+    x_new = rng.normal(size=4)
+    got = crypto_analyzer._batched_linreg(x, y, x_new)
+    for i in range(4):
+        ok = ~(np.isnan(x[i]) | np.isnan(y[i]))
+        expected = LinearRegression().fit(x[i, ok][:, None], y[i, ok]).predict([[x_new[i]]])[0]
+        assert got[i] == pytest.approx(expected, rel=1e-9)
+
+
+def test_short_frames_have_no_forecast():
+    out = crypto_analyzer.forecast_universe({'ONE': frame(1, 0), 'NONE': frame(0, 0)}, '4h')
+    assert out['ONE']['ml_1step']['next_price'] is None
+    assert out['NONE']['ml_30day']['monthly_price'] is None
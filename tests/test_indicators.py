@@ -0,0 +1,89 @@
+# Plik: tests/test_indicators.py
+# Strumieniowy IndicatorState musi dawać te same wartości co wsadowe technical_analysis / score_asset.
+
+import numpy as np
+import pandas as pd
+import pytest
+import candle_store
+import crypto_analyzer
+import indicators
+
+INTERVAL = '4h'
+STEP_MS = candle_store.interval_to_ms(INTERVAL)
+COLUMNS = ['Close', 'SMA_20', 'RSI', 'Volume', 'avg_volume_50']
+
+
+def ohlcv(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(scale=0.02, size=n)))
+    close[10:13] = close[9]  # Płaski odcinek: strata 0 w oknie RSI
+    opens = np.arange(n, dtype=np.int64) * STEP_MS + 1_700_000_000_000 // STEP_MS * STEP_MS
+    return pd.DataFrame(
+        {'Open': close, 'High': close * 1.01, 'Low': close * 0.99, 'Close': close,
+         'Volume': rng.uniform(100, 1000, size=n)},
+        index=pd.DatetimeIndex(pd.to_datetime(opens, unit='ms'), name='Open time'),
+    )
+
+
+def batch_values(df):
+    """Wartości ostatniego wiersza tak, jak liczy je skan wsadowy (technical_analysis + score_asset)."""
+    last = crypto_analyzer.technical_analysis(df.copy()).iloc[-1]
+    return {'Close': last['Close'], 'SMA_20': last['SMA_20'], 'RSI': last['RSI'], 'Volume': last['Volume'],
+            'avg_volume_50': df['Volume'].tail(50).mean()}
+
+
+def close_ms(df, k):
+    """Chwila tuż po zamknięciu k-tej świecy (k pierwszych świec zamkniętych)."""
+    return int(df.index[k - 1].value // 10**6) + STEP_MS
+
+
+@pytest.mark.parametrize('k', [2, 3, 14, 15, 20, 21, 50, 51, 120])
+def test_state_matches_batch_for_closed_candles(k):
+    df = ohlcv(120)
+    state = indicators.IndicatorState('AAAUSDT', INTERVAL)
+    values = indicators.sync_indicator_state(state, df.iloc[:k], close_ms(df, k), persist=False)
+    expected = batch_values(df.iloc[:k])
+    for c in COLUMNS:
+        assert values[c] == pytest.approx(expected[c], rel=1e-12), c
+
+
+def test_candle_by_candle_updates_match_batch():
+    df = ohlcv(90, seed=1)
+    state = indicators.IndicatorState('AAAUSDT', INTERVAL)
+    for k in range(2, len(df) + 1):  # technical_analysis zastępuje ramkę z 1 świecą zerami
+        values = indicators.sync_indicator_state(state, df.iloc[:k], close_ms(df, k), persist=False)
+        expected = batch_values(df.iloc[:k])
+        for c in COLUMNS:
+            assert values[c] == pytest.approx(expected[c], rel=1e-12), (k, c)
+
+
+def test_open_candle_is_peeked_not_stored():
+    df = ohlcv(80, seed=2)
+    state = indicators.IndicatorState('AAAUSDT', INTERVAL)
+    now_ms = close_ms(df, len(df)) - STEP_MS // 2  # Ostatnia świeca jeszcze otwarta
+    values = indicators.sync_indicator_state(state, df, now_ms, persist=False)
+    expected = batch_values(df)
+    for c in COLUMNS:
+        assert values[c] == pytest.approx(expected[c], rel=1e-12), c
+    assert state.last_open_time == int(df.index[-2].value // 10**6)
+
+
+def test_gap_rebuilds_state_from_frame():
+    df = ohlcv(100, seed=3)
+    state = indicators.IndicatorState('AAAUSDT', INTERVAL)
+    indicators.sync_indicator_state(state, df.iloc[:40], close_ms(df, 40), persist=False)
+    # Świece 40..59 nigdy nie trafiły do stanu; ramka zaczyna się dalej
+    later = df.iloc[60:]
+    values = indicators.sync_indicator_state(state, later, close_ms(df, len(df)), persist=False)
+    expected = batch_values(later)
+    for c in COLUMNS:
+        assert values[c] == pytest.approx(expected[c], rel=1e-12), c
+
+
+def test_state_roundtrip_keeps_values():
+    df = ohlcv(30, seed=4)
+    state = indicators.IndicatorState('AAAUSDT', INTERVAL)
+    indicators.sync_indicator_state(state, df, close_ms(df, len(df)), persist=False)
+    restored = indicators.IndicatorState.from_dict(state.to_dict())
+    assert restored.values() == pytest.approx(state.values(), nan_ok=True)
+    assert restored.last_open_time == state.last_open_time
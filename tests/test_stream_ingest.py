@@ -0,0 +1,68 @@
+# Plik: tests/test_stream_ingest.py
+# Luka w strumieniu kline (np. po rozłączeniu): brakujące świece muszą trafić do magazynu z REST.
+
+import json
+import time
+import numpy as np
+import pandas as pd
+import pytest
+import candle_store
+import crypto_analyzer
+import indicators
+import stream_ingest
+from conftest import FakeClock, fake_klines
+
+STEP_MS = candle_store.interval_to_ms('1h')
+SYMBOL = 'AAAUSDT'
+
+
+def kline_message(open_time):
+    return json.dumps({'stream': f"{SYMBOL.lower()}@kline_1h", 'data': {'e': 'kline', 'k': {
+        't': open_time, 'T': open_time + STEP_MS - 1, 's': SYMBOL, 'i': '1h',
+        'o': '100', 'h': '101', 'l': '99', 'c': '100', 'v': '1000', 'x': True}}})
+
+
+@pytest.fixture
+def scorer(tmp_path, monkeypatch):
+    clock = FakeClock(1_700_000_000_000 // STEP_MS * STEP_MS + STEP_MS // 2)
+    monkeypatch.setattr(candle_store, 'CANDLE_STORE_DIR', str(tmp_path / 'candles'))
+    monkeypatch.setattr(stream_ingest, 'LIVE_RANKING_DIR', str(tmp_path / 'live'))
+    monkeypatch.setattr(indicators, '_states', {})
+    monkeypatch.setattr(time, 'time', clock)
+    monkeypatch.setattr(crypto_analyzer, '_request_klines', fake_klines(clock))
+    live = stream_ingest.LiveScorer('1h', [SYMBOL])
+    live.bootstrap()
+    live.clock = clock
+    return live
+
+
+def stored_open_times():
+    stored = candle_store.load_candles(SYMBOL, '1h')
+    return stored.index.as_unit('ms').asi8
+
+
+def test_gap_is_backfilled_before_live_candle(scorer):
+    before = stored_open_times()[-1]
+    scorer.clock.now_ms += 6 * STEP_MS  # 6 świec bez wiadomości z WS
+    closed = int(scorer.clock.now_ms) // STEP_MS * STEP_MS - STEP_MS
+
+    assert scorer.handle_message(kline_message(closed)) == SYMBOL
+
+    opens = stored_open_times()
+    assert opens[-1] == closed
+    assert set(range(before, closed + 1, STEP_MS)) <= set(opens)  # Brakujące świece uzupełnione
+    assert np.all(np.diff(opens) == STEP_MS)
+    assert indicators.load_indicator_state(SYMBOL, '1h').last_open_time == closed
+
+
+def test_gap_not_appended_when_backfill_fails(scorer, monkeypatch):
+    before = stored_open_times()
+    scorer.clock.now_ms += 6 * STEP_MS
+
+    def unavailable(*args, **kwargs):
+        raise ConnectionError("binance down")
+    monkeypatch.setattr(crypto_analyzer, '_request_klines', unavailable)
+    closed = int(scorer.clock.now_ms) // STEP_MS * STEP_MS - STEP_MS
+    scorer.handle_message(kline_message(closed))
+
+    assert np.array_equal(stored_open_times(), before)  # Bez świecy za luką - kolejny resync ją uzupełni
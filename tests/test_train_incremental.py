@@ -0,0 +1,82 @@
+# Plik: tests/test_train_incremental.py
+# Tryb 'auto' fit_or_update: przy domyślnej konfiguracji dotrenowanie musi faktycznie zachodzić
+# między pełnymi treningami, a limit drzew (MAX_TREES_FACTOR) wymusza pełny trening.
+
+import numpy as np
+import pandas as pd
+import pytest
+import model_store
+import train_model_crypto as tm
+
+N_TICKERS = 15  # Domyślny koszyk CRYPTO_TICKERS
+NAME = 'sim_test'
+
+
+@pytest.fixture(autouse=True)
+def model_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(model_store, 'MODEL_DIR', str(tmp_path))
+    monkeypatch.setattr(tm, 'TRAIN_MODE', 'auto')
+
+
+def training_frame(days, seed=0):
+    """Macierz (data x ticker) w formacie build_feature_matrix: index 'date', po N_TICKERS wierszy na dzień."""
+    rng = np.random.default_rng(seed)
+    dates = np.repeat(pd.date_range('2024-01-01', periods=days, freq='D'), N_TICKERS)
+    X = pd.DataFrame(rng.normal(size=(len(dates), 4)), columns=['f0', 'f1', 'f2', 'f3'],
+                     index=pd.DatetimeIndex(dates, name='date'))
+    y = pd.Series(0.1 * X['f0'] + rng.normal(scale=0.05, size=len(X)), index=X.index)
+    return X, y
+
+
+def test_default_config_reaches_incremental_branch():
+    X, y = training_frame(300)
+    tm.fit_or_update(NAME, X, y, n_jobs=1)
+    full = model_store.load_meta(NAME)
+
+    # Kilka dni nowych targetów (cron co 6 h) - przed upływem FULL_RETRAIN_DAYS
+    days = tm.FULL_RETRAIN_DAYS // 2 + 1
+    assert days < tm.FULL_RETRAIN_DAYS
+    X, y = training_frame(300 + days)
+    assert tm.incremental_min_rows(X) <= N_TICKERS * days
+    tm.fit_or_update(NAME, X, y, n_jobs=1)
+    updated = model_store.load_meta(NAME)
+
+    assert updated['version'] != full['version']
+    assert updated['num_trees'] == full['num_trees'] + tm.INCREMENTAL_ROUNDS
+    assert updated['last_full_train'] == full['last_full_train']
+    assert updated['trained_until'] == X.index.max().isoformat()
+
+
+def test_too_few_new_rows_keeps_saved_model():
+    X, y = training_frame(300)
+    tm.fit_or_update(NAME, X, y, n_jobs=1)
+    full = model_store.load_meta(NAME)
+
+    X, y = training_frame(301)  # Jeden dzień = N_TICKERS wierszy, poniżej progu
+    tm.fit_or_update(NAME, X, y, n_jobs=1)
+    assert model_store.load_meta(NAME)['version'] == full['version']
+
+
+def test_tree_cap_forces_full_retrain():
+    days = 300
+    X, y = training_frame(days)
+    tm.fit_or_update(NAME, X, y, n_jobs=1)
+    full = model_store.load_meta(NAME)
+    full_trees = full['num_trees']
+    cap = tm.MAX_TREES_FACTOR * full_trees
+
+    # Dotrenowania aż do limitu drzew - kolejne przekroczyłoby cap
+    while model_store.load_meta(NAME)['num_trees'] + tm.INCREMENTAL_ROUNDS <= cap:
+        days += tm.FULL_RETRAIN_DAYS // 2 + 1
+        X, y = training_frame(days)
+        tm.fit_or_update(NAME, X, y, n_jobs=1)
+        meta = model_store.load_meta(NAME)
+        assert meta['last_full_train'] == full['last_full_train']
+        assert meta['num_trees'] <= cap
+
+    days += tm.FULL_RETRAIN_DAYS // 2 + 1
+    X, y = training_frame(days)
+    tm.fit_or_update(NAME, X, y, n_jobs=1)
+    retrained = model_store.load_meta(NAME)
+    assert retrained['num_trees'] == full_trees
+    assert retrained['last_full_train'] != full['last_full_train']
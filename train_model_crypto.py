@@ -1,91 +1,276 @@
+import numpy as np
 import pandas as pd
 from lightgbm import LGBMRegressor # ⬅️ ZMIANA: Używamy LightGBM zamiast XGBoost
-from features_prices import build_price_features # Zakładamy, że ta funkcja działa
+from features_prices import FEATURE_DTYPE, build_price_features # Zakładamy, że ta funkcja działa
 from features_news import build_news_features # Zakładamy, że ta funkcja działa
 from datetime import datetime, timedelta
 import matplotlib.pyplot as plt
 import os
+import feature_store
+import metrics
+import model_store
+import results_store
 
 SIMULATION_NUMBER = int(os.environ.get("SIMULATION_NUMBER", 1))
 
 # --- KONFIGURACJA KRYPTOWALUT (OPTYMALIZACJA STABILNOŚCI) ---
-# Ograniczona lista, aby zmniejszyć ryzyko błędu pamięci (512 MB RAM)
+# Domyślna lista; cechy są w float32 i trening czyta je z feature_store (mmap), więc w 512 MB RAM
+# mieści się też szerszy koszyk (200+) podany przez CRYPTO_TICKERS="BTC-USD,ETH-USD,..."
 CRYPTO_TICKERS = [
     "BTC-USD", "ETH-USD", "BNB-USD", "XRP-USD", "ADA-USD", "SOL-USD",
     "DOGE-USD", "DOT-USD", "MATIC-USD", "LTC-USD", "SHIB-USD", "AVAX-USD",
     "UNI-USD", "LINK-USD", "ALGO-USD"
 ]
+if os.environ.get("CRYPTO_TICKERS"):
+    CRYPTO_TICKERS = [t.strip() for t in os.environ["CRYPTO_TICKERS"].split(",") if t.strip()]
 
 HORIZON = 21 # Horyzont prognozy (np. 21 dni handlowych)
 TOP_K = 5 # Wybieramy Top 5 z prognozą
 TCOST = 0.0015
 INITIAL_CAPITAL = 10000  # $ na start
+RESULTS_DIR = "top_results_crypto"
+RUN_REPORT_FILE = f"{RESULTS_DIR}/run_timing.json"  # Raport czasów etapów z ostatniego uruchomienia
 
-# --- Budowanie cech ---
-print("Budowanie cech cenowych kryptowalut...")
-# UWAGA: Te funkcje muszą być stabilne i działać w środowisku GitHub Actions
-price_feats = build_price_features(CRYPTO_TICKERS) 
-
-print("Budowanie cech z newsów...")
-news_feats = build_news_features(CRYPTO_TICKERS, days=7)
-
-# Upewniamy się, że obie ramki mają kolumnę 'date'
-if 'date' not in price_feats.columns:
-    price_feats = price_feats.rename_axis('date').reset_index()
-if 'date' not in news_feats.columns:
-    news_feats = news_feats.rename_axis('date').reset_index()
-
-# Konwersja dat na datetime
-price_feats['date'] = pd.to_datetime(price_feats['date']).dt.normalize()
-news_feats['date'] = pd.to_datetime(news_feats['date']).dt.normalize()
-
-# Łączenie i przygotowanie danych
-features = (
-    price_feats
-    .merge(news_feats, on=['ticker', 'date'], how='left')
-    .set_index('date')
-    .sort_index()
+# Parametry modelu LGBM
+MODEL_PARAMS = dict(
+    n_estimators=200, # Zmniejszona liczba dla szybszego treningu
+    max_depth=4,
+    learning_rate=0.05,
 )
+# Trwałość modelu: 'auto' = dotrenowanie poprzedniego boostera + pełny trening co FULL_RETRAIN_DAYS
+TRAIN_MODE = os.environ.get("TRAIN_MODE", "auto") # auto | full | incremental
+FULL_RETRAIN_DAYS = int(os.environ.get("FULL_RETRAIN_DAYS", 7))
+INCREMENTAL_ROUNDS = 20 # Liczba drzew dokładanych przy dotrenowaniu
+# Dotrenowanie dopiero przy tylu nowych wierszach (mniej - czekają na kolejne uruchomienie); przy
+# kilkunastu wierszach drzewa z min_child_samples byłyby pojedynczymi liśćmi, a model rósłby bez zysku.
+# Górny limit - faktyczny próg zależy od liczby tickerów (incremental_min_rows)
+INCREMENTAL_MIN_ROWS = int(os.environ.get("INCREMENTAL_MIN_ROWS", 200))
+MAX_TREES_FACTOR = 2 # Pełny trening, gdy dotrenowania przekroczyłyby 2x liczbę drzew pełnego modelu
+# Bagging wierszy i kolumn - dzięki niemu różne seedy dają różne modele w ensemble
+BAGGING_PARAMS = dict(subsample=0.8, subsample_freq=1, colsample_bytree=0.8)
+
+
+# --- Budowanie cech ---
+def build_feature_matrix(tickers=CRYPTO_TICKERS):
+    """
+    Cechy cenowe + newsy + target. Zwraca (features, Xcols); features ma index 'date'.
+    Target jest NaN dla ostatnich HORIZON dni - do treningu służy labeled_rows(features).
+    """
+    print("Budowanie cech cenowych kryptowalut...")
+    # UWAGA: Te funkcje muszą być stabilne i działać w środowisku GitHub Actions
+    with metrics.timer('features.prices'):
+        price_feats = build_price_features(tickers)
+
+    print("Budowanie cech z newsów...")
+    with metrics.timer('features.news'):
+        news_feats = build_news_features(tickers, days=7)
+    with metrics.timer('features.assemble'):
+        return assemble_features(price_feats, news_feats)
+
+
+def assemble_features(price_feats, news_feats):
+    """
+    Łączy cechy cenowe (index=data, kolumna 'ticker') z newsami (ticker|date|sentiment) i dodaje target.
+    Wynik: kolumny float32 + 'ticker' jako kategoria (kody int16), posortowany po dacie. Sentyment i target
+    są dopasowywane po kodach tickerów w numpy, a ramka powstaje raz (bez merge / set_index / sort_index).
+    """
+    if 'date' in price_feats.columns:
+        price_feats = price_feats.set_index('date')
+    if 'date' not in news_feats.columns:
+        news_feats = news_feats.rename_axis('date').reset_index()
+
+    tickers = price_feats['ticker'].astype('category')
+    categories = tickers.cat.categories
+    codes = tickers.cat.codes.to_numpy().astype(np.int16)
+    dates = pd.DatetimeIndex(price_feats.index).normalize()
+    days = dates.to_numpy().astype('datetime64[D]').astype(np.int64)
+
+    # Kolejność ticker -> data: target to ret_21 przesunięty o HORIZON wierszy w obrębie tickera
+    by_ticker = np.lexsort((days, codes))
+    target = np.full(len(by_ticker), np.nan, dtype=FEATURE_DTYPE)
+    if len(by_ticker) > HORIZON:
+        same = codes[by_ticker[HORIZON:]] == codes[by_ticker[:-HORIZON]]
+        target[by_ticker[:-HORIZON][same]] = price_feats['ret_21'].to_numpy()[by_ticker[HORIZON:][same]]
+
+    # Końcowa kolejność: po dacie (stabilnie - w obrębie dnia tickery w kolejności kodów)
+    order = by_ticker[np.argsort(days[by_ticker], kind='stable')]
+
+    # Sentyment: klucz (kod tickera, dzień) -> wartość z newsów, brak = 0
+    news_codes = pd.Categorical(news_feats['ticker'], categories=categories).codes.astype(np.int64)
+    news_days = pd.to_datetime(news_feats['date']).dt.normalize().to_numpy().astype('datetime64[D]').astype(np.int64)
+    news_keys = pd.Index((news_codes << 32) | (news_days & 0xFFFFFFFF))
+    known = (news_codes >= 0) & ~news_keys.duplicated(keep='last')
+    lookup = news_keys[known].get_indexer((codes[order].astype(np.int64) << 32) | (days[order] & 0xFFFFFFFF))
+    news_values = news_feats['sentiment'].to_numpy(dtype=FEATURE_DTYPE)[known]
+    sentiment = np.zeros(len(order), dtype=FEATURE_DTYPE)
+    sentiment[lookup >= 0] = news_values[lookup[lookup >= 0]]  # Bez newsów (pusta ramka) - same zera
+
+    price_cols = [c for c in price_feats.columns if c != 'ticker']
+    columns = {c: price_feats[c].to_numpy(dtype=FEATURE_DTYPE)[order] for c in price_cols}
+    columns['ticker'] = pd.Categorical.from_codes(codes[order], categories=categories)
+    columns['sentiment'] = sentiment
+    columns['target'] = target[order]
+    features = pd.DataFrame(columns, index=dates[order].rename('date'))
+
+    # Wiersze bez targetu (ostatnie HORIZON dni) zostają - na nich liczona jest prognoza
+    Xcols = [c for c in features.columns if c not in ['target','ticker']]
+    return features, Xcols
+
+
+def labeled_rows(features):
+    """Wiersze ze znanym targetem (do treningu i ewaluacji)."""
+    return features[features['target'].notna()]
+
+
+def store_features(features):
+    """Zapisuje macierz cech w feature_store. Zwraca zakres dat (start, end) do późniejszego odczytu."""
+    with metrics.timer('features.store'):
+        feature_store.write_features(features)
+    return features.index.min(), features.index.max()
+
 
-# Tworzymy target
-features['target'] = features.groupby('ticker')['ret_21'].shift(-HORIZON)
+def load_training_frames(Xcols, start, end):
+    """
+    (train, latest) z feature_store: wiersze ze znanym targetem z zakresu [start, end] oraz ostatnia
+    data do prognozy. Po `del features` w wywołującym pamięć zajmują tylko kolumny czytane przez
+    trening (jedna sklejona kopia na kolumnę z miesięcznych plików); latest to widok na zmapowany plik.
+    """
+    with metrics.timer('features.load'):
+        train = feature_store.read_features(Xcols + ['target'], start=start, end=end, labeled_only=True)
+        latest = feature_store.read_features(Xcols, start=end, end=end)
+    return train, latest
 
-features['sentiment'] = features['sentiment'].fillna(0)
 
 # --- Trening modelu ---
-features = features.dropna(subset=['target'])
-Xcols = [c for c in features.columns if c not in ['target','ticker']]
-X = features[Xcols]
-y = features['target']
+def tuned_params():
+    """Hiperparametry z ostatniego strojenia (tune_model_crypto.py) - nadpisują MODEL_PARAMS."""
+    return model_store.load_best_params().get('params', {})
+
+
+def make_model(seed=42, bagging=False, n_jobs=-1, **overrides):
+    params = dict(MODEL_PARAMS, **tuned_params())
+    params.update(random_state=seed, n_jobs=n_jobs) # n_jobs=-1: wszystkie rdzenie
+    if bagging:
+        params.update(BAGGING_PARAMS)
+    params.update(overrides)
+    return LGBMRegressor(**params)
+
+
+def train_model(X, y, seed=42, bagging=False, n_jobs=-1):
+    model = make_model(seed=seed, bagging=bagging, n_jobs=n_jobs)
+    model.fit(X, y)
+    return model
+
+
+def _needs_full_retrain(meta, Xcols, mode):
+    if mode == "full" or meta is None:
+        return True
+    if meta.get('features') != list(Xcols):
+        return True # Zmiana schematu cech
+    if meta.get('tuned_at') != model_store.load_best_params().get('tuned_at'):
+        return True # Nowe hiperparametry ze strojenia
+    full_trees = dict(MODEL_PARAMS, **tuned_params())['n_estimators']
+    if meta.get('num_trees', 0) + INCREMENTAL_ROUNDS > MAX_TREES_FACTOR * full_trees:
+        return True # Limit drzew - model nie rośnie bez końca
+    if mode == "incremental":
+        return False
+    last_full = pd.Timestamp(meta['last_full_train'])
+    return pd.Timestamp.now(tz='UTC') - last_full > pd.Timedelta(days=FULL_RETRAIN_DAYS)
+
+
+def incremental_min_rows(X):
+    """
+    Próg nowych wierszy dla dotrenowania: połowa targetów dojrzewających między pełnymi treningami
+    (tickery x FULL_RETRAIN_DAYS / 2), najwyżej INCREMENTAL_MIN_ROWS. Przy stałym progu 200 i 15
+    tickerach (~15 targetów dziennie) pełny trening co 7 dni następowałby, zanim próg się zapełni.
+    """
+    tickers_per_day = max(1, round(len(X) / max(1, X.index.nunique())))
+    return max(1, min(INCREMENTAL_MIN_ROWS, tickers_per_day * FULL_RETRAIN_DAYS // 2))
+
+
+def fit_or_update(name, X, y, seed=42, bagging=False, n_jobs=-1, mode=TRAIN_MODE):
+    """
+    Trening z zapisem modelu w model_store. Tryb 'auto': dotrenowanie (warm start) poprzedniego
+    boostera tylko na nowo dojrzałych targetach, a co FULL_RETRAIN_DAYS pełny trening od zera.
+    X musi mieć index z datami. Zwraca model z metodą predict.
+    """
+    booster, meta = model_store.load_latest(name)
+    trained_until = X.index.max()
+    if _needs_full_retrain(meta if booster is not None else None, X.columns, mode):
+        print(f"[{name}] Pełny trening ({len(X)} wierszy)...")
+        with metrics.timer('train.fit', mode='full'):
+            model = train_model(X, y, seed=seed, bagging=bagging, n_jobs=n_jobs)
+        last_full_train = pd.Timestamp.now(tz='UTC')
+    else:
+        new_rows = X.index > pd.Timestamp(meta['trained_until'])
+        min_rows = incremental_min_rows(X)
+        if new_rows.sum() < min_rows:
+            # trained_until bez zmian - nowe wiersze wejdą do kolejnego dotrenowania
+            print(f"[{name}] {int(new_rows.sum())} nowych dojrzałych targetów (< {min_rows}) - "
+                  f"używam zapisanego modelu {meta['version']}.")
+            return booster
+        print(f"[{name}] Dotrenowanie {INCREMENTAL_ROUNDS} drzew na {int(new_rows.sum())} nowych wierszach...")
+        model = make_model(seed=seed, bagging=bagging, n_jobs=n_jobs, n_estimators=INCREMENTAL_ROUNDS)
+        with metrics.timer('train.fit', mode='incremental'):
+            model.fit(X[new_rows], y[new_rows], init_model=booster)
+        last_full_train = pd.Timestamp(meta['last_full_train'])
+
+    model_store.save_model(model, name, {
+        'features': list(X.columns),
+        'trained_until': trained_until.isoformat(),
+        'last_full_train': last_full_train.isoformat(),
+        'horizon': HORIZON,
+        'params': model.get_params(),
+        'tuned_at': model_store.load_best_params().get('tuned_at'),
+    })
+    return model
+
+
+# --- Prognozy ---
+def predict_top(model, features, Xcols, top_k=TOP_K):
+    """
+    Top K tickerów z ostatniej daty wg prognozy modelu (kolumny: ticker, pred, pred_%).
+    Ostatnia data nie ma jeszcze targetu, więc nie była w zbiorze treningowym (prognoza poza próbą).
+    """
+    last_snap = features.loc[[features.index.max()], ['ticker']].copy()
+    last_snap['pred'] = model.predict(features.loc[[features.index.max()], Xcols])
+    top = last_snap.sort_values('pred', ascending=False).head(top_k)
+
+    # Prognoza w %
+    top['pred_%'] = top['pred']*100
+    return top
+
+
+def save_top(top, simulation_number):
+    # Tworzymy folder, jeśli nie istnieje
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+
+    # Zapis do pliku
+    top_file = f"{RESULTS_DIR}/last_top_crypto_{simulation_number}.csv"
+    top.to_csv(top_file, index=False)
+    print(f"Wyniki zapisane do: {top_file}")
+    return top_file
 
-# ⬅️ ZMIANA MODELU NA LIGHTGBM
-model = LGBMRegressor(
-    n_estimators=200, # Zmniejszona liczba dla szybszego treningu
-    max_depth=4, 
-    learning_rate=0.05,
-    random_state=42,
-    n_jobs=-1 # Używa wszystkich dostępnych rdzeni
-)
 
-print(f"Trening modelu AI (LGBM) dla symulacji {SIMULATION_NUMBER}...")
-model.fit(X, y)
+def main():
+    features, Xcols = build_feature_matrix()
+    start, end = store_features(features)
+    del features # Dalej tylko kolumny zmapowane z feature_store
+    train, latest = load_training_frames(Xcols, start, end)
 
-# --- Prognozy i Zapis ---
-preds = pd.Series(model.predict(X), index=X.index)
-snapshot = features[['ticker']].copy()
-snapshot['pred'] = preds.values
-last_snap = snapshot.loc[snapshot.index.max()]
-top = last_snap.sort_values('pred', ascending=False).head(TOP_K)
+    print(f"Trening modelu AI (LGBM) dla symulacji {SIMULATION_NUMBER}...")
+    model = fit_or_update(f"sim_{SIMULATION_NUMBER}", train[Xcols], train['target'])
 
-# Prognoza w %
-top['pred_%'] = top['pred']*100
+    with metrics.timer('train.predict'):
+        preds = predict_top(model, latest, Xcols, top_k=len(latest))
+    save_top(preds.head(TOP_K), SIMULATION_NUMBER)
+    results_store.record_run(preds[['ticker', 'pred']].assign(simulation=SIMULATION_NUMBER),
+                             as_of=latest.index.max(), horizon=HORIZON, job='train_model_crypto')
+    results_store.record_realized(train[['ticker', 'target']], HORIZON)
+    metrics.write_run_report(RUN_REPORT_FILE, job='train_model_crypto', simulation=SIMULATION_NUMBER)
 
-# Tworzymy folder, jeśli nie istnieje
-os.makedirs("top_results_crypto", exist_ok=True)
+    # [Usunięto kod Symulacji Equity i Wykresu, ponieważ jest niepotrzebny w Cron Job]
 
-# Zapis do pliku
-top_file = f"top_results_crypto/last_top_crypto_{SIMULATION_NUMBER}.csv"
-top.to_csv(top_file, index=False)
-print(f"Wyniki zapisane do: {top_file}")
 
-# [Usunięto kod Symulacji Equity i Wykresu, ponieważ jest niepotrzebny w Cron Job]
+if __name__ == "__main__":
+    main()
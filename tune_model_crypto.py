@@ -0,0 +1,180 @@
+# Plik: tune_model_crypto.py
+# Strojenie hiperparametrów LGBM z train_model_crypto:
+# - walidacja krzyżowa z oczyszczaniem (purge) i embargo dopasowanymi do HORIZON,
+# - losowe próby + successive halving: wszystkie próby liczone na najnowszym foldzie,
+#   kolejne szczeble (więcej foldów) tylko dla najlepszej 1/ETA prób,
+# - foldy liczone równolegle w puli procesów, każdy trening z early stopping na wewnętrznej
+#   walidacji wydzielonej z treningu foldu (fold testowy służy wyłącznie do oceny).
+# Najlepsza konfiguracja trafia do models/best_params.json (czyta ją make_model).
+#
+# Uruchomienie: python tune_model_crypto.py [--trials 32] [--workers 4] [--folds 5]
+
+import argparse
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Tuple
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+import model_store
+from train_model_crypto import (HORIZON, MODEL_PARAMS, RESULTS_DIR, build_feature_matrix,
+                                labeled_rows, make_model, tuned_params)
+
+TUNE_TRIALS = int(os.environ.get("TUNE_TRIALS", 32))
+TUNE_WORKERS = int(os.environ.get("TUNE_WORKERS", os.cpu_count() or 1))
+TUNE_FOLDS = 5
+TUNE_ETA = 3                 # Na każdym szczeblu przechodzi ~1/ETA najlepszych prób
+TUNE_SEED = 42
+MAX_ESTIMATORS = 1000        # Górny limit drzew; faktyczną liczbę wyznacza early stopping
+EARLY_STOPPING_ROUNDS = 50
+MIN_TRAIN_ROWS = 200
+VALID_FRACTION = 0.2         # Najnowsza część dat treningowych foldu - walidacja dla early stopping
+
+
+# --- 1. Foldy CV (purge + embargo) ---
+def purged_cv_folds(date_pos: np.ndarray, n_dates: int, n_folds: int = TUNE_FOLDS,
+                    horizon: int = HORIZON, embargo: int = HORIZON,
+                    valid_fraction: float = VALID_FRACTION) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Foldy (fit_idx, valid_idx, test_idx) po kolejnych blokach dat, od najnowszego. Z treningu usuwane
+    są wiersze, których target (okno `horizon` dni) nachodzi na blok testowy, oraz `embargo` dni
+    tuż po bloku testowym (ich cechy i targety są skorelowane z targetami testu).
+    Z pozostałego treningu najnowsze `valid_fraction` dat to walidacja dla early stopping,
+    a przed nią znów `horizon` dni przerwy - liczba drzew nie jest dobierana na foldzie testowym.
+    """
+    bounds = np.linspace(0, n_dates, n_folds + 1).astype(int)
+    folds = []
+    for lo, hi in reversed(list(zip(bounds[:-1], bounds[1:]))):
+        test = (date_pos >= lo) & (date_pos < hi)
+        train = (date_pos < lo - horizon) | (date_pos >= hi + embargo)
+        train_dates = np.unique(date_pos[train])
+        if not test.any() or len(train_dates) < 2:
+            continue
+        valid_lo = train_dates[min(len(train_dates) - 1, int(len(train_dates) * (1 - valid_fraction)))]
+        valid = train & (date_pos >= valid_lo)
+        fit = train & (date_pos < valid_lo - horizon)
+        if fit.sum() >= MIN_TRAIN_ROWS and valid.any():
+            folds.append((np.flatnonzero(fit), np.flatnonzero(valid), np.flatnonzero(test)))
+    return folds
+
+
+# --- 2. Przestrzeń przeszukiwania ---
+def sample_params(rng: np.random.Generator) -> Dict[str, Any]:
+    return {
+        'learning_rate': float(np.exp(rng.uniform(np.log(0.01), np.log(0.2)))),
+        'num_leaves': int(rng.integers(7, 64)),
+        'max_depth': int(rng.choice([-1, 3, 4, 5, 6, 8])),
+        'min_child_samples': int(np.exp(rng.uniform(np.log(10), np.log(200)))),
+        'subsample': float(rng.uniform(0.5, 1.0)),
+        'subsample_freq': 1,
+        'colsample_bytree': float(rng.uniform(0.5, 1.0)),
+        'reg_lambda': float(np.exp(rng.uniform(np.log(1e-3), np.log(10)))),
+    }
+
+
+# --- 3. Ocena próby na foldzie (w procesie roboczym) ---
+_worker_data = {}
+
+def _init_worker(X, y, folds):
+    """Dane i foldy trafiają do procesu roboczego raz (initializer), a nie z każdym zadaniem."""
+    _worker_data.update(X=X, y=y, folds=folds)
+
+def _evaluate(task):
+    """(trial_id, fold, params) -> (trial_id, fold, rmse, best_iteration)."""
+    trial_id, fold, params = task
+    X, y = _worker_data['X'], _worker_data['y']
+    fit_idx, valid_idx, test_idx = _worker_data['folds'][fold]
+    model = make_model(seed=TUNE_SEED, n_jobs=1, verbose=-1, **dict(params, n_estimators=MAX_ESTIMATORS))
+    model.fit(X[fit_idx], y[fit_idx], eval_X=(X[valid_idx],), eval_y=(y[valid_idx],),
+              callbacks=[lgb.early_stopping(EARLY_STOPPING_ROUNDS, verbose=False)])
+    pred = model.predict(X[test_idx], num_iteration=model.best_iteration_)
+    rmse = float(np.sqrt(np.mean((pred - y[test_idx]) ** 2)))
+    return trial_id, fold, rmse, int(model.best_iteration_ or MAX_ESTIMATORS)
+
+
+def _rung_sizes(n_folds: int, eta: int) -> List[int]:
+    """Liczba foldów na kolejnych szczeblach: 1, eta, eta^2, ... aż do wszystkich."""
+    sizes, k = [], 1
+    while k < n_folds:
+        sizes.append(k)
+        k *= eta
+    return sizes + [n_folds]
+
+
+# --- 4. Successive halving ---
+def tune(features: pd.DataFrame, Xcols: List[str], n_trials: int = TUNE_TRIALS, workers: int = TUNE_WORKERS,
+         n_folds: int = TUNE_FOLDS, eta: int = TUNE_ETA, seed: int = TUNE_SEED) -> Tuple[Dict[str, Any], pd.DataFrame]:
+    """
+    Zwraca (najlepsze parametry, tabela prób). Próba 0 to bieżąca konfiguracja - wynik strojenia
+    nigdy nie jest gorszy od konfiguracji bazowej na tych samych foldach. Early stopping korzysta
+    z wewnętrznej walidacji foldu, więc RMSE na foldzie testowym jest oceną poza próbą.
+    """
+    data = labeled_rows(features)
+    dates = data.index.unique().sort_values()
+    folds = purged_cv_folds(dates.searchsorted(data.index), len(dates), n_folds)
+    if not folds:
+        raise ValueError("Za mało danych na walidację krzyżową.")
+    X = data[Xcols].to_numpy(dtype='float32')
+    y = data['target'].to_numpy(dtype='float64')
+
+    rng = np.random.default_rng(seed)
+    base = {k: v for k, v in dict(MODEL_PARAMS, **tuned_params()).items() if k != 'n_estimators'}
+    trials = {0: base, **{i: sample_params(rng) for i in range(1, n_trials)}}
+    scores: Dict[Tuple[int, int], Tuple[float, int]] = {}  # (próba, fold) -> (rmse, best_iteration)
+
+    workers = max(1, workers)
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(X, y, folds)) if workers > 1 else None
+    if pool is None:
+        _init_worker(X, y, folds)
+    try:
+        alive = list(trials)
+        for rung, n_rung_folds in enumerate(_rung_sizes(len(folds), eta)):
+            tasks = [(t, f, trials[t]) for t in alive for f in range(n_rung_folds) if (t, f) not in scores]
+            results = pool.map(_evaluate, tasks) if pool else map(_evaluate, tasks)
+            for trial_id, fold, rmse, best_iter in results:
+                scores[(trial_id, fold)] = (rmse, best_iter)
+            mean_rmse = {t: np.mean([scores[(t, f)][0] for f in range(n_rung_folds)]) for t in alive}
+            alive = sorted(alive, key=mean_rmse.get)
+            print(f"Szczebel {rung}: {len(alive)} prób x {n_rung_folds} foldów, najlepsze RMSE {mean_rmse[alive[0]]:.5f}")
+            if n_rung_folds == len(folds):
+                break
+            alive = alive[:max(1, math.ceil(len(alive) / eta))]  # Odcinamy słabe próby
+    finally:
+        if pool:
+            pool.shutdown()
+
+    rows = []
+    for t, params in trials.items():
+        done = [scores[(t, f)] for f in range(len(folds)) if (t, f) in scores]
+        rows.append(dict(params, trial=t, folds=len(done), cv_rmse=np.mean([r for r, _ in done]),
+                         best_iteration=int(np.median([i for _, i in done]))))
+    board = pd.DataFrame(rows).sort_values(['folds', 'cv_rmse'], ascending=[False, True]).reset_index(drop=True)
+
+    best = board.iloc[0]
+    best_params = dict(trials[int(best['trial'])], n_estimators=int(best['best_iteration']))
+    return best_params, board
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Strojenie hiperparametrów LGBM (purged CV + successive halving).")
+    parser.add_argument("--trials", type=int, default=TUNE_TRIALS)
+    parser.add_argument("--workers", type=int, default=TUNE_WORKERS)
+    parser.add_argument("--folds", type=int, default=TUNE_FOLDS)
+    args = parser.parse_args()
+
+    features, Xcols = build_feature_matrix()
+    best_params, board = tune(features, Xcols, args.trials, args.workers, args.folds)
+    best = board.iloc[0]
+    model_store.save_best_params(best_params, {
+        'cv_rmse': float(best['cv_rmse']), 'folds': int(best['folds']), 'n_trials': len(board),
+        'horizon': HORIZON, 'features': list(Xcols),
+    })
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    board.to_csv(f"{RESULTS_DIR}/tuning_trials.csv", index=False)
+    print(f"Najlepsze parametry (CV RMSE {best['cv_rmse']:.5f}): {best_params}")
+    print(f"Zapisano: {model_store.best_params_path()}")
+
+
+if __name__ == "__main__":
+    main()